@@ -1,33 +1,68 @@
-from flask import Flask, send_from_directory, jsonify, request, session
-from flask_bcrypt import Bcrypt
+from flask import Blueprint, Flask, Response, send_from_directory, jsonify, request, session
 from flask_session import Session
 from flask_cors import CORS
 from sqlalchemy import text
 from config import ApplicationConfig
 from models import db, User
-from dotenv import load_dotenv
 from hmac import compare_digest
-from auvik_report import generate_report, gather_tenants
+import auvik_report
+from auvik_report import progress
+import auth
+import contextvars
+import threading
+import queue
+import json
 import os
 
 OUTPUT_DIR = os.path.join(os.getcwd(), 'output')
 
-load_dotenv('.env')
+#Seconds between SSE keepalive comments so proxies do not close an idle stream
+STREAM_KEEPALIVE = 15
 
-app = Flask(__name__)
-app.config.from_object(ApplicationConfig)
+api = Blueprint("api", __name__)
+_schema_lock = threading.Lock()
 
-Session(app)
+def create_app(config: object = ApplicationConfig) -> Flask:
+    """
+    Builds the Flask app without opening any connection; Redis connects on the first session
+    access and the tables are created on the first request
 
-CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": os.getenv("FRONTEND_ORIGIN", "http://localhost:5173")}})
+    Args:
+        config (object): Config class or object, defaults to ApplicationConfig
 
-db.init_app(app)
-bcrypt = Bcrypt(app)
+    Returns:
+        Flask: The configured app
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+    if app.config.get("SESSION_TYPE") == "redis" and app.config.get("SESSION_REDIS") is None:
+        import redis
+        app.config["SESSION_REDIS"] = redis.from_url(app.config["REDIS_URL"])
 
-with app.app_context():
-    db.create_all()
+    Session(app)
 
-@app.route("/api/register", methods=["POST"])
+    CORS(app, supports_credentials=True, resources={r"/api/*": {"origins": os.getenv("FRONTEND_ORIGIN", "http://localhost:5173")}})
+
+    db.init_app(app)
+    auth.init_app(app)
+    app.register_blueprint(api)
+
+    if app.config.get("CACHE_WARMER"):
+        from auvik_report import warmer
+        warmer.start()
+
+    @app.before_request
+    def create_tables():
+        if app.extensions.get("schema_ready"):
+            return
+        with _schema_lock:
+            if not app.extensions.get("schema_ready"):
+                db.create_all()
+                app.extensions["schema_ready"] = True
+
+    return app
+
+@api.route("/api/register", methods=["POST"])
 def register_user():
     data = request.get_json()
     email = data.get("email").strip().lower()
@@ -50,18 +85,17 @@ def register_user():
     if user_exists:
         return jsonify({"error": "User already exists"}), 409
     
-    hashed_password = bcrypt.generate_password_hash(password).decode("utf-8")
+    try:
+        hashed_password = auth.hash_password(password)
+    except auth.AuthBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
     new_user = User(email=email, password=hashed_password)
     db.session.add(new_user)
     db.session.commit()
 
-    session["user_id"] = new_user.id
-    return jsonify({
-        "id": new_user.id,
-        "email": new_user.email
-    }), 201
+    return jsonify(auth.remember_identity(new_user)), 201
 
-@app.route("/api/login", methods=["POST"])
+@api.route("/api/login", methods=["POST"])
 def login_user():
     data = request.get_json()
     email = data.get("email")
@@ -74,33 +108,27 @@ def login_user():
 
     if user is None:
         return jsonify({"error": "Unauthorized"}), 401
-    if not bcrypt.check_password_hash(user.password, password):
-        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        if not auth.check_password(user.password, password):
+            return jsonify({"error": "Unauthorized"}), 401
+    except auth.AuthBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
 
-    session["user_id"] = user.id
-    return jsonify({
-        "id": user.id,
-        "email": user.email
-    }), 200
+    return jsonify(auth.remember_identity(user)), 200
 
-@app.route("/api/me")
+@api.route("/api/me")
 def me():
-    user_id = session.get("user_id")
-    if not user_id:
+    identity = auth.current_identity()
+    if identity is None:
         return jsonify({"error": "Unauthorized"}), 401
-    
-    user = User.query.filter_by(id=user_id).first()
-    return jsonify({
-        "id": user.id,
-        "email": user.email
-    }), 200
+    return jsonify(identity), 200
 
-@app.route("/api/logout", methods=["POST"])
+@api.route("/api/logout", methods=["POST"])
 def logout_user():
-    session.pop("user_id", None)
+    auth.forget_identity()
     return "", 204
 
-@app.get("/api/health/db")
+@api.get("/api/health/db")
 def health_db():
     try:
         db.session.execute(text("SELECT 1"))
@@ -108,7 +136,16 @@ def health_db():
     except Exception as e:
         return jsonify({"db": "error", "detail": str(e)}), 500
 
-@app.route("/api/generate-report", methods=["POST"])
+@api.get("/api/metrics")
+def metrics():
+    # labels name tenants, so only logged in users or a scraper holding METRICS_TOKEN may read them
+    token = os.getenv('METRICS_TOKEN')
+    bearer = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (token and compare_digest(bearer, token)) and not session.get("user_id"):
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(auvik_report.render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@api.route("/api/generate-report", methods=["POST"])
 def generate_report_route():
     data = request.get_json()
     domain = data.get("domain")
@@ -117,25 +154,92 @@ def generate_report_route():
     if not user_id:
         return jsonify({"error": "Unauthorized"}), 401
 
-    name = generate_report(domain)
+    try:
+        period = auvik_report.resolve_period(data.get("period"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    profile = None
+    if data.get("profile"):
+        identity = auth.current_identity()
+        if identity is None or not auvik_report.is_admin(identity["email"]):
+            return jsonify({"error": "Profiling requires an admin account"}), 403
+        name, profile = auvik_report.profile_report(domain, period)
+        profile['prof'] = f"/output/{profile['prof']}"
+        profile['collapsed'] = f"/output/{profile['collapsed']}"
+    else:
+        name = auvik_report.generate_report(domain, period)
+
+    result = report_result(domain, name, period)
+    if profile:
+        result['profile'] = profile
+    return jsonify(result)
+
+@api.route("/api/generate-report/stream")
+def generate_report_stream():
+    domain = request.args.get("domain")
+
+    if not session.get("user_id"):
+        return jsonify({"error": "Unauthorized"}), 401
+    if not domain:
+        return jsonify({"error": "Missing Fields"}), 400
 
+    try:
+        period = auvik_report.resolve_period(request.args.get("period"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # The generator runs after the session is saved and the app context (and its DB session) is
+    # torn down, so it must not touch session or db; the report itself runs on its own thread
+    events = queue.Queue()
+
+    def build():
+        try:
+            with progress.listen(events.put):
+                name = auvik_report.generate_report(domain, period)
+            events.put({'event': 'done', **report_result(domain, name, period)})
+        except Exception as e:
+            events.put({'event': 'error', 'error': str(e)})
+
+    threading.Thread(target=contextvars.copy_context().run, args=(build,), daemon=True).start()
+
+    def stream():
+        while True:
+            try:
+                event = events.get(timeout=STREAM_KEEPALIVE)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            kind = event.pop('event', 'progress')
+            yield f"event: {kind}\ndata: {json.dumps(event)}\n\n"
+            if kind != 'progress':
+                return
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def report_result(domain: str, name: str, period) -> dict:
+    """
+    Builds the response describing a generated report and where to fetch it
+    """
     pdf_path = f'/output/{domain}.pdf'
-
-    return jsonify({
+    return {
         'domain': domain,
         'name': name,
+        'period': period.label,
         'preview': pdf_path,
         'download': pdf_path
-    })
+    }
 
-@app.route("/api/tenants")
+@api.route("/api/tenants")
 def gather_tenants_list():
-    tenants = gather_tenants()
+    tenants = auvik_report.gather_tenants()
     return jsonify(tenants)
 
-@app.route("/output/<path:filename>")
+@api.route("/output/<path:filename>")
 def serve_report(filename):
     return send_from_directory(OUTPUT_DIR, filename)
 
+app = create_app()
+
 if __name__ == "__main__":
     app.run(port=5555, debug=True)
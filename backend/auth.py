@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from threading import BoundedSemaphore
+from flask import current_app, session
+from flask_bcrypt import Bcrypt
+from typing import Optional
+from models import User
+import time
+
+bcrypt = Bcrypt()
+
+#Session key holding {"id", "email", "expires"} so /api/me can answer without the database
+IDENTITY_KEY = "identity"
+
+class AuthBusy(Exception):
+    """
+    Raised when every bcrypt slot is taken, or an admitted hash did not finish within BCRYPT_TIMEOUT
+    """
+
+def init_app(app) -> None:
+    """
+    Registers bcrypt, its bounded executor and the slots admitting calls to it; no threads start until the first login
+    """
+    bcrypt.init_app(app)
+    app.extensions["bcrypt_executor"] = ThreadPoolExecutor(max_workers=app.config["BCRYPT_WORKERS"], thread_name_prefix="bcrypt")
+    app.extensions["bcrypt_slots"] = BoundedSemaphore(app.config["BCRYPT_WORKERS"] + app.config["BCRYPT_QUEUE"])
+
+def _offload(fn, *args):
+    """
+    Runs a bcrypt call on the app's executor so at most BCRYPT_WORKERS hashes run at once
+
+    Only BCRYPT_WORKERS + BCRYPT_QUEUE calls are admitted; past that AuthBusy is raised at once, so at most
+    that many server threads ever wait on a hash and the rest stay free for reports and cheap requests.
+    An admitted call waits up to BCRYPT_TIMEOUT for its hash.
+    """
+    slots = current_app.extensions["bcrypt_slots"]
+    if not slots.acquire(blocking=False):
+        raise AuthBusy("Too many logins in progress")
+    future = current_app.extensions["bcrypt_executor"].submit(fn, *args)
+    # the slot stays taken until the hash is done or cancelled, even if the request gave up on it
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=current_app.config["BCRYPT_TIMEOUT"])
+    except TimeoutError:
+        future.cancel()
+        raise AuthBusy("Too many logins in progress")
+
+def hash_password(password: str) -> str:
+    """
+    Hashes a password on the bcrypt executor
+
+    Args:
+        password (str): The plain text password
+
+    Returns:
+        str: The bcrypt hash
+    """
+    return _offload(bcrypt.generate_password_hash, password).decode("utf-8")
+
+def check_password(hashed: str, password: str) -> bool:
+    """
+    Verifies a password on the bcrypt executor
+
+    Args:
+        hashed (str): The stored bcrypt hash
+        password (str): The plain text password
+
+    Returns:
+        bool: True when the password matches
+    """
+    return _offload(bcrypt.check_password_hash, hashed, password)
+
+def remember_identity(user: User) -> dict:
+    """
+    Logs the user in and caches their identity in the session for IDENTITY_TTL seconds
+
+    Args:
+        user (User): The authenticated user
+
+    Returns:
+        dict: The public identity, {"id", "email"}
+    """
+    identity = {"id": user.id, "email": user.email}
+    session["user_id"] = user.id
+    session[IDENTITY_KEY] = {**identity, "expires": time.time() + current_app.config["IDENTITY_TTL"]}
+    return identity
+
+def current_identity() -> Optional[dict]:
+    """
+    Returns the logged in user's identity from the session, reloading it from the database once the TTL runs out
+
+    Returns:
+        dict: {"id", "email"}, or None when nobody is logged in or the user no longer exists
+    """
+    user_id = session.get("user_id")
+    if not user_id:
+        return None
+    cached = session.get(IDENTITY_KEY)
+    if cached and cached["id"] == user_id and cached["expires"] > time.time():
+        return {"id": cached["id"], "email": cached["email"]}
+
+    user = User.query.filter_by(id=user_id).first()
+    if user is None:
+        forget_identity()
+        return None
+    return remember_identity(user)
+
+def forget_identity() -> None:
+    """
+    Logs the user out
+    """
+    session.pop("user_id", None)
+    session.pop(IDENTITY_KEY, None)
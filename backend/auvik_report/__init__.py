@@ -1,3 +1,22 @@
-from .generate_report import generate_report
-from .tenants import gather_tenants
-from .test_env import testEnv
\ No newline at end of file
+import importlib
+
+#Public names and the submodule that defines them; loaded on first access so importing the package stays cheap
+_EXPORTS = {
+    'generate_report': '.generate_report',
+    'gather_tenants': '.tenants',
+    'testEnv': '.test_env',
+    'render_metrics': '.metrics',
+    'profile_report': '.profiling',
+    'is_admin': '.profiling',
+    'resolve_period': '.production.period',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,227 @@
+from .production.fetchers import fetch_alert_history, fetch_open_alerts
+from .env import load_env
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+import os
+import time
+import sqlite3
+
+#Load the contents from the .env file
+load_env()
+
+DATA_DIR = Path('data')
+ALERT_DB = DATA_DIR / 'alerts' / 'alerts.sqlite'
+
+#Days of history pulled the first time a tenant is synced; covers the longest report period
+ALERT_BACKFILL_DAYS = int(os.getenv('ALERT_BACKFILL_DAYS', '90'))
+#Each incremental pull starts this many seconds before the watermark, for alerts Auvik records late
+ALERT_OVERLAP = 3600
+#Alert history can only be filtered by detection time, so open alerts that were resolved or dismissed since
+#are only noticed when the open set is re-fetched; this is how stale such a change may get between reports,
+#which reconcile before counting (see sync's reconcile argument)
+ALERT_RECONCILE_SECONDS = int(os.getenv('ALERT_RECONCILE_SECONDS', '21600'))
+#A tenant synced this recently answers from local state without any request
+ALERT_SYNC_SECONDS = int(os.getenv('ALERT_SYNC_SECONDS', '60'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    tenant TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    severity TEXT NOT NULL,
+    status TEXT NOT NULL,
+    dismissed INTEGER NOT NULL,
+    dispatched INTEGER NOT NULL,
+    detected REAL NOT NULL,
+    entity TEXT,
+    open INTEGER NOT NULL,
+    PRIMARY KEY (tenant, id)
+);
+CREATE INDEX IF NOT EXISTS alerts_open ON alerts (tenant, open, severity, status);
+CREATE INDEX IF NOT EXISTS alerts_detected ON alerts (tenant, detected);
+CREATE TABLE IF NOT EXISTS sync (
+    tenant TEXT PRIMARY KEY,
+    watermark REAL NOT NULL,
+    reconciled REAL NOT NULL,
+    synced REAL NOT NULL
+);
+"""
+
+#Database files whose schema exists already
+_ready = set()
+
+def connect() -> sqlite3.Connection:
+    """
+    Opens the alert database, creating it on first use
+
+    Returns:
+        sqlite3.Connection: A connection in WAL mode, so report workers can read while another syncs
+    """
+    ALERT_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(ALERT_DB, timeout=30)
+    if str(ALERT_DB) not in _ready:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        _ready.add(str(ALERT_DB))
+    return conn
+
+def _epoch(value: str) -> float:
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc).timestamp()
+
+def _format(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def alert_row(tenant: str, element: Dict) -> Tuple:
+    """
+    Flattens an alert history element into an alerts table row
+
+    Args:
+        tenant (str): The tenant ID
+        element (Dict): The JSON:API element
+
+    Returns:
+        Tuple: Values in alerts column order
+    """
+    attributes = element['attributes']
+    entity = element.get('relationships', {}).get('entity', {}).get('data') or {}
+    status = attributes['status']
+    dismissed = bool(attributes.get('dismissed'))
+    dispatched = bool(attributes.get('dispatched', True))
+    # the same test fetch_open_alerts filters on
+    is_open = status == 'created' and not dismissed and dispatched
+    return (tenant, element['id'], attributes.get('name'), attributes['severity'], status,
+            int(dismissed), int(dispatched), _epoch(attributes['detectedOn']), entity.get('id'), int(is_open))
+
+def _upsert(conn: sqlite3.Connection, rows: List[Tuple]) -> None:
+    conn.executemany('INSERT OR REPLACE INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+def sync(tenant: str, now: float = None, force: bool = False, reconcile: bool = False) -> Dict[str, int]:
+    """
+    Brings a tenant's local alert state up to date
+
+    Pulls only alerts detected since the watermark (the whole backfill on first use). Every
+    ALERT_RECONCILE_SECONDS the open set is re-fetched as well, closing alerts that left it.
+
+    Args:
+        tenant (str): The tenant ID
+        now (float): Epoch seconds, defaults to the current time
+        force (bool): Sync even if the tenant was synced within ALERT_SYNC_SECONDS
+        reconcile (bool): Only re-fetch the open set, unless that was done within ALERT_SYNC_SECONDS. It holds
+            every open alert, so open counts are current at the cost of the open query alone; the history
+            pull waits for the next plain sync
+
+    Returns:
+        Dict[str, int]: Alerts fetched, and alerts closed by reconciliation (-1 when it did not run)
+    """
+    now = time.time() if now is None else now
+    with closing(connect()) as conn:
+        state = conn.execute('SELECT watermark, reconciled, synced FROM sync WHERE tenant = ?', (tenant,)).fetchone()
+    reconcile_due = state is None or now - state[1] >= (ALERT_SYNC_SECONDS if reconcile else ALERT_RECONCILE_SECONDS)
+    recent = not reconcile_due if reconcile else not reconcile_due and now - state[2] < ALERT_SYNC_SECONDS
+    if state is not None and not force and recent:
+        return {'fetched': 0, 'closed': -1}
+
+    start = now - ALERT_BACKFILL_DAYS * 86400 if state is None else state[0] - ALERT_OVERLAP
+    if reconcile:
+        # watermark and sync time stay put, so the next plain sync still pulls everything detected since
+        fetched = []
+        watermark, synced = start + ALERT_OVERLAP, 0 if state is None else state[2]
+    else:
+        fetched = [alert_row(tenant, element) for element in fetch_alert_history(tenant, (start, now + 1))]
+        watermark, synced = now, now
+    open_rows = None
+    if reconcile or reconcile_due:
+        open_rows = [alert_row(tenant, element) for element in fetch_open_alerts(tenant)]
+
+    closed = -1
+    with closing(connect()) as conn, conn:
+        _upsert(conn, fetched)
+        if open_rows is not None:
+            _upsert(conn, open_rows)
+            still_open = {row[1] for row in open_rows}
+            stale = [(tenant, alert_id) for (alert_id,) in conn.execute(
+                'SELECT id FROM alerts WHERE tenant = ? AND open = 1', (tenant,)) if alert_id not in still_open]
+            # Auvik no longer lists them as open; status keeps the last value seen
+            conn.executemany('UPDATE alerts SET open = 0 WHERE tenant = ? AND id = ?', stale)
+            closed = len(stale)
+        reconciled = now if open_rows is not None else state[1]
+        conn.execute('INSERT OR REPLACE INTO sync VALUES (?, ?, ?, ?)', (tenant, watermark, reconciled, synced))
+    return {'fetched': len(fetched), 'closed': closed}
+
+def open_counts(tenant: str) -> List[Tuple[str, str, int]]:
+    """
+    Open alerts grouped by severity and status, from local state
+
+    Args:
+        tenant (str): The tenant ID
+
+    Returns:
+        List[Tuple[str, str, int]]: (severity, status, count) rows
+    """
+    with closing(connect()) as conn:
+        return conn.execute(
+            'SELECT severity, status, COUNT(*) FROM alerts WHERE tenant = ? AND open = 1 GROUP BY severity, status',
+            (tenant,)
+        ).fetchall()
+
+def severity_trend(tenant: str, start: float, end: float, bucket: int = 86400) -> Dict[float, Dict[str, int]]:
+    """
+    Alerts detected per bucket and severity, from local state
+
+    Args:
+        tenant (str): The tenant ID
+        start (float): Inclusive start in epoch seconds
+        end (float): Exclusive end in epoch seconds
+        bucket (int): Bucket width in seconds, aligned to start
+
+    Returns:
+        Dict[float, Dict[str, int]]: Bucket start to severity counts, empty buckets left out
+    """
+    trend = {}
+    with closing(connect()) as conn:
+        rows = conn.execute(
+            'SELECT CAST((detected - ?) / ? AS INTEGER), severity, COUNT(*) FROM alerts '
+            'WHERE tenant = ? AND detected >= ? AND detected < ? GROUP BY 1, 2 ORDER BY 1',
+            (start, bucket, tenant, start, end)
+        ).fetchall()
+    for index, severity, count in rows:
+        trend.setdefault(start + index * bucket, {})[severity] = count
+    return trend
+
+def history(tenant: str, start: float, end: float) -> List[Dict]:
+    """
+    Alerts detected within a window, from local state, shaped like alert history elements
+
+    Args:
+        tenant (str): The tenant ID
+        start (float): Inclusive start in epoch seconds
+        end (float): Exclusive end in epoch seconds
+
+    Returns:
+        List[Dict]: Elements with the attributes the reports read, oldest first
+    """
+    with closing(connect()) as conn:
+        rows = conn.execute(
+            'SELECT id, name, severity, status, dismissed, dispatched, detected, entity FROM alerts '
+            'WHERE tenant = ? AND detected >= ? AND detected < ? ORDER BY detected',
+            (tenant, start, end)
+        ).fetchall()
+    return [
+        {
+            'id': alert_id,
+            'type': 'alert',
+            'attributes': {
+                'alertId': alert_id,
+                'name': name,
+                'severity': severity,
+                'status': status,
+                'detectedOn': _format(detected),
+                'dismissed': bool(dismissed),
+                'dispatched': bool(dispatched),
+            },
+            'relationships': {'entity': {'data': {'id': entity, 'type': 'device'}}},
+        }
+        for alert_id, name, severity, status, dismissed, dispatched, detected, entity in rows
+    ]
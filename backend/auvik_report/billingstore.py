@@ -0,0 +1,254 @@
+from .production.fetchers import fetch_billing_usage
+from .env import load_env
+from . import metrics
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Tuple
+import os
+import sqlite3
+
+#Load the contents from the .env file
+load_env()
+
+DATA_DIR = Path('data')
+BILLING_DB = DATA_DIR / 'billing' / 'billing.sqlite'
+
+#Days of usage ingested the first time a tenant is synced; covers the previous full quarter
+BILLING_BACKFILL_DAYS = int(os.getenv('BILLING_BACKFILL_DAYS', '184'))
+#Concurrent requests while backfilling missing days
+BILLING_WORKERS = int(os.getenv('BILLING_WORKERS', '4'))
+#Missing days are fetched in runs of at most this many consecutive days, one paginated request chain each
+BILLING_CHUNK_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    tenant TEXT NOT NULL,
+    day TEXT NOT NULL,
+    client TEXT NOT NULL,
+    name TEXT,
+    domain TEXT,
+    devices INTEGER NOT NULL,
+    billable INTEGER NOT NULL,
+    PRIMARY KEY (tenant, day, client)
+);
+CREATE TABLE IF NOT EXISTS ingested (
+    tenant TEXT NOT NULL,
+    day TEXT NOT NULL,
+    at REAL NOT NULL,
+    PRIMARY KEY (tenant, day)
+);
+"""
+
+#Database files whose schema exists already
+_ready = set()
+
+def connect() -> sqlite3.Connection:
+    """
+    Opens the billing database, creating it on first use
+
+    Returns:
+        sqlite3.Connection: A connection in WAL mode, so report workers can read while another ingests
+    """
+    BILLING_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(BILLING_DB, timeout=30)
+    if str(BILLING_DB) not in _ready:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        _ready.add(str(BILLING_DB))
+    return conn
+
+def last_complete_day(now: float = None) -> date:
+    """
+    The most recent UTC day whose usage Auvik has finished counting
+    """
+    now = datetime.now(timezone.utc) if now is None else datetime.fromtimestamp(now, timezone.utc)
+    return now.date() - timedelta(days=1)
+
+def month_range(year: int, month: int) -> Tuple[date, date]:
+    """
+    First and last day of a calendar month
+    """
+    first = date(year, month, 1)
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return first, following - timedelta(days=1)
+
+def quarter_range(year: int, quarter: int) -> Tuple[date, date]:
+    """
+    First and last day of a calendar quarter (1-4)
+    """
+    first, _ = month_range(year, 3 * quarter - 2)
+    _, last = month_range(year, 3 * quarter)
+    return first, last
+
+def usage_row(tenant: str, element: Dict) -> Tuple:
+    """
+    Flattens a client usage element into a usage table row
+
+    Args:
+        tenant (str): The tenant ID
+        element (Dict): The JSON:API element
+
+    Returns:
+        Tuple: Values in usage column order
+    """
+    attributes = element['attributes']
+    return (tenant, attributes['date'], attributes.get('clientId') or element['id'], attributes.get('clientName'),
+            attributes.get('domainPrefix'), int(attributes.get('deviceCount') or 0),
+            int(attributes.get('billableDeviceCount') or 0))
+
+def missing_days(tenant: str, first: date, last: date) -> List[date]:
+    """
+    Days of a range that have not been ingested yet
+
+    Args:
+        tenant (str): The tenant ID
+        first (date): First day
+        last (date): Last day, inclusive
+
+    Returns:
+        List[date]: The missing days, oldest first
+    """
+    with closing(connect()) as conn:
+        have = {day for (day,) in conn.execute(
+            'SELECT day FROM ingested WHERE tenant = ? AND day >= ? AND day <= ?',
+            (tenant, first.isoformat(), last.isoformat()))}
+    days = []
+    day = first
+    while day <= last:
+        if day.isoformat() not in have:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+def day_runs(days: List[date], size: int = None) -> List[Tuple[date, date]]:
+    """
+    Groups sorted days into runs of consecutive days, each at most size long
+
+    Args:
+        days (List[date]): Sorted days
+        size (int): Longest run, defaults to BILLING_CHUNK_DAYS
+
+    Returns:
+        List[Tuple[date, date]]: (first, last) of each run
+    """
+    size = size or BILLING_CHUNK_DAYS
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][1] == timedelta(days=1) and (day - runs[-1][0]).days < size:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [(first, last) for first, last in runs]
+
+def _fetch_run(tenant: str, first: date, last: date) -> Tuple[List[Dict], float]:
+    """
+    Fetches one run of days on a pool thread, returning its elements with the requests it took
+    """
+    before = metrics.thread_total('auvik_requests_total')
+    elements = fetch_billing_usage(tenant, first.isoformat(), last.isoformat())
+    return elements, metrics.thread_total('auvik_requests_total') - before
+
+def ingest(tenant: str, first: date, last: date, now: float = None) -> int:
+    """
+    Ingests the usage of every day in a range that is not stored yet; each day is fetched once
+
+    Runs of missing days are fetched concurrently. Days after last_complete_day are never
+    ingested, since their counts may still change.
+
+    Args:
+        tenant (str): The tenant ID
+        first (date): First day
+        last (date): Last day, inclusive
+        now (float): Epoch seconds, defaults to the current time
+
+    Returns:
+        int: Number of days ingested
+    """
+    last = min(last, last_complete_day(now))
+    runs = day_runs(missing_days(tenant, first, last))
+    if not runs:
+        return 0
+    with ThreadPoolExecutor(max_workers=max(1, min(BILLING_WORKERS, len(runs))), thread_name_prefix='auvik-billing') as pool:
+        fetched = list(pool.map(lambda run: _fetch_run(tenant, *run), runs))
+    # requests made on pool threads count toward the report that asked for them
+    metrics.credit('auvik_requests_total', sum(requests_made for _, requests_made in fetched))
+
+    stamp = datetime.now(timezone.utc).timestamp() if now is None else now
+    ingested = 0
+    with closing(connect()) as conn, conn:
+        for (run_first, run_last), (elements, _) in zip(runs, fetched):
+            conn.executemany('INSERT OR REPLACE INTO usage VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             [usage_row(tenant, element) for element in elements])
+            days = [(tenant, (run_first + timedelta(days=n)).isoformat(), stamp)
+                    for n in range((run_last - run_first).days + 1)]
+            # days without any client usage are recorded too, so they are not fetched again
+            conn.executemany('INSERT OR REPLACE INTO ingested VALUES (?, ?, ?)', days)
+            ingested += len(days)
+    return ingested
+
+def sync(tenant: str, now: float = None) -> int:
+    """
+    Ingests every complete day of the last BILLING_BACKFILL_DAYS not stored yet
+
+    Args:
+        tenant (str): The tenant ID
+        now (float): Epoch seconds, defaults to the current time
+
+    Returns:
+        int: Number of days ingested
+    """
+    last = last_complete_day(now)
+    return ingest(tenant, last - timedelta(days=BILLING_BACKFILL_DAYS - 1), last, now)
+
+def daily_usage(tenant: str, first: date, last: date) -> List[Dict]:
+    """
+    Stored usage rows within a range, from local state
+
+    Args:
+        tenant (str): The tenant ID
+        first (date): First day
+        last (date): Last day, inclusive
+
+    Returns:
+        List[Dict]: One row per client and day, oldest first
+    """
+    with closing(connect()) as conn:
+        rows = conn.execute(
+            'SELECT day, client, name, domain, devices, billable FROM usage '
+            'WHERE tenant = ? AND day >= ? AND day <= ? ORDER BY day, client',
+            (tenant, first.isoformat(), last.isoformat())
+        ).fetchall()
+    return [
+        {'Date': day, 'Client': client, 'Name': name, 'Domain': domain, 'Devices': devices, 'Billable': billable}
+        for day, client, name, domain, devices, billable in rows
+    ]
+
+def range_usage(tenant: str, first: date, last: date, now: float = None) -> List[Dict]:
+    """
+    Billable device usage per client over a range such as a month or quarter
+
+    Missing days are ingested first; days already stored are answered locally.
+
+    Args:
+        tenant (str): The tenant ID
+        first (date): First day
+        last (date): Last day, inclusive
+        now (float): Epoch seconds, defaults to the current time
+
+    Returns:
+        List[Dict]: Per client: days reported, average and peak billable devices, and billable device-days
+    """
+    ingest(tenant, first, last, now)
+    with closing(connect()) as conn:
+        rows = conn.execute(
+            'SELECT client, name, domain, COUNT(*), AVG(billable), MAX(billable), SUM(billable) FROM usage '
+            'WHERE tenant = ? AND day >= ? AND day <= ? GROUP BY client ORDER BY name, client',
+            (tenant, first.isoformat(), last.isoformat())
+        ).fetchall()
+    return [
+        {'Client': client, 'Name': name, 'Domain': domain, 'Days': days,
+         'Average Billable': round(average, 1), 'Peak Billable': peak, 'Device Days': total}
+        for client, name, domain, days, average, peak, total in rows
+    ]
@@ -1,6 +1,8 @@
 import os
-import json
+import gzip
 import time
+import struct
+from . import jsoncodec
 from pathlib import Path
 from typing import Dict
 
@@ -8,9 +10,15 @@ DATA_DIR = Path('data')
 CACHE_DIR = DATA_DIR / 'cache'
 CACHE_TTL = 3600
 
+#Cache file header: magic and format version, followed by gzip-compressed JSON
+CACHE_HEADER = struct.Struct('<4sB')
+CACHE_MAGIC = b'AVRC'
+CACHE_VERSION = 1
+CACHE_LEVEL = 6
+
 def set_file_path(tenant: str) -> str:
     """
-    Uses the tenant name to create a path to JSON file
+    Uses the tenant name to create a path to its cache file
 
     Args:
         Tenant (str): The name of the tenant
@@ -18,7 +26,58 @@ def set_file_path(tenant: str) -> str:
     Returns:
         str: The file path
     """
-    return f'{CACHE_DIR}/{tenant}_cache.json'
+    return f'{CACHE_DIR}/{tenant}_cache.avrc'
+
+def encode_cache(document: Dict) -> bytes:
+    """
+    Serializes a cache document as a versioned, gzip-compressed blob
+
+    Args:
+        document (Dict): The timestamped cache document
+
+    Returns:
+        bytes: Header followed by the compressed JSON
+    """
+    body = gzip.compress(jsoncodec.dumps(document), compresslevel=CACHE_LEVEL, mtime=0)
+    return CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION) + body
+
+def decode_cache(blob: bytes) -> Dict:
+    """
+    Reads a cache file written by encode_cache
+
+    Args:
+        blob (bytes): The file contents
+
+    Returns:
+        Dict: The cache document, or None if it has no cache header or is from an unknown format version
+    """
+    if blob[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+        return None
+    _, version = CACHE_HEADER.unpack_from(blob)
+    if version != CACHE_VERSION:
+        return None
+    return jsoncodec.loads(gzip.decompress(blob[CACHE_HEADER.size:]))
+
+def read_cache(tenant: str) -> Dict:
+    """
+    Reads a tenant's cache document regardless of age
+
+    Args:
+        tenant (str): The name of the tenant
+
+    Return:
+        Dict: {"timestamp", "data"}, or None if there is no readable cache file
+    """
+    file = set_file_path(tenant)
+    if not os.path.exists(file):
+        return None
+    with open(file, 'rb') as f:
+        blob = f.read()
+    try:
+        return decode_cache(blob)
+    except (OSError, ValueError, EOFError):
+        # a truncated or corrupt file is just a miss
+        return None
 
 def get_cache(tenant: str) -> Dict:
     """
@@ -30,12 +89,9 @@ def get_cache(tenant: str) -> Dict:
     Return:
         Dict: Cached data
     """
-    file = set_file_path(tenant)
-    if os.path.exists(file):
-        with open(file, 'r') as f:
-            cache = json.load(f)
-        if time.time() - cache.get("timestamp", 0) < CACHE_TTL:
-            return cache.get("data")
+    cache = read_cache(tenant)
+    if cache and time.time() - cache.get("timestamp", 0) < CACHE_TTL:
+        return cache.get("data")
     return None
 
 def set_cache(data: Dict, tenant: str) -> None:
@@ -55,5 +111,5 @@ def set_cache(data: Dict, tenant: str) -> None:
 
     CACHE_DIR.mkdir(exist_ok=True)
 
-    with open(file, 'w') as f:
-        json.dump({"timestamp": time.time(), "data": data}, f)
+    with open(file, 'wb') as f:
+        f.write(encode_cache({"timestamp": time.time(), "data": data}))
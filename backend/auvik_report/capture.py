@@ -0,0 +1,142 @@
+from collections import deque
+from pathlib import Path
+import os
+import json
+import time
+import atexit
+import random
+import threading
+from .env import load_env
+
+#Load the contents from the .env file
+load_env()
+
+DATA_DIR = Path('data')
+CAPTURE_DIR = DATA_DIR / 'capture'
+CAPTURE_FILE = 'responses.jsonl'
+ERROR_FILE = 'errors.log'
+
+#Capture is off unless DEBUG_CAPTURE=1, so the fetch path only pays for one boolean check
+CAPTURE_ENABLED: bool = os.getenv('DEBUG_CAPTURE', '0') == '1'
+CAPTURE_SAMPLE_RATE: float = float(os.getenv('DEBUG_CAPTURE_SAMPLE_RATE', '1.0'))
+CAPTURE_BUFFER_SIZE: int = int(os.getenv('DEBUG_CAPTURE_BUFFER', '256'))
+FLUSH_INTERVAL = 2.0
+
+_responses = deque(maxlen=CAPTURE_BUFFER_SIZE)
+_errors = deque(maxlen=CAPTURE_BUFFER_SIZE)
+_wake = threading.Event()
+_writer_lock = threading.Lock()
+_writer = None
+dropped = 0
+
+def capture_response(response) -> None:
+    """
+    Records a raw API response in the ring buffer when debug capture is enabled
+
+    Args:
+        response: Response object from the requests library
+
+    Returns:
+        None
+    """
+    global dropped
+    if not CAPTURE_ENABLED:
+        return
+    if CAPTURE_SAMPLE_RATE < 1.0 and random.random() >= CAPTURE_SAMPLE_RATE:
+        return
+    if len(_responses) == _responses.maxlen:
+        dropped += 1
+    # Keep the raw bytes, encoding happens on the writer thread
+    _responses.append((time.time(), response.status_code, response.url, response.content))
+    _start_writer()
+
+def capture_error(response) -> None:
+    """
+    Queues a failed API response to be appended to the error log by the background writer
+
+    Args:
+        response: Response object from the requests library
+
+    Returns:
+        None
+    """
+    _errors.append((response.status_code, response.url, response.text))
+    _start_writer()
+    _wake.set()
+
+def flush() -> None:
+    """
+    Drains both buffers to disk
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+    responses = _drain(_responses)
+    errors = _drain(_errors)
+    if not responses and not errors:
+        return
+
+    DATA_DIR.mkdir(exist_ok=True)
+
+    CAPTURE_DIR.mkdir(exist_ok=True)
+
+    if responses:
+        with open(CAPTURE_DIR / CAPTURE_FILE, 'a', encoding='utf-8') as f:
+            for captured_at, status, url, body in responses:
+                f.write(json.dumps({
+                    'time': captured_at,
+                    'status': status,
+                    'url': url,
+                    'body': body.decode('utf-8', errors='replace')
+                }) + '\n')
+
+    if errors:
+        with open(CAPTURE_DIR / ERROR_FILE, 'a', encoding='utf-8') as f:
+            for status, url, text in errors:
+                f.write(f"\n[HTTP {status}] {url}\n")
+                f.write(text + "\n")
+
+def _drain(buffer: deque) -> list:
+    """
+    Pops every entry currently in a buffer without blocking producers
+
+    Args:
+        buffer (deque): The ring buffer to empty
+
+    Returns:
+        list: The drained entries, oldest first
+    """
+    items = []
+    while True:
+        try:
+            items.append(buffer.popleft())
+        except IndexError:
+            return items
+
+def _writer_loop() -> None:
+    """
+    Background thread that flushes the buffers every FLUSH_INTERVAL seconds or when woken
+    """
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            flush()
+        except OSError as e:
+            print(f"[WARNING] Debug capture flush failed: {e}")
+
+def _start_writer() -> None:
+    """
+    Lazily starts the background writer the first time something is captured
+    """
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name='debug-capture-writer', daemon=True)
+            _writer.start()
+            atexit.register(flush)
@@ -1,5 +1,6 @@
 import json
 import requests
+from auvik_report.capture import capture_error
 
 def response_csv(response) -> None:
     """
@@ -21,7 +22,7 @@ def response_csv(response) -> None:
 
 def error_output(response) -> None:
     """
-    Takes a response from the API that is causing errors and outputs the errors into a CSV file.
+    Takes a response from the API that is causing errors and queues the errors for the error log.
 
     Args:
         response: Response object from the requests library.
@@ -41,9 +42,7 @@ def error_output(response) -> None:
         except json.JSONDecodeError:
             print("[WARNING] Response did not contain valid JSON.")
 
-        # Optionally, write to a log file:
-        with open("errors.log", "a") as f:
-            f.write(f"\n[HTTP {response.status_code}] {response.url}\n")
-            f.write(response.text + "\n")
+        # Queue for the background writer instead of appending to errors.log inline
+        capture_error(response)
 
         raise  # Re-raise the HTTPError to stop execution if needed
\ No newline at end of file
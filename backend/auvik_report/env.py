@@ -0,0 +1,14 @@
+from dotenv import load_dotenv
+from functools import lru_cache
+
+ENV_FILE = '.env'
+
+@lru_cache(maxsize=None)
+def load_env() -> bool:
+    """
+    Loads the .env file into os.environ once per process, so every module can call it at import for free
+
+    Returns:
+        bool: True if a .env file was found
+    """
+    return load_dotenv(ENV_FILE)
@@ -1,22 +1,25 @@
-from dotenv import load_dotenv
 from typing import List, Dict
 import os
 import sys
+import time
 import requests
 from datetime import date, timedelta
 from requests.auth import HTTPBasicAuth
+from auvik_report.env import load_env
 
 #Adds root directory to import path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 #Imports debug helper functions
-from auvik_report.debugFunctions import response_csv, error_output
+from auvik_report.debugFunctions import error_output
+from auvik_report.capture import capture_response
+from auvik_report import jsoncodec, alertstore, billingstore
 
 #imports date range function
 from auvik_report.production.fetchers import format_date_range
 
 #Load the contents from the .env file
-load_dotenv('.env')
+load_env()
 
 #Get the data you need to use in your code
 auvik_username: str = os.getenv('AUVIK_USERNAME')
@@ -27,25 +30,17 @@ def fetch_alert_history(tenant: str) -> List[Dict]:
     """
     Fetches alert history for a tenant over a 30 day period
 
+    Reads the local alert state after an incremental sync instead of pulling 30 days from the API each time.
+
     Args:
         str: id of the tenant
 
     Returns:
         List[Dict]: A list containing all alert history elements
     """
-    date_start, date_end = format_date_range(30)
-    url = f'{base_url}/alert/history/info?tenants={tenant}&filter[detectedTimeAfter]={date_start}&filter[detectedTimeBefore]={date_end}'
-    all_items = []
-    while url:
-        response = requests.get(url, auth=HTTPBasicAuth(auvik_username, auvik_api_key), headers={"Accept": "application/vnd.api+json"})
-        response.raise_for_status()
-        body = response.json()
-
-        all_items.extend(body.get('data', []))
-
-        links = body.get('links', {})
-        url = links.get('next')
-    return all_items
+    alertstore.sync(tenant)
+    end = time.time()
+    return alertstore.history(tenant, end - 30 * 86400, end + 1)
 
 def fetch_single_device_info(device_id: str) -> dict:
     """
@@ -61,7 +56,7 @@ def fetch_single_device_info(device_id: str) -> dict:
     response = requests.get(url, auth=HTTPBasicAuth(auvik_username, auvik_api_key), headers={"Accept": "application/vnd.api+json"})
     error_output(response)
     response.raise_for_status()
-    return response.json()["data"]
+    return jsoncodec.loads(response.content)["data"]
 
 def fetch_device_info(tenant: str)-> List[Dict]:
     """
@@ -78,7 +73,7 @@ def fetch_device_info(tenant: str)-> List[Dict]:
     while url:
         response = requests.get(url, auth=HTTPBasicAuth(auvik_username, auvik_api_key), headers={"Accept": "application/vnd.api+json"})
         response.raise_for_status()
-        body = response.json()
+        body = jsoncodec.loads(response.content)
 
         all_items.extend(body.get('data', []))
 
@@ -101,9 +96,9 @@ def fetch_device_info_status(tenant: str, status: str = 'online' ) -> List[Dict]
     all_items = []
     while url:
         response = requests.get(url, auth=HTTPBasicAuth(auvik_username, auvik_api_key), headers={"Accept": "application/vnd.api+json"})
-        response_csv(response)
+        capture_response(response)
         response.raise_for_status()
-        body = response.json()
+        body = jsoncodec.loads(response.content)
 
         all_items.extend(body.get('data', []))
 
@@ -133,7 +128,7 @@ def fetch_L2_Devices(tenant: str) -> List[Dict]:
         while url_copy:
             response = requests.get(url_copy, auth=HTTPBasicAuth(auvik_username, auvik_api_key), headers={"Accept": "application/vnd.api+json"})
             response.raise_for_status()
-            body = response.json()
+            body = jsoncodec.loads(response.content)
 
             all_items.extend(body.get('data', []))
 
@@ -155,7 +150,7 @@ def fetch_interface_info (interface: str) -> List[Dict]:
     response = requests.get(url, auth=HTTPBasicAuth(auvik_username, auvik_api_key), headers={"Accept": "application/vnd.api+json"})
     error_output(response)
     response.raise_for_status()
-    return response.json()["data"]
+    return jsoncodec.loads(response.content)["data"]
 
 def fetch_interfaces_by_type(tenant: str, type: str = 'ethernet') -> List[Dict]:
     """
@@ -170,7 +165,7 @@ def fetch_interfaces_by_type(tenant: str, type: str = 'ethernet') -> List[Dict]:
     while url:
         response = requests.get(url, auth=HTTPBasicAuth(auvik_username, auvik_api_key), headers={"Accept": "application/vnd.api+json"})
         response.raise_for_status()
-        body = response.json()
+        body = jsoncodec.loads(response.content)
 
         all_items.extend(body.get('data', []))
 
@@ -193,7 +188,7 @@ def fetch_network_info(tenant: str) -> List[Dict]:
     while url:
         response = requests.get(url, auth=HTTPBasicAuth(auvik_username, auvik_api_key), headers={"Accept": "application/vnd.api+json"})
         response.raise_for_status()
-        body = response.json()
+        body = jsoncodec.loads(response.content)
 
         all_items.extend(body.get('data', []))
 
@@ -216,25 +211,17 @@ def generate_date_filters(days_back: int) -> dict:
 
 def fetch_billing_usage(tenant: str) -> List[Dict]:
     """
-    Sends request to get billing usage for a tenant
+    Gets billing usage for a tenant over the last complete 30 days
+
+    Reads the local billing table, ingesting only the days it does not have yet.
 
     Args:
-        tenant (str): 
+        tenant (str): id of the tenant
 
     Returns:
-        List[Dict]: A list containing all the "data" from the networks
+        List[Dict]: One usage row per client and day
     """
-    # start, end = generate_date_filters(1)
-    url = f'{base_url}/billing/usage/client?tenants={tenant}&filter[fromDate]=2025-09-08&filter[thruDate]=2025-09-08'
-    all_items = []
-    while url:
-        response = requests.get(url, auth=HTTPBasicAuth(auvik_username, auvik_api_key), headers={"Accept": "application/vnd.api+json"})
-        response_csv(response)
-        response.raise_for_status()
-        body = response.json()
-
-        all_items.extend(body.get('data', []))
-
-        links = body.get('links', {})
-        url = links.get('next')
-    return all_items
\ No newline at end of file
+    last = billingstore.last_complete_day()
+    first = last - timedelta(days=29)
+    billingstore.ingest(tenant, first, last)
+    return billingstore.daily_usage(tenant, first, last)
\ No newline at end of file
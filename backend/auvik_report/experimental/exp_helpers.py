@@ -1,9 +1,10 @@
 from auvik_report.production.fetchers import fetch_interface_stats
+from auvik_report.production.series import InterfaceSeries
 from .exp_fetchers import fetch_interface_info
+from auvik_report.production.topk import TopK
 from typing import List, Dict
-import heapq
 
-def L2_interfaces(L2: str) -> List[Dict]:
+def L2_interfaces(L2: str) -> List[InterfaceSeries]:
     """
     Uses L2 devices and gets a set type of interfaces (ethernet, wifi, virtual nic)
 
@@ -22,44 +23,35 @@ def L2_interfaces(L2: str) -> List[Dict]:
             interfacesAll.extend(interfaces)
     return interfacesAll
 
-def top_ten(interfaces: List[Dict]) -> List[Dict]:
+def top_interfaces(interfaces: List[InterfaceSeries], k: int = 10) -> List[Dict]:
     """
-    Gets the top 10 interfaces receiving the most broadcast packets on a network
+    Gets the top k interfaces receiving the most broadcast packets on a network
 
     Args:
-        Interfaces: The set of interfaces
+        Interfaces (List[InterfaceSeries]): The broadcast packet series per interface
+        k (int): How many interfaces to return
 
     Returns:
-        List[Dict]: The top 10 interfaces
+        List[Dict]: The top k interfaces, highest average first
     """
-    top = {}
-    minimum = []
+    top = TopK(k)
     for interface in interfaces:
-        stats = interface['attributes']['stats'][0]['data']
-        if len(stats) > 0:
-            interfaceID = interface['id']
-            interfaceName = interface['relationships']['interface']['data']['interfaceName']
-            parentDevice = interface['relationships']['interface']['data']['parentDevice']
+        if len(interface) > 0:
+            interfaceID = interface.id
+            interfaceName = interface.interface_name
+            parentDevice = interface.parent_device
             info = fetch_interface_info(interfaceID)
             negotiatedSpeed = info['attributes']['negotiatedSpeed']
             if negotiatedSpeed != '10000000000':
-                total = 0
-                for entry in stats:
-                    if entry[2] < 1000:
-                        total += entry[2]
-                average = total / len(stats)
-                if len(top) < 10 or average > minimum[0][0]:
-                    if len(top) >= 10:
-                        lowest_avg, lowest_key = heapq.heappop(minimum)
-                        del top[lowest_key]
-                    top[interfaceID] = {
-                            'parent': parentDevice,
-                            'parentType': 'None',
-                            'network': 'None',
-                            'interface': interfaceName,
-                            'average': average
-                        }
-                    heapq.heappush(minimum, (average, interfaceID))
+                total = sum(received for received in interface.columns[1] if received < 1000)
+                average = total / len(interface)
+                top.push({
+                        'parent': parentDevice,
+                        'parentType': 'None',
+                        'network': 'None',
+                        'interface': interfaceName,
+                        'average': average
+                    }, average)
             else:
                 print("Threw a big boy out!!!")
-    return sorted(top.values(), key=lambda d: d['average'], reverse=True)
\ No newline at end of file
+    return top.items()
\ No newline at end of file
@@ -1,9 +1,9 @@
-from dotenv import load_dotenv
 from typing import List, Dict
 from datetime import datetime
 from collections import defaultdict
 import os
 import sys
+from auvik_report.env import load_env
 
 #Adds root directory to import path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -12,16 +12,31 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from .exp_fetchers import fetch_device_info_status, fetch_device_info, fetch_network_info, fetch_L2_Devices, fetch_single_device_info
 
 #import helpers
-from .exp_helpers import L2_interfaces, top_ten
+from .exp_helpers import L2_interfaces, top_interfaces
 
 #Load the contents from the .env file
-load_dotenv('.env')
+load_env()
 
 #Get the data you need to use in your code
 auvik_username: str = os.getenv('AUVIK_USERNAME')
 auvik_api_key: str = os.getenv('AUVIK_API_KEY')
 base_url: str = os.getenv('BASE_URL')
 
+#Device types fetch_L2_Devices requests one by one
+L2_TYPES = ('switch', 'stack', 'bridge', 'l3Switch')
+
+def l2_devices(inventory: List[Dict]) -> List[Dict]:
+    """
+    The layer 2 devices fetch_L2_Devices would return, picked out of the tenant's device elements
+
+    Args:
+        inventory (List[Dict]): Every device element of the tenant
+
+    Returns:
+        List[Dict]: Switch, stack, bridge and L3 switch elements
+    """
+    return [device for device in inventory if device['attributes'].get('deviceType') in L2_TYPES]
+
 def filter_alert_type(alert_history: List[Dict]) -> List[Dict]:
     """
     Takes the alert history response and categorises alerts by severity
@@ -45,17 +60,21 @@ def filter_alert_type(alert_history: List[Dict]) -> List[Dict]:
     return counts
 
 
-def offline_devices(tenant: str) -> List[Dict]:
+def offline_devices(tenant: str, inventory: List[Dict] = None) -> List[Dict]:
     """
     Takes a tenant ID, calls the device API and reports all devices with an offline status, notes device name, last seen, and network
 
     Args:
         str: The tenant ID
+        inventory (List[Dict]): Every device element of the tenant, filtered here instead of requesting offline devices
 
     Returns:
         List[Dict]:  A list containing all onfline devices and info
     """
-    devices = fetch_device_info_status(tenant, 'offline')
+    if inventory is None:
+        devices = fetch_device_info_status(tenant, 'offline')
+    else:
+        devices = [device for device in inventory if device['attributes'].get('onlineStatus') == 'offline']
     if len(devices) == 0:
         return []
     else:
@@ -75,17 +94,18 @@ def offline_devices(tenant: str) -> List[Dict]:
             )
     return offline_devices
 
-def device_invetory(tenant: str) -> Dict[str, int]:
+def device_invetory(tenant: str, inventory: List[Dict] = None) -> Dict[str, int]:
     """
     Uses the API device response to generate a summary of all device type and number of devices of those types on the network
 
     Args:
         Tenant (str): The tenant ID
+        inventory (List[Dict]): Every device element of the tenant, fetched here if None
 
     Returns:
         Dict[str, str]: Counts of devices of each type
     """
-    devices = fetch_device_info(tenant)
+    devices = fetch_device_info(tenant) if inventory is None else inventory
     if len(devices) == 0:
         return {
             'No Devices' : 0
@@ -109,17 +129,18 @@ def network_count(networks_info: List[Dict]) -> int:
     """
     return len(networks_info)
 
-def network_ids(tenant: str) -> List[Dict]:
+def network_ids(tenant: str, networks_info: List[Dict] = None) -> List[Dict]:
     """
     Uses the network_info gained from the API to obtain IDs for each network found
 
     Args: 
         Tenant (str): The tenant ID
+        networks_info (List[Dict]): Every network element of the tenant, fetched here if None
 
     Returns:
         List[Dict]: A list containg each network and network name
     """
-    networks_info = fetch_network_info(tenant)
+    networks_info = fetch_network_info(tenant) if networks_info is None else networks_info
     network_ids = []
     for network in networks_info:
         name = network['attributes']['networkName']
@@ -133,22 +154,27 @@ def network_ids(tenant: str) -> List[Dict]:
         network_ids.append(network_element)
     return network_ids
 
-def top_broadcasters(tenant: str) -> List[Dict]:
+def top_broadcasters(tenant: str, inventory: List[Dict] = None, interfaces: List = None) -> List[Dict]:
     """
     Identifies the devices sending the most broadcast packets
 
     Args:
         Tenant (str): The tenant ID
+        inventory (List[Dict]): Every device element of the tenant; the L2 devices and the parent device
+            details are read from it instead of being requested
+        interfaces (List[InterfaceSeries]): Already fetched L2_interfaces, fetched here if None
 
     Returns:
         List[Dict]: The top 5 broadcasters
     """    
-    L2 = fetch_L2_Devices(tenant)
-    interfaces = L2_interfaces(L2)
-    top10 = top_ten(interfaces)
+    by_id = {} if inventory is None else {device['id']: device for device in inventory}
+    if interfaces is None:
+        L2 = fetch_L2_Devices(tenant) if inventory is None else l2_devices(inventory)
+        interfaces = L2_interfaces(L2)
+    top10 = top_interfaces(interfaces)
     for port in top10:
         parentID = port['parent']
-        deviceInfo = fetch_single_device_info(parentID)
+        deviceInfo = by_id.get(parentID) or fetch_single_device_info(parentID)
         port['parent'] = deviceInfo['attributes']['deviceName']
         port['parentType'] = deviceInfo['attributes']['deviceType']
         networks =  deviceInfo['relationships']['networks']['data']
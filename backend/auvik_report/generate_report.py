@@ -1,15 +1,13 @@
-from .production import uptime_report, open_alerts, bandwidth_report, device_health
+from .sections import REPORT_SECTIONS, REPORT_EXTRA_SECTIONS, gather_sections
+from .production.period import ReportPeriod, resolve_period, snapshot
 from .tenants import populate_tenants
 from .cache import get_cache, set_cache
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from datetime import datetime
+from .env import load_env
+from . import metrics, jsoncodec, progress, warmer
 from pathlib import Path
-from dotenv import load_dotenv
-import pdfkit
 import os
-import json
 
-load_dotenv('.env')
+load_env()
 
 WKHTML_PATH = os.getenv("WKHTMLTOPDF_PATH")
 
@@ -21,33 +19,40 @@ TEMPLATE_NAME = "report.html"
 OUTPUT_DIR = BASE_DIR.parent / "output"
 
 
-def gather_data(tenant_id: str, tenant_name: str):
+def gather_data(tenant_id: str, tenant_name: str, period: ReportPeriod = None, refresh: bool = False):
     """
     Pulls either fresh data or cached data
 
     Args:
         tenant_id (str): The tenant ID
         tenant_name (str): The tenant name
+        period (ReportPeriod): The report period, defaults to the last 30 days
+        refresh (bool): Skip the cache lookup and demand tracking (used by the cache warmer and the profiler)
     
     Return:
         data (dict): The tenant report data
     """
-    cached = get_cache(tenant_name)
+    with snapshot():
+        return _gather_data(tenant_id, tenant_name, resolve_period(period), refresh)
+
+def _gather_data(tenant_id: str, tenant_name: str, period: ReportPeriod, refresh: bool):
+    cache_name = f'{tenant_name}-{period.label}'
+    cached = None if refresh else get_cache(cache_name)
+    if not refresh:
+        warmer.record_request(tenant_id, tenant_name, period.label, hit=bool(cached))
     if cached:
+        for section in cached:
+            metrics.inc('report_cache_total', (tenant_name, section, 'hit'))
+        progress.emit('cache', status='hit')
         return cached
-    uptime = uptime_report(tenant_id)
-    alerts = open_alerts(tenant_id)
-    bandwidth = bandwidth_report(tenant_id)
-    health = device_health(tenant_id)
-
-    data = {
-        "uptime": uptime,
-        "alerts": alerts,
-        "bandwidth": bandwidth,
-        "health": health
-    }
+    names = REPORT_SECTIONS + REPORT_EXTRA_SECTIONS
+    for section in names:
+        metrics.inc('report_cache_total', (tenant_name, section, 'miss'))
+
+    # each input (inventory, availability, every stat query) is fetched once, however many sections use it
+    data = gather_sections(tenant_id, period, names)
 
-    set_cache(data, tenant_name)
+    set_cache(data, cache_name)
     return data
 
 def gather_tenants():
@@ -65,54 +70,64 @@ def gather_tenants():
     if not os.path.exists(domain_id_file):
         populate_tenants()
     
-    with open(domain_id_file, 'r') as f:
-            domain_id = json.load(f).get('data')
+    domain_id = jsoncodec.load(domain_id_file).get('data')
 
     domain_name_file = 'data/tenants/domain_name.json'
     if not os.path.exists(domain_name_file):
         populate_tenants()
     
-    with open(domain_name_file, 'r') as f:
-            domain_name = json.load(f).get('data')
+    domain_name = jsoncodec.load(domain_name_file).get('data')
     
     return domain_id, domain_name
 
 
-def generate_report(tenant_domain) -> str:
+def generate_report(tenant_domain, period=None, refresh=False) -> str:
+    # imported here so web workers and the CLI only pay for them when a report is rendered
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+    import pdfkit
+
     # Jinja env (your existing structure)
     env = Environment(
         loader=FileSystemLoader(str(TEMPLATE_DIR)),
         autoescape=select_autoescape(["html", "xml"]),
     )
 
-    domain_id, domain_name = gather_tenants()
+    with progress.phase('tenants'):
+        domain_id, domain_name = gather_tenants()
 
-    if tenant_domain not in domain_id:
-        populate_tenants()    
-    tenant_id = domain_id[tenant_domain]
+        if tenant_domain not in domain_id:
+            # the tenant may be new since the files were written
+            populate_tenants()
+            domain_id, domain_name = gather_tenants()
+        tenant_id = domain_id[tenant_domain]
+    period = resolve_period(period)
 
     # gather data
-    data = gather_data(tenant_id, tenant_domain)
+    data = gather_data(tenant_id, tenant_domain, period, refresh)
     uptime = data['uptime']
+    # caches written before outage detection have no 'outages'
+    outages = data.get('outages', {'timeline': [], 'longest': []})
     alerts = data['alerts']
     bandwidth = data['bandwidth']
+    # caches written before the per-network breakdown have no 'networks'
+    networks = data.get('networks', [])
     health = data['health']
     name = domain_name[tenant_domain]
 
-    #get date (Month Year)
-    now = datetime.now()
-    month_year = now.strftime("%B %Y")
-
     # render HTML
-    html = env.get_template(TEMPLATE_NAME).render(
-        name=name,
-        date=month_year,
-        uptime=uptime,
-        alerts=alerts,
-        bandwidth=bandwidth,
-        health=health,
-        assets_dir=str(ASSETS_DIR)
-    )
+    with metrics.timer('report_render_seconds'), progress.phase('html'):
+        html = env.get_template(TEMPLATE_NAME).render(
+            name=name,
+            date=period.heading,
+            windows=[label for label, _ in period.windows()],
+            uptime=uptime,
+            outages=outages,
+            alerts=alerts,
+            bandwidth=bandwidth,
+            networks=networks,
+            health=health,
+            assets_dir=str(ASSETS_DIR)
+        )
 
     # ensure output folder
     OUTPUT_DIR.mkdir(exist_ok=True)
@@ -143,6 +158,7 @@ def generate_report(tenant_domain) -> str:
     }
 
     # Use from_file so relative paths in HTML resolve nicely
-    pdfkit.from_file(str(HTML_OUT), str(PDF_OUT), configuration=cfg, options=options)
+    with metrics.timer('report_pdf_seconds'), progress.phase('pdf'):
+        pdfkit.from_file(str(HTML_OUT), str(PDF_OUT), configuration=cfg, options=options)
 
     return name
\ No newline at end of file
@@ -0,0 +1,259 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from pathlib import Path
+from typing import Dict, Optional
+import os
+import re
+import gzip
+import time
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+from . import jsoncodec
+from .cache import CACHE_LEVEL
+from .env import load_env
+
+#Load the contents from the .env file
+load_env()
+
+DATA_DIR = Path('data')
+HTTP_CACHE_DIR = DATA_DIR / 'http'
+
+#Keep Auvik GET responses on disk and revalidate them with If-None-Match / If-Modified-Since
+HTTP_CACHE: bool = os.getenv('HTTP_CACHE', '1') == '1'
+#Seconds a stored response with an ETag or Last-Modified is reused without asking Auvik, unless it sent its
+#own Cache-Control max-age; a response with neither validators nor max-age is never reused
+HTTP_CACHE_FRESH: int = int(os.getenv('HTTP_CACHE_FRESH', '300'))
+#Entries not stored or revalidated for this long are deleted by prune()
+HTTP_CACHE_RETENTION = 86400
+#store() runs prune() at most this often, so the cache stays bounded whether or not the warmer runs
+HTTP_CACHE_PRUNE_SECONDS = 3600
+
+#Entry file header: magic and metadata length, followed by the JSON metadata and the gzip-compressed body
+ENTRY_HEADER = struct.Struct('<4sI')
+ENTRY_MAGIC = b'AVH2'
+#Entries written before bodies were compressed; still read, never written
+ENTRY_MAGIC_RAW = b'AVH1'
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+log = logging.getLogger(__name__)
+
+class CachedResponse:
+    """
+    A stored response body with the validators needed to revalidate it
+
+    Attributes:
+        url (str): The normalized request URL
+        body (bytes): The decoded (uncompressed) response body
+        etag (str): ETag header, or None
+        last_modified (str): Last-Modified header, or None
+        stored (float): Epoch seconds the body was last confirmed current
+        max_age (int): Seconds after stored the body is used without revalidating
+    """
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'stored', 'max_age')
+
+    def __init__(self, url: str, body: bytes, etag: str = None, last_modified: str = None,
+                 stored: float = None, max_age: int = 0):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored = time.time() if stored is None else stored
+        self.max_age = max_age
+
+    def fresh(self, now: float = None) -> bool:
+        """
+        True while the body can be used without a request
+        """
+        now = time.time() if now is None else now
+        return now - self.stored < self.max_age
+
+    def validators(self) -> Dict[str, str]:
+        """
+        Conditional request headers for revalidating the body
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a request URL: lower-case scheme and host, query parameters sorted, no fragment
+
+    Args:
+        url (str): The request URL
+
+    Returns:
+        str: The cache key URL
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)), safe='[],:')
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+def entry_path(url: str) -> Path:
+    """
+    Path of the cache entry for a request URL
+
+    Args:
+        url (str): The request URL, normalized here
+
+    Returns:
+        Path: The .bin entry file
+    """
+    digest = hashlib.sha256(normalize_url(url).encode()).hexdigest()
+    return HTTP_CACHE_DIR / digest[:2] / f'{digest}.bin'
+
+def _max_age(headers, validated: bool = False) -> Optional[int]:
+    """
+    How long a response may be reused without revalidating, or None if it must not be stored
+
+    Without a max-age, HTTP_CACHE_FRESH only applies to a body that can be revalidated (validated, or the
+    response carries an ETag or Last-Modified); anything else would be served blind, so it gets 0.
+    """
+    control = (headers.get('Cache-Control') or '').lower()
+    if 'no-store' in control:
+        return None
+    if 'no-cache' in control:
+        return 0
+    match = _MAX_AGE.search(control)
+    if match:
+        return int(match.group(1))
+    validated = validated or bool(headers.get('ETag') or headers.get('Last-Modified'))
+    return HTTP_CACHE_FRESH if validated else 0
+
+def _write(path: Path, entry: CachedResponse) -> bool:
+    """
+    Replaces an entry file; a failure is logged and only costs the next request its cache hit
+
+    Returns:
+        bool: True if the entry was written
+    """
+    meta = jsoncodec.dumps({field: getattr(entry, field) for field in CachedResponse.__slots__ if field != 'body'})
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # a unique file per writer: other threads and workers may store or read the entry meanwhile
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'{path.name}.', suffix='.tmp', delete=False) as f:
+            tmp = f.name
+            f.write(ENTRY_HEADER.pack(ENTRY_MAGIC, len(meta)) + meta
+                    + gzip.compress(entry.body, compresslevel=CACHE_LEVEL, mtime=0))
+        os.replace(tmp, path)
+        return True
+    except OSError as e:
+        log.warning("Could not store HTTP cache entry %s: %s", path.name, e)
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return False
+
+def lookup(url: str) -> Optional[CachedResponse]:
+    """
+    Reads the stored response for a request URL regardless of age
+
+    Args:
+        url (str): The request URL
+
+    Returns:
+        CachedResponse: The entry, or None if there is no readable one
+    """
+    try:
+        with open(entry_path(url), 'rb') as f:
+            blob = f.read()
+        magic, length = ENTRY_HEADER.unpack_from(blob)
+        if magic not in (ENTRY_MAGIC, ENTRY_MAGIC_RAW):
+            return None
+        meta = jsoncodec.loads(blob[ENTRY_HEADER.size:ENTRY_HEADER.size + length])
+        body = blob[ENTRY_HEADER.size + length:]
+        if magic == ENTRY_MAGIC:
+            body = gzip.decompress(body)
+        return CachedResponse(body=body, **meta)
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        # a missing, truncated or foreign file is just a miss
+        return None
+
+def store(url: str, response) -> Optional[CachedResponse]:
+    """
+    Stores a successful response if it can be reused
+
+    Args:
+        url (str): The request URL
+        response: Response object from the requests library
+
+    Returns:
+        CachedResponse: The new entry, or None if the response is not cacheable
+    """
+    if response.status_code != 200:
+        return None
+    max_age = _max_age(response.headers)
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if max_age is None or not (max_age or etag or last_modified):
+        return None
+    entry = CachedResponse(normalize_url(url), response.content, etag, last_modified, max_age=max_age)
+    _write(entry_path(url), entry)
+    _prune_due(entry.stored)
+    return entry
+
+def _prune_due(now: float) -> None:
+    """
+    Runs prune() if HTTP_CACHE_PRUNE_SECONDS have passed since the last run; threads arriving meanwhile skip it
+    """
+    global _last_prune
+    if now - _last_prune < HTTP_CACHE_PRUNE_SECONDS or not _prune_lock.acquire(blocking=False):
+        return
+    try:
+        _last_prune = now
+        prune(now)
+    finally:
+        _prune_lock.release()
+
+def revalidated(entry: CachedResponse, response) -> CachedResponse:
+    """
+    Marks a stored response as current after a 304 Not Modified
+
+    Args:
+        entry (CachedResponse): The entry the conditional request was made for
+        response: The 304 response, whose headers may update the validators and max-age
+
+    Returns:
+        CachedResponse: The updated entry
+    """
+    max_age = _max_age(response.headers, validated=True)
+    entry.etag = response.headers.get('ETag') or entry.etag
+    entry.last_modified = response.headers.get('Last-Modified') or entry.last_modified
+    entry.max_age = entry.max_age if max_age is None else max_age
+    entry.stored = time.time()
+    _write(entry_path(entry.url), entry)
+    return entry
+
+def prune(now: float = None) -> int:
+    """
+    Deletes entries not stored or revalidated within HTTP_CACHE_RETENTION
+
+    Args:
+        now (float): Epoch seconds, defaults to the current time
+
+    Returns:
+        int: Number of entries deleted
+    """
+    now = time.time() if now is None else now
+    removed = 0
+    # temporary files are only left behind by a writer that died
+    for path in [*HTTP_CACHE_DIR.glob('*/*.bin'), *HTTP_CACHE_DIR.glob('*/*.tmp')]:
+        try:
+            if now - path.stat().st_mtime > HTTP_CACHE_RETENTION:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
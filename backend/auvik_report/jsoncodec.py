@@ -0,0 +1,112 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple, Union
+from functools import lru_cache
+import os
+import json
+from .env import load_env
+
+#Load the contents from the .env file
+load_env()
+
+#Preferred backend, falls back through BACKENDS when it is not installed
+JSON_CODEC: str = os.getenv('JSON_CODEC', '')
+
+def _orjson() -> Tuple[Callable, Callable]:
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    # orjson.JSONDecodeError is a ValueError already
+    return orjson.loads, dumps
+
+def _msgspec() -> Tuple[Callable, Callable]:
+    import msgspec
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+
+    def loads(data: Union[bytes, str]) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    return loads, encoder.encode
+
+def _stdlib() -> Tuple[Callable, Callable]:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+    # json.loads detects the encoding of bytes itself
+    return json.loads, dumps
+
+#Fastest first on stat payloads (see benchmarks/bench_json.py)
+BACKENDS: Dict[str, Callable] = {'msgspec': _msgspec, 'orjson': _orjson, 'json': _stdlib}
+
+def select(preferred: str = None) -> str:
+    """
+    Chooses the JSON backend, trying the preferred one first and falling back in BACKENDS order
+
+    Args:
+        preferred (str): 'orjson', 'msgspec' or 'json'
+
+    Returns:
+        str: The backend now in use
+    """
+    global loads, dumps, BACKEND
+    order = [preferred] if preferred in BACKENDS else []
+    order += [name for name in BACKENDS if name not in order]
+    for name in order:
+        try:
+            loads, dumps = BACKENDS[name]()
+        except ImportError:
+            continue
+        BACKEND = name
+        return name
+
+@lru_cache(maxsize=None)
+def typed_loads(schema: type) -> Callable[[bytes], Any]:
+    """
+    Builds a decoder that parses straight into a msgspec Struct, skipping fields the schema does not declare
+
+    Args:
+        schema (type): The msgspec Struct type of the whole document
+
+    Returns:
+        Callable: loads(data) raising ValueError on malformed or mismatched input
+    """
+    import msgspec
+    decoder = msgspec.json.Decoder(schema)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        try:
+            return decoder.decode(data)
+        except (msgspec.DecodeError, msgspec.ValidationError) as e:
+            raise ValueError(str(e)) from e
+    return loads
+
+def load(path: Union[str, Path]) -> Any:
+    """
+    Reads and decodes a JSON file as bytes, skipping the text decode
+
+    Args:
+        path (str | Path): The JSON file
+
+    Returns:
+        Any: The decoded document
+    """
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+def dump(obj: Any, path: Union[str, Path]) -> None:
+    """
+    Encodes and writes a JSON file
+
+    Args:
+        obj (Any): The document
+        path (str | Path): The JSON file
+    """
+    with open(path, 'wb') as f:
+        f.write(dumps(obj))
+
+loads: Callable[[Union[bytes, str]], Any]
+dumps: Callable[[Any], bytes]
+BACKEND: str
+select(JSON_CODEC)
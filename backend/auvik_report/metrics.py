@@ -0,0 +1,250 @@
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from typing import Dict, Tuple
+from bisect import bisect_left
+import re
+import time
+import threading
+import weakref
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0)
+
+#name: (type, help text, label names, buckets)
+METRICS = {
+    'auvik_requests_total': ('counter', 'Auvik API requests by endpoint and HTTP status', ('endpoint', 'status'), None),
+    'auvik_request_seconds': ('histogram', 'Auvik API request latency', ('endpoint',), LATENCY_BUCKETS),
+    'auvik_pages_total': ('counter', 'Auvik API pages successfully decoded', ('endpoint',), None),
+    'auvik_response_bytes_total': ('counter', 'Auvik API response body bytes', ('endpoint',), None),
+    'auvik_http_cache_total': ('counter', 'Auvik API pages by HTTP cache result: fresh (no request), revalidated (304) or miss', ('endpoint', 'result'), None),
+    'report_section_seconds': ('histogram', 'Time spent building each report section', ('section',), STAGE_BUCKETS),
+    'report_cache_total': ('counter', 'Report cache lookups by tenant, section and result', ('tenant', 'section', 'result'), None),
+    'report_render_seconds': ('histogram', 'Jinja HTML render time', (), STAGE_BUCKETS),
+    'report_pdf_seconds': ('histogram', 'wkhtmltopdf conversion time', (), STAGE_BUCKETS),
+    'report_warm_total': ('counter', 'Report data requests by whether the cache warmer, an earlier request or nobody had filled the cache', ('result',), None),
+    'warmer_tenants_total': ('counter', 'Cache warmer decisions per tenant and period', ('result',), None),
+}
+
+_ID_SEGMENT = re.compile(r'^[0-9]+$|^[0-9a-fA-F-]{16,}$')
+
+class _ThreadStore:
+    """
+    Counters and histograms owned by a single thread, so updates never take a lock
+    """
+    __slots__ = ('counters', 'histograms', 'credited', 'thread')
+
+    def __init__(self, thread: threading.Thread = None):
+        self.counters: Dict[Tuple, float] = {}
+        self.histograms: Dict[Tuple, list] = {}
+        #Counts helper threads made on this thread's behalf; only thread_total reads them
+        self.credited: Dict[str, float] = {}
+        #The owning thread, None for the retired store
+        self.thread = weakref.ref(thread) if thread is not None else None
+
+    def alive(self) -> bool:
+        thread = self.thread()
+        return thread is not None and thread.is_alive()
+
+    def fold(self, other: '_ThreadStore') -> None:
+        """
+        Adds another store's counters and histograms to this one
+        """
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, state in other.histograms.items():
+            merged = self.histograms.get(key)
+            if merged is None:
+                self.histograms[key] = list(state)
+            else:
+                for i, value in enumerate(state):
+                    merged[i] += value
+
+_local = threading.local()
+_stores = []
+#What threads that have since exited recorded; pools replace their threads, so their stores are folded in here
+_retired = _ThreadStore()
+_stores_lock = threading.Lock()
+
+def _retire_dead() -> None:
+    """
+    Folds the stores of exited threads into _retired and forgets them. Needs _stores_lock
+    """
+    dead = [store for store in _stores if not store.alive()]
+    for store in dead:
+        # an exited thread can no longer update its store
+        _retired.fold(store)
+        _stores.remove(store)
+
+def _store() -> _ThreadStore:
+    """
+    Returns the calling thread's store, registering it on first use
+    """
+    try:
+        return _local.store
+    except AttributeError:
+        store = _local.store = _ThreadStore(threading.current_thread())
+        with _stores_lock:
+            _retire_dead()
+            _stores.append(store)
+        return store
+
+def endpoint_label(url: str) -> str:
+    """
+    Reduces a request URL to a low-cardinality endpoint label
+
+    Args:
+        url (str): Full request URL including query string
+
+    Returns:
+        str: The path with IDs replaced, e.g. 'stat/device/bandwidth' or 'inventory/device/info/{id}'
+    """
+    segments = [s for s in urlsplit(url).path.split('/') if s]
+    return '/'.join('{id}' if _ID_SEGMENT.match(s) else s for s in segments)
+
+def inc(name: str, labels: Tuple = (), amount: float = 1) -> None:
+    """
+    Increments a counter
+
+    Args:
+        name (str): Metric name from METRICS
+        labels (Tuple): Label values in the order declared in METRICS
+        amount (float): Amount to add
+
+    Returns:
+        None
+    """
+    counters = _store().counters
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + amount
+
+def thread_total(name: str) -> float:
+    """
+    Sums a counter over all labels, counting only updates made by the calling thread and those credited to it
+
+    Args:
+        name (str): Counter name from METRICS
+
+    Returns:
+        float: The calling thread's total
+    """
+    store = _store()
+    return sum(v for (n, _), v in store.counters.items() if n == name) + store.credited.get(name, 0)
+
+def credit(name: str, amount: float) -> None:
+    """
+    Adds work a helper thread did for the calling thread to its thread_total, leaving the exported counters alone
+
+    Args:
+        name (str): Counter name from METRICS
+        amount (float): The helper thread's thread_total delta
+    """
+    credited = _store().credited
+    credited[name] = credited.get(name, 0) + amount
+
+def observe(name: str, value: float, labels: Tuple = ()) -> None:
+    """
+    Records a value in a histogram
+
+    Args:
+        name (str): Metric name from METRICS
+        value (float): The observed value (seconds for timings)
+        labels (Tuple): Label values in the order declared in METRICS
+
+    Returns:
+        None
+    """
+    buckets = METRICS[name][3]
+    histograms = _store().histograms
+    key = (name, labels)
+    state = histograms.get(key)
+    if state is None:
+        # one slot per bucket, one for +Inf, then sum
+        state = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+    state[bisect_left(buckets, value)] += 1
+    state[-1] += value
+
+@contextmanager
+def timer(name: str, labels: Tuple = ()):
+    """
+    Times the enclosed block into a histogram
+
+    Args:
+        name (str): Histogram name from METRICS
+        labels (Tuple): Label values in the order declared in METRICS
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, labels)
+
+def _merge() -> Tuple[Dict, Dict]:
+    """
+    Sums every thread store into a single view for a scrape
+    """
+    merged = _ThreadStore()
+    with _stores_lock:
+        _retire_dead()
+        merged.fold(_retired)
+        stores = list(_stores)
+    for store in stores:
+        # live threads keep adding keys, so walk copies of their dicts
+        snapshot = _ThreadStore()
+        snapshot.counters = store.counters.copy()
+        snapshot.histograms = store.histograms.copy()
+        merged.fold(snapshot)
+    return merged.counters, merged.histograms
+
+def _format_labels(names: Tuple, values: Tuple, extra: str = '') -> str:
+    """
+    Builds the {name="value"} part of an exposition line
+    """
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def render_metrics() -> str:
+    """
+    Renders all recorded metrics in the Prometheus text exposition format
+
+    Args:
+        None
+
+    Returns:
+        str: The scrape body
+    """
+    counters, histograms = _merge()
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(label_names, labels)} {value}')
+        else:
+            for (metric, labels), state in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), state[:-1]):
+                    cumulative += count
+                    le = 'le="' + str(bound) + '"'
+                    lines.append(f'{name}_bucket{_format_labels(label_names, labels, le)} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(label_names, labels)} {state[-1]}')
+                lines.append(f'{name}_count{_format_labels(label_names, labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+def reset() -> None:
+    """
+    Clears every recorded value (used by tests)
+    """
+    with _stores_lock:
+        for store in _stores + [_retired]:
+            store.counters.clear()
+            store.histograms.clear()
+            store.credited.clear()
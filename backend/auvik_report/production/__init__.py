@@ -1,3 +1,3 @@
-from .reports import uptime_report, open_alerts, bandwidth_report, device_health
-from .fetchers import format_date_range, fetch_paginated_data, fetch_tenants, fetch_open_alerts, fetch_device_stats, fetch_device_availability_stats, fetch_interface_stats
+from .reports import uptime_report, uptime_and_outages, open_alerts, bandwidth_report, bandwidth_and_networks, device_health
+from .fetchers import format_date_range, fetch_paginated_data, fetch_tenants, fetch_open_alerts, fetch_alert_history, fetch_billing_usage, fetch_device_inventory, fetch_device_stats, fetch_device_availability_stats, fetch_interface_stats
 from .helpers import max_interface_average, score_calculator, health_scores, bandwidth_average, stats_per_device
\ No newline at end of file
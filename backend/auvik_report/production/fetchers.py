@@ -1,16 +1,25 @@
-from datetime import datetime, timedelta, timezone
-from dotenv import load_dotenv
-from typing import List, Dict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List, Dict, Callable, Tuple, Optional
+import math
 import os
 import sys
+import threading
+import time
 import requests
 from requests.auth import HTTPBasicAuth
+from auvik_report import metrics, jsoncodec, httpcache
+from auvik_report.env import load_env
+from .series import DeviceSeries, InterfaceSeries, merge_shards
+from .schemas import DeviceStatPage, InterfaceStatPage
+from .period import ReportPeriod, INTERVAL_SECONDS, choose_interval, format_window, snapshot_now
 
 #Adds root directory to import path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 #Load the contents from the .env file
-load_dotenv('.env')
+load_env()
 
 #Get the data you need to use in your code
 auvik_username: str = os.getenv('AUVIK_USERNAME')
@@ -18,10 +27,25 @@ auvik_api_key: str = os.getenv('AUVIK_API_KEY')
 base_url: str = os.getenv('BASE_URL')
 main_domain_prefix: str = os.getenv('MAIN_DOMAIN_PREFIX')
 
+#Most time shards one stat query is split into and fetched concurrently, 1 always pages serially
+FETCH_SHARDS: int = int(os.getenv('FETCH_SHARDS', '4'))
+#Pages each shard should walk; a query is split into its projected page count over this
+SHARD_PAGES: int = int(os.getenv('SHARD_PAGES', '4'))
+#Most stat queries whose page counts are remembered, least recently fetched are forgotten first
+SHARD_PLAN_SIZE: int = int(os.getenv('SHARD_PLAN_SIZE', '4096'))
+
+#Per stat query, keyed by its URL without the time filters: [pages per day its last fetch walked,
+#pages per day its last serial fetch walked or None, whether it stays serial]. Per day, because the
+#window of one query changes between a full backfill and the 1-day deltas of the time-series store
+_shard_plan: 'OrderedDict[str, list]' = OrderedDict()
+_shard_plan_lock = threading.Lock()
+_shard_pool: ThreadPoolExecutor = None
+_shard_pool_lock = threading.Lock()
+
 ###############################################################Helper Functions######################################################################
 def format_date_range(start: int) -> str:
     """
-    Returns correctly formatted date in UTC from 30 days ago and today
+    Returns correctly formatted date in UTC from 30 days ago and today, on the hour of the report clock
 
     Args:
         int: number of days back for range
@@ -30,43 +54,165 @@ def format_date_range(start: int) -> str:
         Str: A string containing the date from specified amount of days ago in UTC
         Str: A string containing the date from today in UTC
     """
-    now_utc = datetime.now(timezone.utc)
+    now_utc = snapshot_now()
     thirty_days_ago = now_utc - timedelta(days=start)
     formatted_start = thirty_days_ago.strftime('%Y-%m-%dT%H:%M:%S.000Z')
     formatted_end = now_utc.strftime('%Y-%m-%dT%H:%M:%S.000Z')
     return formatted_start, formatted_end
 
-def fetch_paginated_data(url: str) -> List[Dict]:
+def resolve_window(stat: str, window: Tuple[float, float] = None, interval: str = None) -> Tuple[Tuple[float, float], str]:
     """
-    Generic helper for paginated Auvik API requests
+    Fills in the default window and interval for a stat request
 
-    Args (str): Initial request URL
+    Args:
+        stat (str): The stat ID, used to pick the interval
+        window (Tuple[float, float]): Epoch [start, end) range, defaults to the last 30 complete days
+        interval (str): Forces 'hour' or 'day' instead of the coarsest accurate interval
 
     Returns:
-        List[Dict]: Combined 'data' from all pages
+        Tuple[float, float]: The window
+        Str: interval
     """
-    all_items = []
-    seen_urls = set()
+    if window is None:
+        period = ReportPeriod.rolling(30)
+        window = (period.start_ts, period.end_ts)
+    if interval is None:
+        interval = choose_interval(stat, round((window[1] - window[0]) / 86400))
+    return window, interval
 
-    while url:
+def shard_count(pages: float) -> int:
+    """
+    How many time shards a query that walks `pages` pages over its whole window is split into
+    """
+    return min(FETCH_SHARDS, max(1, math.ceil(pages / SHARD_PAGES)))
+
+def _observed(key: str) -> Optional[list]:
+    """
+    The remembered page rates of a stat query, marking it as recently used
+    """
+    with _shard_plan_lock:
+        plan = _shard_plan.get(key)
+        if plan is not None:
+            _shard_plan.move_to_end(key)
+        return plan
+
+def _observe(key: str, plan: list) -> None:
+    """
+    Remembers the page rates of a stat query, forgetting the least recently fetched past SHARD_PLAN_SIZE
+    """
+    with _shard_plan_lock:
+        _shard_plan[key] = plan
+        _shard_plan.move_to_end(key)
+        while len(_shard_plan) > SHARD_PLAN_SIZE:
+            _shard_plan.popitem(last=False)
+
+def shard_windows(window: Tuple[float, float], interval: str, shards: int) -> List[Tuple[float, float]]:
+    """
+    Splits a window into consecutive sub-windows on interval boundaries, so no bucket is cut in two
+
+    Args:
+        window (Tuple[float, float]): Epoch [start, end) range
+        interval (str): 'hour' or 'day'
+        shards (int): How many sub-windows at most
+
+    Returns:
+        List[Tuple[float, float]]: The sub-windows in time order, covering the window exactly
+    """
+    start, end = window
+    step = INTERVAL_SECONDS[interval]
+    buckets = max(1, math.ceil((end - start) / step))
+    shards = max(1, min(shards, buckets))
+    bounds = [start + buckets * i // shards * step for i in range(shards)] + [end]
+    return list(zip(bounds, bounds[1:]))
+
+def _get_page(url: str, endpoint: str, decode: Callable):
+    """
+    Gets and decodes one page, answered by the HTTP response cache while its copy is fresh and revalidated after
+
+    Args:
+        url (str): The page URL
+        endpoint (str): Metrics label of the URL
+        decode (Callable): Decodes the body bytes
+
+    Returns:
+        The decoded page
+    """
+    entry = httpcache.lookup(url) if httpcache.HTTP_CACHE else None
+    if entry is not None and entry.fresh():
+        metrics.inc('auvik_http_cache_total', (endpoint, 'fresh'))
         try:
-            response = requests.get(
-                    url, 
-                    auth=HTTPBasicAuth(auvik_username, auvik_api_key), 
-                    headers={"Accept": "application/vnd.api+json"},
-                    timeout=30
-                )
-            response.raise_for_status()
-            body = response.json()
-        except requests.exceptions.RequestException as e:
-            raise RuntimeError(f'Network/HTTP error while fetching tenants from from {url}: {e}')
+            return decode(entry.body)
         except ValueError as e:
             raise RuntimeError(f"Invalid JSON response from {url}: {e}")
-        
-        all_items.extend(body.get('data', []))
 
-        links = body.get('links', {})
-        next_url = links.get('next')
+    headers = {"Accept": "application/vnd.api+json"}
+    if entry is not None:
+        headers.update(entry.validators())
+    start = time.perf_counter()
+    status = 'error'
+    try:
+        response = requests.get(
+                url, 
+                auth=HTTPBasicAuth(auvik_username, auvik_api_key), 
+                headers=headers,
+                timeout=30
+            )
+        status = str(response.status_code)
+        if entry is not None and response.status_code == 304:
+            content = httpcache.revalidated(entry, response).body
+            result = 'revalidated'
+        else:
+            response.raise_for_status()
+            content = response.content
+            result = 'miss'
+        # decode straight from bytes, skipping the intermediate str
+        body = decode(content)
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f'Network/HTTP error while fetching tenants from from {url}: {e}')
+    except ValueError as e:
+        raise RuntimeError(f"Invalid JSON response from {url}: {e}")
+    finally:
+        metrics.observe('auvik_request_seconds', time.perf_counter() - start, (endpoint,))
+        metrics.inc('auvik_requests_total', (endpoint, status))
+
+    metrics.inc('auvik_response_bytes_total', (endpoint,), len(response.content))
+    if httpcache.HTTP_CACHE:
+        # only bodies that decoded are kept
+        if result == 'miss':
+            httpcache.store(url, response)
+        metrics.inc('auvik_http_cache_total', (endpoint, result))
+    return body
+
+def fetch_paginated_data(url: str, parse: Callable = None, schema: type = None) -> List[Dict]:
+    """
+    Generic helper for paginated Auvik API requests
+
+    Args:
+        url (str): Initial request URL
+        parse (Callable): Optional converter applied to each element as its page arrives, so the raw page can be freed
+        schema (type): Optional page Struct from schemas.py; only its declared fields are decoded
+
+    Returns:
+        List[Dict]: Combined 'data' from all pages (schema elements when a schema is given)
+    """
+    all_items = []
+    seen_urls = set()
+    endpoint = metrics.endpoint_label(url)
+    decode = jsoncodec.loads if schema is None else jsoncodec.typed_loads(schema)
+
+    while url:
+        body = _get_page(url, endpoint, decode)
+        metrics.inc('auvik_pages_total', (endpoint,))
+        if schema is None:
+            data = body.get('data', [])
+            next_url = body.get('links', {}).get('next')
+        else:
+            data = body.data
+            next_url = body.links.next
+        if parse is None:
+            all_items.extend(data)
+        else:
+            all_items.extend(map(parse, data))
 
         if next_url and next_url in seen_urls:
             raise RuntimeError(f"Dectected circular pagination with URL: {next}")
@@ -76,6 +222,75 @@ def fetch_paginated_data(url: str) -> List[Dict]:
 
     return all_items
 
+def _fetch_shard(url: str, parse: Callable, schema: type) -> Tuple[List, float, float]:
+    """
+    Fetches one shard on a pool thread, returning its items with the pages and requests it took
+    """
+    pages = metrics.thread_total('auvik_pages_total')
+    requests_made = metrics.thread_total('auvik_requests_total')
+    items = fetch_paginated_data(url, parse, schema)
+    return items, metrics.thread_total('auvik_pages_total') - pages, metrics.thread_total('auvik_requests_total') - requests_made
+
+def _pool() -> ThreadPoolExecutor:
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is None:
+            # room for two reports sharding at once; the first shard of each runs on the caller's thread
+            _shard_pool = ThreadPoolExecutor(max_workers=max(1, 2 * (FETCH_SHARDS - 1)), thread_name_prefix='auvik-shard')
+        return _shard_pool
+
+def fetch_stat_series(build_url: Callable[[str, str], str], window: Tuple[float, float], interval: str,
+                      parse: Callable = None, schema: type = None) -> List:
+    """
+    Fetches a stat query, split into concurrent time shards once an earlier fetch of it walked many pages
+
+    Auvik's next links are opaque cursors, so the pages of one query can only be walked one after another.
+    Each shard is its own query over a slice of fromTime..thruTime; the series are stitched back together
+    per element in time order, so the result is the same as a serial fetch. The shard count follows the
+    pages per day of the previous fetch projected over this window, and a query whose longest shard walks
+    as many pages as a serial fetch of the window would goes back to serial, since more shards would only
+    add requests.
+
+    Args:
+        build_url (Callable[[str, str], str]): Builds the request URL from fromTime and thruTime
+        window (Tuple[float, float]): Epoch [start, end) range
+        interval (str): 'hour' or 'day'
+        parse (Callable): Series constructor applied to each element
+        schema (type): Page Struct from schemas.py
+
+    Returns:
+        List: One series per element
+    """
+    key = build_url('', '')
+    days = max(window[1] - window[0], INTERVAL_SECONDS[interval]) / 86400
+    plan = _observed(key)
+    if plan is None or plan[2]:
+        shards = shard_windows(window, interval, 1)
+    else:
+        shards = shard_windows(window, interval, shard_count(plan[0] * days))
+    urls = [build_url(*format_window(shard)) for shard in shards]
+
+    futures = [_pool().submit(_fetch_shard, url, parse, schema) for url in urls[1:]]
+    first, pages, _ = _fetch_shard(urls[0], parse, schema)
+    results = [first]
+    chains = [pages]
+    for future in futures:
+        items, pages, requests_made = future.result()
+        results.append(items)
+        chains.append(pages)
+        # so the cache warmer's per-tenant request budget still sees what this call cost
+        metrics.credit('auvik_requests_total', requests_made)
+        metrics.credit('auvik_pages_total', pages)
+
+    rate = sum(chains) / days
+    if len(results) == 1:
+        _observe(key, [rate, rate, plan is not None and plan[2]])
+        return first
+    # the longest shard against what a serial fetch of this window would walk at the last serial rate
+    serial = plan[1]
+    _observe(key, [rate, serial, serial is not None and max(chains) >= serial * days])
+    return merge_shards(results)
+
 ###############################################################Fetcher Functions######################################################################
 
 def fetch_tenants() -> List[Dict]:
@@ -101,7 +316,50 @@ def fetch_open_alerts(tenant: str) -> List[Dict]:
     url = f'{base_url}/alert/history/info?tenants={tenant}&filter[status]=created&filter[dismissed]=false&filter[dispatched]=true'
     return fetch_paginated_data(url)
 
-def fetch_device_stats(tenant: str, statID: str, type: str = 'None') -> List[Dict]:
+def fetch_billing_usage(tenant: str, first: str, last: str) -> List[Dict]:
+    """
+    Fetches the daily billing usage of a tenant's clients
+
+    Args:
+        tenant (str): The tenant ID
+        first (str): First day, YYYY-MM-DD
+        last (str): Last day, YYYY-MM-DD, inclusive
+
+    Returns:
+        List[Dict]: Client usage elements, one per client and day
+    """
+    url = f'{base_url}/billing/usage/client?tenants={tenant}&filter[fromDate]={first}&filter[thruDate]={last}'
+    return fetch_paginated_data(url)
+
+def fetch_device_inventory(tenant: str) -> List[Dict]:
+    """
+    Fetches the inventory record of every device of a tenant
+
+    Args:
+        tenant (str): The tenant ID
+
+    Returns:
+        List[Dict]: Device info elements, with their networks under relationships
+    """
+    url = f'{base_url}/inventory/device/info?tenants={tenant}&page[first]=1000'
+    return fetch_paginated_data(url)
+
+def fetch_alert_history(tenant: str, window: Tuple[float, float]) -> List[Dict]:
+    """
+    Fetches every alert for a tenant detected within a window, whatever its status
+
+    Args:
+        tenant (str): The tenant ID
+        window (Tuple[float, float]): Epoch [start, end) range of the detection time
+
+    Returns:
+        List[Dict]: A list containing the alert history elements
+    """
+    date_start, date_end = format_window(window)
+    url = f'{base_url}/alert/history/info?tenants={tenant}&filter[detectedTimeAfter]={date_start}&filter[detectedTimeBefore]={date_end}'
+    return fetch_paginated_data(url)
+
+def fetch_device_stats(tenant: str, statID: str, type: str = 'None', window: Tuple[float, float] = None, interval: str = None) -> List[DeviceSeries]:
     """
     Pull device stats for the specified tenant and stat ID
 
@@ -109,32 +367,39 @@ def fetch_device_stats(tenant: str, statID: str, type: str = 'None') -> List[Dic
         tenant (str): The tenant ID
         statID (str): ID of stats to return [bandwidth, cpuUtilization, memoryUtilization, storageUtilization, packetUnicast, packetMulticast, packetBroadcast]
         type (str): Device type
+        window (Tuple[float, float]): Epoch [start, end) range, defaults to the last 30 complete days
+        interval (str): 'hour' or 'day', defaults to the coarsest interval that keeps the stat accurate
 
     Returns:
-        List[Dict]: A list of device elements containing the stats
+        List[DeviceSeries]: One series per device
     """
-    date_start, date_end = format_date_range(30)
-    if type == 'None':
-        url = f'{base_url}/stat/device/{statID}?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]=hour&tenants={tenant}'
-    else:
-        url = f'{base_url}/stat/device/{statID}?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]=hour&filter[deviceType]={type}&tenants={tenant}'
-    return fetch_paginated_data(url)
+    window, interval = resolve_window(statID, window, interval)
 
-def fetch_device_availability_stats(tenant: str) -> List[Dict]:
+    def build_url(date_start: str, date_end: str) -> str:
+        if type == 'None':
+            return f'{base_url}/stat/device/{statID}?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]={interval}&tenants={tenant}'
+        return f'{base_url}/stat/device/{statID}?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]={interval}&filter[deviceType]={type}&tenants={tenant}'
+    return fetch_stat_series(build_url, window, interval, DeviceSeries.from_struct, DeviceStatPage)
+
+def fetch_device_availability_stats(tenant: str, window: Tuple[float, float] = None, interval: str = None) -> List[DeviceSeries]:
     """
     Pulls device availabilty stats for the tenant over a 30 day period
 
     Args:
         str: The tenant ID
+        window (Tuple[float, float]): Epoch [start, end) range, defaults to the last 30 complete days
+        interval (str): 'hour' or 'day', defaults to the coarsest interval that keeps the stat accurate
 
     Returns:
-        List[Dict]: A list containing all device elements
+        List[DeviceSeries]: One availability series per device
     """
-    date_start, date_end = format_date_range(30)
-    url = f'{base_url}/stat/deviceAvailability/uptime?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]=hour&tenants={tenant}'
-    return fetch_paginated_data(url)
+    window, interval = resolve_window('uptime', window, interval)
+
+    def build_url(date_start: str, date_end: str) -> str:
+        return f'{base_url}/stat/deviceAvailability/uptime?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]={interval}&tenants={tenant}'
+    return fetch_stat_series(build_url, window, interval, DeviceSeries.from_struct, DeviceStatPage)
 
-def fetch_interface_stats(device: str, stat: str, type: str = 'None') -> List[Dict]:
+def fetch_interface_stats(device: str, stat: str, type: str = 'None', window: Tuple[float, float] = None, interval: str = None) -> List[InterfaceSeries]:
     """
     Fetch the interface stats of a specific device
 
@@ -142,13 +407,16 @@ def fetch_interface_stats(device: str, stat: str, type: str = 'None') -> List[Di
         Device (str): The id of the target "parentDevice"
         Stat (str): The stat ID being queried
         Type (str): Optional type argument to filter by interface type
+        window (Tuple[float, float]): Epoch [start, end) range, defaults to the last 30 complete days
+        interval (str): 'hour' or 'day', defaults to the coarsest interval that keeps the stat accurate
 
     Returns:
-        List[Dict]: A list containing the stat elements
+        List[InterfaceSeries]: One series per interface
     """
-    date_start, date_end = format_date_range(30)
-    if type == 'None':
-        url = f'{base_url}/stat/interface/{stat}?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]=hour&filter[parentDevice]={device}'
-    else:
-        url = f'{base_url}/stat/interface/{stat}?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]=hour&filter[parentDevice]={device}&filter[interfaceType]={type}'
-    return fetch_paginated_data(url)
\ No newline at end of file
+    window, interval = resolve_window(stat, window, interval)
+
+    def build_url(date_start: str, date_end: str) -> str:
+        if type == 'None':
+            return f'{base_url}/stat/interface/{stat}?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]={interval}&filter[parentDevice]={device}'
+        return f'{base_url}/stat/interface/{stat}?filter[fromTime]={date_start}&filter[thruTime]={date_end}&filter[interval]={interval}&filter[parentDevice]={device}&filter[interfaceType]={type}'
+    return fetch_stat_series(build_url, window, interval, InterfaceSeries.from_struct, InterfaceStatPage)
\ No newline at end of file
@@ -1,12 +1,22 @@
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple, Union
 from .fetchers import fetch_interface_stats
+from .series import DeviceSeries, InterfaceSeries, PrefixSums
+from .sketch import StatDigest
+from .topk import TopK
+from .parallel import aggregate
+from .period import ReportPeriod, choose_interval
+from auvik_report import tsstore
 
-def score_calculator(stats: Dict) -> float:
+#Rank reported next to each health mean when quantiles are requested, stored as '<metric>_p95'
+HEALTH_QUANTILE = 0.95
+
+def score_calculator(stats: Dict, p95_weight: float = 0.0) -> float:
     """
     Generates the health score for a device
 
     Args:
         stats (Dict): The statistics for a single device
+        p95_weight (float): Share of each metric taken from its p95 instead of its mean, when the p95 is present
 
     Return:
         flaot: The health score
@@ -14,70 +24,93 @@ def score_calculator(stats: Dict) -> float:
     values = [stats.get('cpu'), stats.get('memory'), stats.get('storage')]
     if all(v is None for v in values):
         return None  # can't calculate
-    return 100 - (0.35 * (stats['cpu'] or 0) + 0.4 * (stats['memory'] or 0) + 0.25 * (stats['storage'] or 0))
-
-def health_scores(stats: Dict) -> List[Dict]:
+    load = {}
+    for metric in ('cpu', 'memory', 'storage'):
+        load[metric] = stats[metric] or 0
+        p95 = stats.get(f'{metric}_p95')
+        if p95_weight and p95 is not None:
+            load[metric] = (1 - p95_weight) * load[metric] + p95_weight * p95
+    return 100 - (0.35 * load['cpu'] + 0.4 * load['memory'] + 0.25 * load['storage'])
+
+def health_scores(stats: Dict, p95_weight: float = 0.0, rows: int = None) -> List[Dict]:
     """
     Takes devices statistics to give a number that quantifies overall network health and adds score to dict
 
     Args:
         stats (Dict): Statistics per device
+        p95_weight (float): Passed to score_calculator
+        rows (int): Keep only the this many lowest scoring devices, None keeps all
     
     Return:
-        Dict: Mutated version of the input
+        Dict: Devices scoring below 65, lowest score first
     """ 
-    report = []
+    report = TopK(rows)
     for device_id, device_stats in stats.items():
-        score = score_calculator(device_stats)        
+        score = score_calculator(device_stats, p95_weight)        
         if score is not None and score < 65:
-            report.append({
+            entry = {
                 'name': device_stats['name'],
                 'cpu': device_stats['cpu'],
                 'memory': device_stats['memory'],
                 'storage': device_stats['storage'],
                 'health': round(score,2)
         
-            }) 
-    return report
-
-def bandwidth_average(device: List) -> int:
+            }
+            for metric in ('cpu', 'memory', 'storage'):
+                if f'{metric}_p95' in device_stats:
+                    entry[f'{metric}_p95'] = device_stats[f'{metric}_p95']
+            report.push(entry, -score) 
+    return report.items()
+
+def bandwidth_average(device: DeviceSeries) -> int:
     """
     Takes bandwidth statistics and compiles the average for the 3 target stats (Transmitted, Receive, Total)
 
     Args:
-        Data (List): Data from the API with device bandwidth statistics
+        device (DeviceSeries): Device bandwidth series with (tx, rx, total) columns
 
     Returns:
         tx_avg (int): Transmitted Average
         rx_avg (int): Revceived Average
         total_avg (int): Total Average
     """
-    data = device['attributes']['stats'][0]['data']  # list of [ts, tx, rx, total]
-    tx_total = 0
-    rx_total = 0
-    total_total = 0
-
-    for entry in data:
-        tx_total += entry[1]
-        rx_total += entry[2]
-        total_total += entry[3]
-
-    if data:
-        n = len(data)
-        tx_avg = (tx_total / n) / 1000000
-        rx_avg = (rx_total / n) / 1000000
-        total_avg = (total_total / n) / 1000000
+    n = len(device)
+    if n:
+        tx, rx, total = device.columns[:3]
+        tx_avg = (sum(tx) / n) / 1000000
+        rx_avg = (sum(rx) / n) / 1000000
+        total_avg = (sum(total) / n) / 1000000
     else:
         tx_avg = rx_avg = total_avg = 0
 
     return tx_avg, rx_avg, total_avg
 
-def max_interface_average(device: List) -> Tuple[str, int]:
+def bandwidth_windows(device: DeviceSeries, windows: List[Tuple[str, float]], end: float) -> Dict[str, float]:
+    """
+    Average total bandwidth for each report window from one prefix-sum pass over the series
+
+    Args:
+        device (DeviceSeries): Device bandwidth series with (tx, rx, total) columns
+        windows (List[Tuple[str, float]]): Window label and start from ReportPeriod.windows()
+        end (float): End of every window in epoch seconds
+
+    Returns:
+        Dict[str, float]: Average total (mb/s) by window label
+    """
+    totals = PrefixSums(device.timestamps, device.columns[2]) if len(device) else None
+    averages = {}
+    for label, start in windows:
+        mean = totals.mean(start, end) if totals else None
+        averages[label] = mean / 1000000 if mean is not None else 0
+    return averages
+
+def max_interface_average(device: DeviceSeries, period: ReportPeriod = None) -> Tuple[str, int]:
     """
     Return the ID and average of the interface with the highest average
 
     Arg:
-        Device (List): The intermediary device to get statistics
+        device (DeviceSeries): The intermediary device to get statistics
+        period (ReportPeriod): The report period, defaults to the last 30 days
 
     Return:
         name (str): Name of highest usage interface
@@ -85,31 +118,62 @@ def max_interface_average(device: List) -> Tuple[str, int]:
     """
     name =  'NA'
     percent_max = 0
-    device_ID = device['id']
-    interfaces = fetch_interface_stats(device_ID, 'utilization')
+    period = period or ReportPeriod.rolling(30)
+    interval = choose_interval('utilization', period.days)
+    interfaces = tsstore.sync(
+        'interfaces', f'utilization-{device.id}-{interval}',
+        lambda start, end: fetch_interface_stats(device.id, 'utilization', window=(start, end), interval=interval),
+        period.start_ts, period.end_ts, InterfaceSeries
+    )
     for interface in interfaces:
-        data = interface['attributes']['stats'][0]['data']
-        if len(data) > 0:
-            total = 0
-            for entry in data:
-                percent = entry[1]
-                if percent < 200:
-                    total += entry[1]
-            avg = total / len(data)
+        n = len(interface)
+        if n > 0:
+            # readings of 200% or more are counter wraps, not real utilization
+            total = sum(percent for percent in interface.columns[0] if percent < 200)
+            avg = total / n
             if avg > percent_max:
-                name = interface['relationships']['interface']['data']['interfaceName']
+                name = interface.interface_name
                 percent_max = avg
 
     return name, percent_max
 
-def stats_per_device(cpu: List[Dict], memory: List[Dict], storage: List[Dict]) -> Dict:
+def series_mean(device: DeviceSeries) -> float:
+    """
+    Mean of a series' first column, None when it has no samples
+    """
+    n = len(device)
+    return (sum(device.columns[0]) / n) if n else None
+
+def digest_series(series: Iterable[DeviceSeries]) -> List[StatDigest]:
+    """
+    Folds series into one StatDigest per device, a series at a time
+
+    Args:
+        series (Iterable[DeviceSeries]): Series or store chunks; a device may span several, in any order
+
+    Returns:
+        List[StatDigest]: One digest per device, in first-seen order
+    """
+    digests = {}
+    for device in series:
+        digest = digests.get(device.device_id)
+        if digest is None:
+            digest = digests[device.device_id] = StatDigest(device.device_id, device.device_name)
+        if len(device):
+            digest.update_many(device.columns[0])
+    return list(digests.values())
+
+def stats_per_device(cpu: List[Union[DeviceSeries, StatDigest]], memory: List[Union[DeviceSeries, StatDigest]],
+                     storage: List[Union[DeviceSeries, StatDigest]], quantiles: bool = False) -> Dict:
     """
     Takes the seperate device stats and aggregates them by device ID
 
     Args:
-        cpu (List[Dict]): Device cpu utilization stats
-        memory (List[Dict]): Device memory utilization stats
-        storage (List[Dict]): Device storage utilization stats
+        cpu (List[DeviceSeries] | List[StatDigest]): Device cpu utilization stats
+        memory (List[DeviceSeries] | List[StatDigest]): Device memory utilization stats
+        storage (List[DeviceSeries] | List[StatDigest]): Device storage utilization stats
+        quantiles (bool): Also estimate each stat's HEALTH_QUANTILE as '<stat>_p95' from a KLL sketch per
+            device. Series are folded into digests first; digests built by the caller are used as they are
     
     Returns:
         Dict: The average of each stat per device by device ID
@@ -117,13 +181,13 @@ def stats_per_device(cpu: List[Dict], memory: List[Dict], storage: List[Dict]) -
     per_device = {}
     # Pair each payload with its metric name
     for payload, metric_name in ((cpu, 'cpu'), (memory, 'memory'), (storage, 'storage')):
-        for device in payload:
-            deviceID = device['relationships']['device']['data']['id']
-            deviceName = device['relationships']['device']['data']['deviceName']
-            rows = device['attributes']['stats'][0]['data']
-
-            avg = (sum(entry[1] for entry in rows) / len(rows)) if rows else None
-
+        if quantiles:
+            digests = payload if payload and isinstance(payload[0], StatDigest) else digest_series(payload)
+            rows = [(digest.device_id, digest.device_name, digest.mean(), digest.sketch) for digest in digests]
+        else:
+            rows = [(device.device_id, device.device_name, avg, None)
+                    for device, avg in zip(payload, aggregate(series_mean, payload))]
+        for deviceID, deviceName, avg, sketch in rows:
             rec = per_device.setdefault(deviceID, {
                 'id': deviceID,
                 'name': deviceName,
@@ -136,4 +200,7 @@ def stats_per_device(cpu: List[Dict], memory: List[Dict], storage: List[Dict]) -
                 rec[metric_name] = round(avg, 2)
             else:
                 rec[metric_name] = avg
-    return per_device
\ No newline at end of file
+            if sketch is not None:
+                value = sketch.quantile(HEALTH_QUANTILE)
+                rec[f'{metric_name}_p95'] = None if value is None else round(value, 2)
+    return per_device
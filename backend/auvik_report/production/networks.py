@@ -0,0 +1,80 @@
+from .fetchers import fetch_device_inventory
+from collections import defaultdict
+from typing import Dict, List, Tuple
+import threading
+import time
+
+#Seconds a tenant's device to network index is reused before the inventory is read again
+NETWORK_INDEX_TTL = 3600
+#Subtotal label for devices the inventory puts in no network, or in more than one
+UNASSIGNED = 'Unassigned'
+MULTIPLE = 'Multiple'
+
+_indexes: Dict[str, Tuple[float, Dict[str, str]]] = {}
+_lock = threading.Lock()
+
+def build_index(devices: List[Dict]) -> Dict[str, str]:
+    """
+    Maps each device to the network it belongs to
+
+    Args:
+        devices (List[Dict]): Device info elements from the inventory
+
+    Returns:
+        Dict[str, str]: Device ID to network name, MULTIPLE when the device sits in several networks
+    """
+    index = {}
+    for device in devices:
+        networks = device.get('relationships', {}).get('networks', {}).get('data') or []
+        if len(networks) > 1:
+            index[device['id']] = MULTIPLE
+        elif networks:
+            index[device['id']] = networks[0].get('attributes', {}).get('networkName') or networks[0]['id']
+    return index
+
+def network_index(tenant: str, now: float = None, devices: List[Dict] = None) -> Dict[str, str]:
+    """
+    The tenant's device to network index, built from inventory once per NETWORK_INDEX_TTL
+
+    Args:
+        tenant (str): The tenant ID
+        now (float): Epoch seconds, defaults to the current time
+        devices (List[Dict]): Inventory already fetched for another purpose; rebuilds the index from it
+
+    Returns:
+        Dict[str, str]: Device ID to network name
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        cached = _indexes.get(tenant)
+    if devices is None and cached is not None and now - cached[0] < NETWORK_INDEX_TTL:
+        return cached[1]
+    index = build_index(fetch_device_inventory(tenant) if devices is None else devices)
+    with _lock:
+        _indexes[tenant] = (now, index)
+    return index
+
+def network_of(index: Dict[str, str], series) -> str:
+    """
+    The network a device series is subtotalled under
+    """
+    return index.get(series.device_id or series.id, UNASSIGNED)
+
+def network_summary(uptime: Dict[str, Dict[str, float]], bandwidth: Dict[str, Dict]) -> List[Dict]:
+    """
+    Joins the per-network uptime and bandwidth subtotals into one row per network
+
+    Args:
+        uptime (Dict): Network to average uptime per report window
+        bandwidth (Dict): Network to monitored device count and summed TX, RX and Total averages
+
+    Returns:
+        List[Dict]: Rows sorted by network name, UNASSIGNED and MULTIPLE last
+    """
+    rows = defaultdict(dict)
+    for network, by_window in uptime.items():
+        rows[network]['Uptime'] = by_window
+    for network, totals in bandwidth.items():
+        rows[network].update(totals)
+    order = sorted(rows, key=lambda network: (network in (UNASSIGNED, MULTIPLE), network))
+    return [{'Network': network, 'Uptime': {}, 'Devices': 0, 'TX': 0, 'RX': 0, 'Total': 0, **rows[network]} for network in order]
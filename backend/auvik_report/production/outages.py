@@ -0,0 +1,132 @@
+from datetime import datetime, timezone
+from array import array
+from heapq import merge
+from typing import Dict, Iterable, List, Tuple
+from .series import PrefixSums
+from .topk import TopK
+
+#An hourly sample below this availability (percent) counts as the device being down for that hour
+OUTAGE_BELOW = 50.0
+#Rows in the report's longest outages table
+LONGEST_OUTAGES = 10
+
+def scan_availability(timestamps: array, column: array, interval: float) -> Tuple[PrefixSums, List[Tuple[float, float, float]]]:
+    """
+    Builds the running totals for the uptime averages and run-length encodes outages in the same pass
+
+    A run of consecutive samples below OUTAGE_BELOW is one outage. A missing sample (NaN) or a gap
+    longer than the interval ends the run, since nothing is known about that time.
+
+    Args:
+        timestamps (array): Sample timestamps, sorted
+        column (array): Availability percent per sample
+        interval (float): Seconds each sample covers
+
+    Returns:
+        PrefixSums: Totals over the availability column
+        List[Tuple[float, float, float]]: (start, end, downtime seconds) per outage, in time order
+    """
+    sums = array('d', [0.0])
+    counts = array('q', [0])
+    outages = []
+    running = 0.0
+    n = 0
+    start = None
+    previous = None
+    downtime = 0.0
+    for ts, value in zip(timestamps, column):
+        if value == value:
+            running += value
+            n += 1
+        sums.append(running)
+        counts.append(n)
+
+        if start is not None and (value != value or value >= OUTAGE_BELOW or ts - previous > interval):
+            outages.append((start, previous + interval, downtime))
+            start = None
+        if value < OUTAGE_BELOW:
+            if start is None:
+                start = ts
+                downtime = 0.0
+            downtime += (100.0 - value) / 100.0 * interval
+        previous = ts
+    if start is not None:
+        outages.append((start, previous + interval, downtime))
+    return PrefixSums.from_totals(timestamps, sums, counts), outages
+
+def window_scan(device, windows: List[Tuple[str, float]], end: float, interval: float) -> Tuple[List[Tuple[float, int]], List[Tuple[float, float, float]]]:
+    """
+    One device's availability totals per report window and its outages, from one scan_availability pass
+
+    Args:
+        device (DeviceSeries): Availability series
+        windows (List[Tuple[str, float]]): (label, start) of each report window
+        end (float): Exclusive end of every window
+        interval (float): Seconds each sample covers
+
+    Returns:
+        List[Tuple[float, int]]: (sum, sample count) per window
+        List[Tuple[float, float, float]]: (start, end, downtime seconds) per outage
+    """
+    sums, outages = scan_availability(device.timestamps, device.columns[0], interval)
+    return [sums.total(start, end) for _, start in windows], outages
+
+def _format(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+def outage_row(name: str, device_type: str, outage: Tuple[float, float, float]) -> Dict:
+    """
+    Report row for one device outage
+    """
+    start, end, downtime = outage
+    return {
+        'Device': name,
+        'Type': device_type,
+        'Start': _format(start),
+        'End': _format(end),
+        'Hours': round((end - start) / 3600, 1),
+        'Downtime': round(downtime / 3600, 1),
+    }
+
+def outage_timeline(per_device: Iterable[List[Tuple[float, float, float]]]) -> List[Dict]:
+    """
+    Merges every device's outages into tenant incidents: overlapping or touching outages become one interval
+
+    Args:
+        per_device (Iterable[List]): Each device's (start, end, downtime) list, in time order
+
+    Returns:
+        List[Dict]: Incidents in time order with start, end, hours and the number of device outages they contain
+    """
+    timeline = []
+    current = None
+    for start, end, _ in merge(*per_device):
+        if current is not None and start <= current[1]:
+            current[1] = max(current[1], end)
+            current[2] += 1
+            continue
+        if current is not None:
+            timeline.append(current)
+        current = [start, end, 1]
+    if current is not None:
+        timeline.append(current)
+    return [
+        {'Start': _format(start), 'End': _format(end), 'Hours': round((end - start) / 3600, 1), 'Outages': count}
+        for start, end, count in timeline
+    ]
+
+def longest_outages(rows: Iterable[Tuple[float, Dict]], n: int = LONGEST_OUTAGES) -> List[Dict]:
+    """
+    The n longest device outages
+
+    Args:
+        rows (Iterable[Tuple[float, Dict]]): (duration seconds, outage_row) pairs
+        n (int): How many to keep
+
+    Returns:
+        List[Dict]: Rows, longest first
+    """
+    top = TopK(n)
+    for duration, row in rows:
+        top.push(row, duration)
+    return top.items()
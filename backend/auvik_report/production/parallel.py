@@ -0,0 +1,187 @@
+from .series import DeviceSeries
+from auvik_report.env import load_env
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, List, Tuple
+import os
+import threading
+
+#Load the contents from the .env file
+load_env()
+
+#Worker processes for per-device aggregation, 0 aggregates on the report's own thread
+AGGREGATE_PROCESSES: int = int(os.getenv('AGGREGATE_PROCESSES', '0'))
+#Fewer series than this are aggregated on the report's own thread, where handing them over would cost more than it saves
+AGGREGATE_MIN_SERIES: int = int(os.getenv('AGGREGATE_MIN_SERIES', '500'))
+#Chunks per worker, so one slow chunk does not leave the other workers idle
+CHUNKS_PER_PROCESS = 4
+
+_ITEM = array('d').itemsize
+
+_pool: ProcessPoolExecutor = None
+_pool_lock = threading.Lock()
+
+class SharedSeries:
+    """
+    The samples of many series packed into one shared memory block, so worker processes map them instead of unpickling them
+
+    The block holds every series' timestamps back to back, then each value column the same way; series i
+    spans offsets[i]:offsets[i + 1] of each. Columns a series lacks are NaN. Names and IDs stay in the parent.
+
+    Attributes:
+        offsets (array): Start of each series in every section, plus the total
+        width (int): Value columns per series
+        shm (SharedMemory): The block, unlinked by close()
+    """
+    __slots__ = ('offsets', 'width', 'shm')
+
+    def __init__(self, series: List[DeviceSeries]):
+        self.offsets = offsets = array('q', [0])
+        for device in series:
+            offsets.append(offsets[-1] + len(device))
+        self.width = width = max((len(device.columns) for device in series), default=0)
+        total = offsets[-1]
+        self.shm = SharedMemory(create=True, size=max(1, total * (width + 1) * _ITEM))
+        view = self.shm.buf.cast('d')
+        try:
+            nan = array('d', [float('nan')])
+            for i, device in enumerate(series):
+                lo, hi = offsets[i], offsets[i + 1]
+                view[lo:hi] = device.timestamps
+                for c in range(width):
+                    start = (c + 1) * total
+                    view[start + lo:start + hi] = device.columns[c] if c < len(device.columns) else nan * (hi - lo)
+        finally:
+            view.release()
+
+    def handle(self) -> Tuple[str, bytes, int]:
+        """
+        What a worker needs to map the block: its name, the offsets and the width
+        """
+        return self.shm.name, self.offsets.tobytes(), self.width
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self) -> 'SharedSeries':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def _run_chunk(kernel: Callable, handle: Tuple[str, bytes, int], lo: int, hi: int, args: Tuple) -> List:
+    """
+    Applies a kernel to series lo:hi of a shared block, in a worker process
+    """
+    name, offsets_bytes, width = handle
+    offsets = array('q')
+    offsets.frombytes(offsets_bytes)
+    total = offsets[-1]
+    # workers share the parent's resource tracker, so attaching registers nothing new and only the parent unlinks
+    shm = SharedMemory(name=name)
+    try:
+        view = shm.buf.cast('d')
+        try:
+            return _apply(kernel, view, offsets, total, width, lo, hi, args)
+        finally:
+            view.release()
+    finally:
+        shm.close()
+
+def _apply(kernel: Callable, view: memoryview, offsets: array, total: int, width: int, lo: int, hi: int, args: Tuple) -> List:
+    """
+    Wraps each series as a DeviceSeries over slices of the block and collects the kernel's results
+    """
+    results = []
+    for i in range(lo, hi):
+        start, end = offsets[i], offsets[i + 1]
+        columns = tuple(view[(c + 1) * total + start:(c + 1) * total + end] for c in range(width))
+        device = DeviceSeries(timestamps=view[start:end], columns=columns)
+        results.append(kernel(device, *args))
+        # the slices must be gone before the block can be closed
+        for column in columns:
+            column.release()
+        device.timestamps.release()
+    return results
+
+def pool() -> ProcessPoolExecutor:
+    """
+    The shared worker pool, started on first use with AGGREGATE_PROCESSES workers
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # workers come from a clean server process: they neither inherit the report threads' locks
+            # nor re-import the web app, which spawn would do through __main__
+            if 'forkserver' in get_all_start_methods():
+                context = get_context('forkserver')
+                context.set_forkserver_preload([__name__])
+            else:
+                context = get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=AGGREGATE_PROCESSES, mp_context=context)
+        return _pool
+
+def shutdown() -> None:
+    """
+    Stops the worker pool; the next aggregation starts a new one sized by AGGREGATE_PROCESSES
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+def chunks(offsets: array, parts: int) -> List[Tuple[int, int]]:
+    """
+    Splits series into at most parts contiguous runs holding about the same number of samples
+
+    Args:
+        offsets (array): Series start offsets plus the total, as in SharedSeries
+        parts (int): How many runs
+
+    Returns:
+        List[Tuple[int, int]]: (first, end) series index of each run
+    """
+    n = len(offsets) - 1
+    total = offsets[-1]
+    runs = []
+    lo = 0
+    for part in range(1, parts + 1):
+        goal = total * part / parts
+        hi = lo
+        while hi < n and (offsets[hi + 1] <= goal or hi == lo):
+            hi += 1
+        if part == parts:
+            hi = n
+        if hi > lo:
+            runs.append((lo, hi))
+        lo = hi
+    return runs
+
+def aggregate(kernel: Callable, series: List[DeviceSeries], *args: Any) -> List:
+    """
+    Applies kernel(device, *args) to every series, in worker processes when the series are many
+
+    The kernel must be a module-level function (workers import it by name) that only reads the
+    timestamps and value columns; the series it sees there carry no IDs or names.
+
+    Args:
+        kernel (Callable): The per-series aggregation
+        series (List[DeviceSeries]): The series
+        *args: Extra kernel arguments, pickled once per chunk
+
+    Returns:
+        List: The kernel's result for each series, in order
+    """
+    if AGGREGATE_PROCESSES < 1 or len(series) < max(1, AGGREGATE_MIN_SERIES):
+        return [kernel(device, *args) for device in series]
+    with SharedSeries(series) as shared:
+        handle = shared.handle()
+        futures = [
+            pool().submit(_run_chunk, kernel, handle, lo, hi, args)
+            for lo, hi in chunks(shared.offsets, AGGREGATE_PROCESSES * CHUNKS_PER_PROCESS)
+        ]
+        return [result for future in futures for result in future.result()]
@@ -0,0 +1,176 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple, Union
+
+HOUR = 3600
+DAY = 86400
+INTERVAL_SECONDS = {'hour': HOUR, 'day': DAY}
+
+#Stats the report reduces to a plain mean; over whole UTC days the mean of daily buckets equals the hourly mean.
+#Uptime is not one of them: outage detection needs the hourly samples
+MEAN_STATS = {'bandwidth', 'cpuUtilization', 'memoryUtilization', 'storageUtilization'}
+ROLLING_PERIODS = {'7': 7, '30': 30, '90': 90}
+DEFAULT_PERIOD = '30'
+#Shorter windows shown next to the full period when they fit inside it
+COMPARISON_DAYS = (7, 30)
+
+#The report clock while a report is being built, so every section and request sees the same "now"
+_snapshot: ContextVar[Optional[datetime]] = ContextVar('report_snapshot', default=None)
+
+def snapshot_now() -> datetime:
+    """
+    The current UTC time floored to the hour, or the time pinned by snapshot()
+
+    Query windows built from it are identical for every request made in the same hour, so URLs repeat
+    between sections, workers and reports and the HTTP response cache can serve them.
+    """
+    pinned = _snapshot.get()
+    if pinned is not None:
+        return pinned
+    return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+@contextmanager
+def snapshot(now: datetime = None):
+    """
+    Pins snapshot_now for the enclosed block (and contexts copied from it); an outer pin wins
+
+    Args:
+        now (datetime): The time to pin, defaults to snapshot_now()
+    """
+    if _snapshot.get() is not None:
+        yield _snapshot.get()
+        return
+    pinned = now or snapshot_now()
+    token = _snapshot.set(pinned)
+    try:
+        yield pinned
+    finally:
+        _snapshot.reset(token)
+
+class ReportPeriod:
+    """
+    The time span a report covers, always whole UTC days ending at midnight
+
+    Attributes:
+        label (str): '7', '30', '90' or 'month'
+        start (datetime): Inclusive start (00:00 UTC)
+        end (datetime): Exclusive end (00:00 UTC)
+    """
+    __slots__ = ('label', 'start', 'end')
+
+    def __init__(self, label: str, start: datetime, end: datetime):
+        self.label = label
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def rolling(cls, days: int, now: datetime = None) -> 'ReportPeriod':
+        """
+        The last `days` complete days
+        """
+        now = now or snapshot_now()
+        end = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return cls(str(days), end - timedelta(days=days), end)
+
+    @classmethod
+    def calendar_month(cls, now: datetime = None) -> 'ReportPeriod':
+        """
+        The previous full calendar month
+        """
+        now = now or snapshot_now()
+        end = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start = (end - timedelta(days=1)).replace(day=1)
+        return cls('month', start, end)
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days
+
+    @property
+    def start_ts(self) -> float:
+        return self.start.timestamp()
+
+    @property
+    def end_ts(self) -> float:
+        return self.end.timestamp()
+
+    @property
+    def heading(self) -> str:
+        """
+        Date shown in the report header
+        """
+        if self.label == 'month':
+            return self.start.strftime('%B %Y')
+        last = self.end - timedelta(days=1)
+        return f"{self.start.strftime('%b %d')} - {last.strftime('%b %d, %Y')}"
+
+    def windows(self) -> List[Tuple[str, float]]:
+        """
+        The report windows that end with the period, shortest first and the full period last
+
+        Returns:
+            List[Tuple[str, float]]: Column label and start in epoch seconds
+        """
+        end = self.end_ts
+        windows = [(f'{days} Days', end - days * DAY) for days in COMPARISON_DAYS if days < self.days]
+        full = self.start.strftime('%B') if self.label == 'month' else f'{self.days} Days'
+        windows.append((full, self.start_ts))
+        return windows
+
+    def __repr__(self) -> str:
+        return f"ReportPeriod('{self.label}', {self.start:%Y-%m-%d}, {self.end:%Y-%m-%d})"
+
+def resolve_period(period: Union[str, int, ReportPeriod, None] = None) -> ReportPeriod:
+    """
+    Turns a request parameter into a ReportPeriod
+
+    Args:
+        period (str | int | ReportPeriod | None): 7, 30, 90, 'month' or None for the default
+
+    Returns:
+        ReportPeriod: The resolved period
+
+    Raises:
+        ValueError: If the period is not supported
+    """
+    if isinstance(period, ReportPeriod):
+        return period
+    label = DEFAULT_PERIOD if period is None else str(period).strip().lower()
+    if label == 'month':
+        return ReportPeriod.calendar_month()
+    if label in ROLLING_PERIODS:
+        return ReportPeriod.rolling(ROLLING_PERIODS[label])
+    raise ValueError(f"Unsupported report period '{period}', expected one of 7, 30, 90, month")
+
+def choose_interval(stat: str, days: int) -> str:
+    """
+    Picks the coarsest Auvik stat interval that keeps the report value exact
+
+    Args:
+        stat (str): The stat ID, e.g. 'bandwidth' or 'utilization'
+        days (int): Length of the report period
+
+    Returns:
+        str: 'day' for stats reported as means over whole days, otherwise 'hour'
+    """
+    if stat in MEAN_STATS and days >= 1:
+        return 'day'
+    # filtered averages (interface utilization, broadcast packets) need the individual hourly samples
+    return 'hour'
+
+def format_window(window: Tuple[float, float]) -> Tuple[str, str]:
+    """
+    Formats an epoch [start, end) window as Auvik fromTime/thruTime filters
+
+    Args:
+        window (Tuple[float, float]): Inclusive start and exclusive end in epoch seconds
+
+    Returns:
+        Str: fromTime
+        Str: thruTime (one second before the end, since Auvik treats it as inclusive)
+    """
+    start, end = window
+    fmt = '%Y-%m-%dT%H:%M:%S.000Z'
+    return (datetime.fromtimestamp(start, timezone.utc).strftime(fmt),
+            datetime.fromtimestamp(end - 1, timezone.utc).strftime(fmt))
@@ -1,69 +1,237 @@
-from dotenv import load_dotenv
-from typing import List, Dict
+from typing import List, Dict, Callable, Iterable, Tuple
+from itertools import chain
 import os
 import sys
 from collections import defaultdict
+from auvik_report.env import load_env
 
 #Adds root directory to import path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 #Imports fetchers
-from .fetchers import fetch_device_availability_stats, fetch_open_alerts, fetch_device_stats, fetch_interface_stats
+from .fetchers import fetch_device_availability_stats, fetch_device_stats, fetch_interface_stats
 
 
+#Local time-series store for delta fetching
+from auvik_report import tsstore, alertstore
+
+#Progress events for streamed report generation
+from auvik_report import progress
+
+#Report period and interval selection
+from .period import ReportPeriod, choose_interval, INTERVAL_SECONDS
+
 #imports date range function
-from .helpers import health_scores, bandwidth_average, max_interface_average, stats_per_device
+from .helpers import health_scores, bandwidth_average, bandwidth_windows, max_interface_average, stats_per_device, digest_series
+from .outages import window_scan, outage_row, outage_timeline, longest_outages
+from .parallel import aggregate
+from .topk import TopK
+from .networks import network_index, network_of
 
 #Load the contents from the .env file
-load_dotenv('.env')
+load_env()
 
 #Get the data you need to use in your code
 auvik_username: str = os.getenv('AUVIK_USERNAME')
 auvik_api_key: str = os.getenv('AUVIK_API_KEY')
 base_url: str = os.getenv('BASE_URL')
 
-def uptime_report(tenant: str) -> Dict:
+#'mean' scores device health on period means; 'p95' also fetches hourly samples and weighs each stat's p95
+HEALTH_MODE: str = os.getenv('HEALTH_MODE', 'mean')
+#Share of each stat taken from its p95 in 'p95' mode
+HEALTH_P95_WEIGHT: float = float(os.getenv('HEALTH_P95_WEIGHT', '0.5'))
+#Rows kept in the bandwidth (highest total first) and health (lowest score first) tables, 0 keeps every device
+REPORT_TABLE_ROWS: int = int(os.getenv('REPORT_TABLE_ROWS', '25'))
+
+#Device types in the uptime and bandwidth reports
+UPTIME_TYPES = {'firewall', 'router', 'switch', 'stack', 'accessPoint', 'server', 'camera', 'storage'}
+BANDWIDTH_TYPES = ('firewall', 'router', 'switch', 'stack', 'accessPoint')
+#Stats the health scores are computed from
+HEALTH_STATS = ('cpuUtilization', 'memoryUtilization', 'storageUtilization')
+
+def synced_stats(tenant: str, stat: str, fetch: Callable, period: ReportPeriod, key: str = None, interval: str = None,
+                 stream: bool = False) -> Iterable:
+    """
+    Pulls a device stat for the report period through the local time-series store
+
+    Args:
+        tenant (str): The tenant ID
+        stat (str): The stat ID, used to pick the interval
+        fetch (Callable): fetch(window, interval) returning series for the epoch window
+        period (ReportPeriod): The report period
+        key (str): Store key, defaults to f'device-{stat}'
+        interval (str): 'hour' or 'day', defaults to choose_interval
+        stream (bool): Yield the stored rows chunk by chunk (see tsstore.scan) instead of one merged series per device
+
+    Returns:
+        List[DeviceSeries]: One series per device covering the period, or an iterator of chunks when streaming
+    """
+    interval = interval or choose_interval(stat, period.days)
+    key = f"{key or f'device-{stat}'}-{interval}"
+    synced = tsstore.sync(
+        tenant, key,
+        lambda start, end: fetch((start, end), interval),
+        period.start_ts, period.end_ts, collect=not stream
+    )
+    if not stream:
+        return synced
+    return chain(tsstore.scan(tenant, key, period.start_ts, period.end_ts), synced)
+
+def availability_series(tenant: str, period: ReportPeriod) -> List:
+    """
+    Every device's availability over the report period
+
+    Args:
+        tenant (str): The tenant ID
+        period (ReportPeriod): The report period
+
+    Returns:
+        List[DeviceSeries]: One availability series per device
+    """
+    return synced_stats(
+        tenant, 'uptime',
+        lambda window, interval: fetch_device_availability_stats(tenant, window, interval),
+        period, 'deviceAvailability-uptime'
+    )
+
+def bandwidth_series(tenant: str, period: ReportPeriod, device_type: str) -> List:
+    """
+    Bandwidth of every device of one type over the report period
+
+    Args:
+        tenant (str): The tenant ID
+        period (ReportPeriod): The report period
+        device_type (str): One of BANDWIDTH_TYPES
+
+    Returns:
+        List[DeviceSeries]: One (tx, rx, total) series per device
+    """
+    return synced_stats(
+        tenant, 'bandwidth',
+        lambda window, interval: fetch_device_stats(tenant, 'bandwidth', device_type, window, interval),
+        period, f'device-bandwidth-{device_type}'
+    )
+
+def health_series(tenant: str, period: ReportPeriod, stat: str, quantiles: bool = False) -> List:
+    """
+    One health stat of every device over the report period
+
+    Args:
+        tenant (str): The tenant ID
+        period (ReportPeriod): The report period
+        stat (str): One of HEALTH_STATS
+        quantiles (bool): Fold hourly samples into a StatDigest per device, as 'p95' health mode needs;
+            the store is read a chunk at a time, so no device's samples are ever held together
+
+    Returns:
+        List[DeviceSeries] | List[StatDigest]: One series, or one digest, per device
+    """
+    series = synced_stats(
+        tenant, stat,
+        lambda window, interval: fetch_device_stats(tenant, stat, window=window, interval=interval),
+        period, interval='hour' if quantiles else None, stream=quantiles
+    )
+    return digest_series(series) if quantiles else series
+
+def uptime_report(tenant: str, period: ReportPeriod = None) -> Dict:
     """
     Generates a uptime report for the tenant
     
     Args:
         Tenant (str): The tenant ID
+        period (ReportPeriod): The report period, defaults to the last 30 days
 
     Return:
-        Dict: Contains the device type and average
-    """
-    uptime = defaultdict(float)
-    count = defaultdict(int)
-    valid_types = {'firewall', 'router', 'switch', 'stack', 'accessPoint', 'server', 'camera', 'storage'}
-    device_availability = fetch_device_availability_stats(tenant)
-    for device in device_availability:
-        device_type = device['relationships']['device']['data']['deviceType']
-        if device_type in valid_types:
-            device_type = device_type.capitalize()
-            if device_type == 'Accesspoint':
-                device_type = 'Access Point'
-            data = device['attributes']['stats'][0]['data']
-            for day in data:
-                uptime[device_type] += day[1]
-                count[device_type] += 1
+        Dict: Device type mapped to the average uptime of each report window
+    """
+    return uptime_and_outages(tenant, period)[0]
 
-    averages = {}
-    for device in uptime:
-        averages[device] = round(uptime[device]/count[device], 3)
+def window_averages(uptime: Dict[str, List[float]], count: Dict[str, List[int]], windows: List[Tuple[str, float]]) -> Dict[str, Dict[str, float]]:
+    """
+    Turns per-window uptime totals and sample counts into averages
 
+    Args:
+        uptime (Dict[str, List[float]]): Group mapped to the summed availability of each window
+        count (Dict[str, List[int]]): Group mapped to the sample count of each window
+        windows (List[Tuple[str, float]]): (label, start) of each report window
+
+    Returns:
+        Dict[str, Dict[str, float]]: Group mapped to the average uptime of each window that has samples
+    """
+    averages = {}
+    for group in uptime:
+        averages[group] = {
+            label: round(uptime[group][i]/count[group][i], 3)
+            for i, (label, _) in enumerate(windows) if count[group][i]
+        }
     return averages
 
+def uptime_and_outages(tenant: str, period: ReportPeriod = None, index: Dict[str, str] = None,
+                       availability: List = None) -> Tuple[Dict, Dict, Dict]:
+    """
+    Generates the uptime report, the outage report and the per-network uptime from one pass over each device's availability
+
+    Args:
+        Tenant (str): The tenant ID
+        period (ReportPeriod): The report period, defaults to the last 30 days
+        index (Dict[str, str]): Device ID to network name, defaults to the tenant's network_index
+        availability (List[DeviceSeries]): Already fetched availability_series, fetched here if None
+
+    Return:
+        Dict: Device type mapped to the average uptime of each report window
+        Dict: 'timeline', the tenant's merged outage incidents in time order, and 'longest', the longest device outages
+        Dict: Network mapped to the average uptime of each report window
+    """
+    period = period or ReportPeriod.rolling(30)
+    index = network_index(tenant) if index is None else index
+    windows = period.windows()
+    end = period.end_ts
+    uptime = defaultdict(lambda: [0.0] * len(windows))
+    count = defaultdict(lambda: [0] * len(windows))
+    network_uptime = defaultdict(lambda: [0.0] * len(windows))
+    network_count = defaultdict(lambda: [0] * len(windows))
+    interval = choose_interval('uptime', period.days)
+    device_availability = availability_series(tenant, period) if availability is None else availability
+    per_device = []
+    rows = []
+    devices = [device for device in device_availability if device.device_type in UPTIME_TYPES and len(device)]
+    # one pass of running totals per device answers every window and finds the outages
+    scans = aggregate(window_scan, devices, windows, end, INTERVAL_SECONDS[interval])
+    for device, (totals, outages) in zip(devices, scans):
+        device_type = device.device_type.capitalize()
+        if device_type == 'Accesspoint':
+            device_type = 'Access Point'
+        network = network_of(index, device)
+        for i, (total, n) in enumerate(totals):
+            uptime[device_type][i] += total
+            count[device_type][i] += n
+            network_uptime[network][i] += total
+            network_count[network][i] += n
+        if outages:
+            per_device.append(outages)
+            rows.extend((outage[1] - outage[0], outage_row(device.device_name, device_type, outage)) for outage in outages)
+
+    return (
+        window_averages(uptime, count, windows),
+        {'timeline': outage_timeline(per_device), 'longest': longest_outages(rows)},
+        window_averages(network_uptime, network_count, windows),
+    )
+
 def open_alerts(tenant: str) -> Dict[str, int]:
     """
     Reports the number of open alerts for at each serverity level
 
+    Counts come from the local alert state. Only the open set is re-fetched first, at most once per
+    ALERT_SYNC_SECONDS (see alertstore.sync), so the counts are at most that old and cost one query.
+
     Args:
         tenant (str): The tenant ID
 
     Results:
         Dict[str, int]: The number of open alerts at each severity level
     """
-    open_alerts = fetch_open_alerts(tenant)
+    alertstore.sync(tenant, reconcile=True)
+    open_alerts = alertstore.open_counts(tenant)
     if len(open_alerts) == 0:
         return {
             "No Devices" : 0
@@ -77,15 +245,27 @@ def open_alerts(tenant: str) -> Dict[str, int]:
             'Paused': 0,
             'Unknown': 0
         }
-        for alert in open_alerts:
-            severity = alert['attributes']['severity'].capitalize()
-            status = alert['attributes']['status'].capitalize()
-            counts[severity] += 1
-            if status == 'Paused':
-                counts[status] += 1
+        for severity, status, count in open_alerts:
+            counts[severity.capitalize()] += count
+            if status.capitalize() == 'Paused':
+                counts['Paused'] += count
     return counts
 
-def bandwidth_report(tenant: str) -> List[Dict]:
+def bandwidth_report(tenant: str, period: ReportPeriod = None) -> List[Dict]:
+    """
+    Reports bandwidth utilization for the network, see bandwidth_and_networks
+
+    Args:
+        Tenant (str): The tenant ID
+        period (ReportPeriod): The report period, defaults to the last 30 days
+
+    Returns:
+        List[Dict]: One row per reported device
+    """
+    return bandwidth_and_networks(tenant, period)[0]
+
+def bandwidth_and_networks(tenant: str, period: ReportPeriod = None, index: Dict[str, str] = None,
+                           dtypes: List[List] = None) -> Tuple[List[Dict], Dict[str, Dict]]:
     """
     Reports bandwidth utilization for the network. Included:
         -Device
@@ -95,62 +275,87 @@ def bandwidth_report(tenant: str) -> List[Dict]:
         -Total
         -Top interface
         -Average utilization
+        -Total for each shorter report window
+
+    Only the REPORT_TABLE_ROWS devices with the highest total are reported, but the per-network
+    subtotals, summed in the same ranking pass, cover every monitored device.
 
     Args:
         Tenant (str): The tenant ID
-    
+        period (ReportPeriod): The report period, defaults to the last 30 days
+        index (Dict[str, str]): Device ID to network name, defaults to the tenant's network_index
+        dtypes (List[List[DeviceSeries]]): Already fetched bandwidth_series of each BANDWIDTH_TYPES type, fetched here if None
+
     Returns:
-        Dict: All report elements
+        List[Dict]: All report elements
+        Dict[str, Dict]: Network mapped to its monitored device count and summed TX, RX and Total averages
     """
     report = []
+    period = period or ReportPeriod.rolling(30)
+    index = network_index(tenant) if index is None else index
 
-    firewalls = fetch_device_stats(tenant, 'bandwidth', 'firewall')
-    routers = fetch_device_stats(tenant, 'bandwidth', 'router')
-    switches = fetch_device_stats(tenant, 'bandwidth', 'switch')
-    stack = fetch_device_stats(tenant, 'bandwidth', 'stack')
-    aps = fetch_device_stats(tenant, 'bandwidth', 'accessPoint')
-
-    dtypes = [firewalls, routers, switches, stack, aps]
-
-    for dtype in dtypes:
-        for device in dtype:
-            name = device['relationships']['device']['data']['deviceName']
-            device_type =  device['relationships']['device']['data']['deviceType'].capitalize()
-            if device_type == 'Accesspoint':
-                device_type = 'Access Point'
-            #Check to make sure device is monitored
-            if len(device['attributes']['stats'][0]['data']) > 0:
-                tx_avg, rx_avg, total_avg = bandwidth_average(device)
-                max_name, max_avg = max_interface_average(device)
-                report.append(
-                    {
-                        'Device': name,
-                        'Type': device_type,
-                        'TX': tx_avg,
-                        'RX': rx_avg,
-                        'Total': total_avg,
-                        'Top Interface': max_name,
-                        'Average Utilization': max_avg
-                    }
-                )
+    if dtypes is None:
+        dtypes = [bandwidth_series(tenant, period, device_type) for device_type in BANDWIDTH_TYPES]
 
-    return report
+    #Rank by total first so the interface fan-out only runs for the devices that make the table
+    top = TopK(REPORT_TABLE_ROWS or None)
+    networks = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+    #Check to make sure device is monitored
+    monitored = [device for dtype in dtypes for device in dtype if len(device) > 0]
+    for device, averages in zip(monitored, aggregate(bandwidth_average, monitored)):
+        top.push((device, averages), averages[2])
+        subtotal = networks[network_of(index, device)]
+        subtotal[0] += 1
+        for i, average in enumerate(averages, 1):
+            subtotal[i] += average
+    ranked = top.items()
+
+    progress.emit('interfaces', done=0, total=len(ranked))
+    for done, (device, (tx_avg, rx_avg, total_avg)) in enumerate(ranked, 1):
+        name = device.device_name
+        device_type =  device.device_type.capitalize()
+        if device_type == 'Accesspoint':
+            device_type = 'Access Point'
+        max_name, max_avg = max_interface_average(device, period)
+        report.append(
+            {
+                'Device': name,
+                'Type': device_type,
+                'TX': tx_avg,
+                'RX': rx_avg,
+                'Total': total_avg,
+                'Top Interface': max_name,
+                'Average Utilization': max_avg,
+                'Windows': bandwidth_windows(device, period.windows(), period.end_ts)
+            }
+        )
+        progress.emit('interfaces', done=done, total=len(ranked))
 
-def device_health(tenant: str) -> List[Dict]:
+    subtotals = {
+        network: {'Devices': devices, 'TX': round(tx, 3), 'RX': round(rx, 3), 'Total': round(total, 3)}
+        for network, (devices, tx, rx, total) in networks.items()
+    }
+    return report, subtotals
+
+def device_health(tenant: str, period: ReportPeriod = None, mode: str = None, stats: Tuple[List, List, List] = None) -> List[Dict]:
     """
     Gets device statistics over the course of a month and quantifies the health to identify potential problem devices
 
     Args:
         Tenant (str): The tenant ID
+        period (ReportPeriod): The report period, defaults to the last 30 days
+        mode (str): 'mean' or 'p95', defaults to HEALTH_MODE. 'p95' reads hourly samples so short
+            saturation is not averaged away, and weighs each stat's p95 by HEALTH_P95_WEIGHT
+        stats (Tuple[List, List, List]): Already fetched health_series of each HEALTH_STATS stat, fetched here if None
 
     Returns:
         List[Dict]: The device utilization stats
         List[Dict]: Teh device health scores
 
     """
-    cpu = fetch_device_stats(tenant, 'cpuUtilization')
-    memory = fetch_device_stats(tenant, 'memoryUtilization')
-    storage = fetch_device_stats(tenant, 'storageUtilization')
-    device_stats = stats_per_device(cpu, memory, storage)
-    report = health_scores(device_stats)
-    return report
\ No newline at end of file
+    period = period or ReportPeriod.rolling(30)
+    quantiles = (mode or HEALTH_MODE) == 'p95'
+    cpu, memory, storage = stats or (health_series(tenant, period, stat, quantiles) for stat in HEALTH_STATS)
+    device_stats = stats_per_device(cpu, memory, storage, quantiles)
+    report = health_scores(device_stats, HEALTH_P95_WEIGHT if quantiles else 0.0, REPORT_TABLE_ROWS or None)
+    return report
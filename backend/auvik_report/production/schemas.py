@@ -0,0 +1,59 @@
+from msgspec import Struct, field
+from typing import List, Optional, Union
+
+#Only the fields the reports read are declared; msgspec skips everything else while parsing
+
+class Links(Struct):
+    next: Optional[str] = None
+
+class Stat(Struct):
+    data: List[List[Union[float, str, None]]] = []
+
+class StatAttributes(Struct):
+    stats: List[Stat] = []
+
+class DeviceRef(Struct):
+    id: Optional[str] = None
+    deviceName: Optional[str] = None
+    deviceType: Optional[str] = None
+
+class DeviceLink(Struct):
+    data: DeviceRef = field(default_factory=DeviceRef)
+
+class DeviceRelationships(Struct):
+    device: DeviceLink = field(default_factory=DeviceLink)
+
+class InterfaceRef(Struct):
+    interfaceName: Optional[str] = None
+    interfaceType: Optional[str] = None
+    parentDevice: Optional[str] = None
+
+class InterfaceLink(Struct):
+    data: InterfaceRef = field(default_factory=InterfaceRef)
+
+class InterfaceRelationships(Struct):
+    interface: InterfaceLink = field(default_factory=InterfaceLink)
+
+class DeviceStat(Struct):
+    """
+    One element of a stat/device/* or stat/deviceAvailability/* response
+    """
+    id: Optional[str] = None
+    attributes: StatAttributes = field(default_factory=StatAttributes)
+    relationships: DeviceRelationships = field(default_factory=DeviceRelationships)
+
+class InterfaceStat(Struct):
+    """
+    One element of a stat/interface/* response
+    """
+    id: Optional[str] = None
+    attributes: StatAttributes = field(default_factory=StatAttributes)
+    relationships: InterfaceRelationships = field(default_factory=InterfaceRelationships)
+
+class DeviceStatPage(Struct):
+    data: List[DeviceStat] = []
+    links: Links = field(default_factory=Links)
+
+class InterfaceStatPage(Struct):
+    data: List[InterfaceStat] = []
+    links: Links = field(default_factory=Links)
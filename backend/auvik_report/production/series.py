@@ -0,0 +1,285 @@
+from datetime import datetime, timezone
+from bisect import bisect_left, bisect_right
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+def _epoch(value) -> float:
+    """
+    Normalizes a stat timestamp to epoch seconds
+
+    Args:
+        value (int | float | str): Epoch seconds or an ISO 8601 UTC string
+
+    Returns:
+        float: Epoch seconds
+    """
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc).timestamp()
+    return float(value)
+
+def _number(value) -> float:
+    """
+    Converts a sample value to float, treating missing samples as NaN
+    """
+    return float('nan') if value is None else float(value)
+
+def columns_from_rows(rows: List[list]) -> Tuple[array, Tuple[array, ...]]:
+    """
+    Transposes Auvik stat rows ([ts, v1, v2, ...]) into packed double columns
+
+    Args:
+        rows (List[list]): The 'data' list of a stat element
+
+    Returns:
+        array: Timestamps in epoch seconds
+        Tuple[array, ...]: One array per value column, in legend order
+    """
+    if not rows:
+        return array('d'), ()
+    width = len(rows[0])
+    try:
+        timestamps = array('d', [row[0] for row in rows])
+    except TypeError:
+        timestamps = array('d', [_epoch(row[0]) for row in rows])
+    columns = []
+    for i in range(1, width):
+        try:
+            columns.append(array('d', [row[i] for row in rows]))
+        except TypeError:
+            columns.append(array('d', [_number(row[i]) for row in rows]))
+    return timestamps, tuple(columns)
+
+class DeviceSeries:
+    """
+    One device's stat series with timestamps and values stored as array('d') columns
+
+    Attributes:
+        id (str): ID of the stat element (the device ID for device stats)
+        device_id (str): ID of the device
+        device_name (str): Display name of the device
+        device_type (str): Auvik device type, e.g. 'switch'
+        timestamps (array): Sample timestamps in epoch seconds
+        columns (Tuple[array, ...]): Value columns in legend order, e.g. (tx, rx, total) for bandwidth
+    """
+    __slots__ = ('id', 'device_id', 'device_name', 'device_type', 'timestamps', 'columns')
+
+    def __init__(self, id: str = None, device_id: str = None, device_name: str = None, device_type: str = None,
+                 timestamps: array = None, columns: Tuple[array, ...] = ()):
+        self.id = id
+        self.device_id = device_id
+        self.device_name = device_name
+        self.device_type = device_type
+        self.timestamps = timestamps if timestamps is not None else array('d')
+        self.columns = columns
+
+    @classmethod
+    def from_element(cls, element: Dict) -> 'DeviceSeries':
+        """
+        Builds a series from one element of a stat/device/* or stat/deviceAvailability/* response
+
+        Args:
+            element (Dict): The JSON:API element
+
+        Returns:
+            DeviceSeries: The compact series
+        """
+        device = element.get('relationships', {}).get('device', {}).get('data', {})
+        timestamps, columns = columns_from_rows(element['attributes']['stats'][0]['data'])
+        return cls(
+            id=element.get('id'),
+            device_id=device.get('id'),
+            device_name=device.get('deviceName'),
+            device_type=device.get('deviceType'),
+            timestamps=timestamps,
+            columns=columns
+        )
+
+    @classmethod
+    def from_struct(cls, element) -> 'DeviceSeries':
+        """
+        Builds a series from a schemas.DeviceStat decoded by fetch_paginated_data
+
+        Args:
+            element (DeviceStat): The decoded element
+
+        Returns:
+            DeviceSeries: The compact series
+        """
+        device = element.relationships.device.data
+        stats = element.attributes.stats
+        timestamps, columns = columns_from_rows(stats[0].data if stats else [])
+        return cls(
+            id=element.id,
+            device_id=device.id,
+            device_name=device.deviceName,
+            device_type=device.deviceType,
+            timestamps=timestamps,
+            columns=columns
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}('{self.id}', samples={len(self)})"
+
+class InterfaceSeries:
+    """
+    One interface's stat series with timestamps and values stored as array('d') columns
+
+    Attributes:
+        id (str): ID of the stat element (the interface ID)
+        interface_name (str): Display name of the interface
+        interface_type (str): Auvik interface type, e.g. 'ethernet'
+        parent_device (str): ID of the device the interface belongs to
+        timestamps (array): Sample timestamps in epoch seconds
+        columns (Tuple[array, ...]): Value columns in legend order
+    """
+    __slots__ = ('id', 'interface_name', 'interface_type', 'parent_device', 'timestamps', 'columns')
+
+    def __init__(self, id: str = None, interface_name: str = None, interface_type: str = None, parent_device: str = None,
+                 timestamps: array = None, columns: Tuple[array, ...] = ()):
+        self.id = id
+        self.interface_name = interface_name
+        self.interface_type = interface_type
+        self.parent_device = parent_device
+        self.timestamps = timestamps if timestamps is not None else array('d')
+        self.columns = columns
+
+    @classmethod
+    def from_element(cls, element: Dict) -> 'InterfaceSeries':
+        """
+        Builds a series from one element of a stat/interface/* response
+
+        Args:
+            element (Dict): The JSON:API element
+
+        Returns:
+            InterfaceSeries: The compact series
+        """
+        interface = element.get('relationships', {}).get('interface', {}).get('data', {})
+        timestamps, columns = columns_from_rows(element['attributes']['stats'][0]['data'])
+        return cls(
+            id=element.get('id'),
+            interface_name=interface.get('interfaceName'),
+            interface_type=interface.get('interfaceType'),
+            parent_device=interface.get('parentDevice'),
+            timestamps=timestamps,
+            columns=columns
+        )
+
+    @classmethod
+    def from_struct(cls, element) -> 'InterfaceSeries':
+        """
+        Builds a series from a schemas.InterfaceStat decoded by fetch_paginated_data
+
+        Args:
+            element (InterfaceStat): The decoded element
+
+        Returns:
+            InterfaceSeries: The compact series
+        """
+        interface = element.relationships.interface.data
+        stats = element.attributes.stats
+        timestamps, columns = columns_from_rows(stats[0].data if stats else [])
+        return cls(
+            id=element.id,
+            interface_name=interface.interfaceName,
+            interface_type=interface.interfaceType,
+            parent_device=interface.parentDevice,
+            timestamps=timestamps,
+            columns=columns
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}('{self.id}', samples={len(self)})"
+
+def merge_shards(shards: Iterable[List[Union[DeviceSeries, InterfaceSeries]]]) -> List[Union[DeviceSeries, InterfaceSeries]]:
+    """
+    Stitches the results of one stat query fetched as consecutive time shards back into one series per element
+
+    Args:
+        shards (Iterable[List]): Each shard's series, shards in time order
+
+    Returns:
+        List: One series per element ID, in order of first appearance, samples in time order
+    """
+    merged = {}
+    for series_list in shards:
+        for series in series_list:
+            current = merged.get(series.id)
+            if current is None:
+                merged[series.id] = series
+            elif len(series):
+                if not len(current):
+                    current.timestamps, current.columns = series.timestamps, series.columns
+                    continue
+                # a sample on a shard boundary can come back from both sides
+                skip = bisect_right(series.timestamps, current.timestamps[-1])
+                current.timestamps.extend(series.timestamps[skip:])
+                for column, more in zip(current.columns, series.columns):
+                    column.extend(more[skip:])
+    return list(merged.values())
+
+class PrefixSums:
+    """
+    Running totals over one value column, so the sum or mean of any time window is two bisects and a subtraction
+
+    Missing samples (NaN) are skipped and not counted.
+
+    Attributes:
+        timestamps (array): Sample timestamps of the series, sorted
+        sums (array): sums[i] is the total of the first i samples
+        counts (array): counts[i] is the number of non-missing samples among the first i
+    """
+    __slots__ = ('timestamps', 'sums', 'counts')
+
+    def __init__(self, timestamps: array, column: array):
+        self.timestamps = timestamps
+        self.sums = sums = array('d', [0.0])
+        self.counts = counts = array('q', [0])
+        running = 0.0
+        n = 0
+        for value in column:
+            if value == value:
+                running += value
+                n += 1
+            sums.append(running)
+            counts.append(n)
+
+    @classmethod
+    def from_totals(cls, timestamps: array, sums: array, counts: array) -> 'PrefixSums':
+        """
+        Wraps running totals built by a caller that scans the column for something else in the same pass
+        """
+        self = cls.__new__(cls)
+        self.timestamps = timestamps
+        self.sums = sums
+        self.counts = counts
+        return self
+
+    def total(self, start: float = float('-inf'), end: float = float('inf')) -> Tuple[float, int]:
+        """
+        Sum and sample count of the window
+
+        Args:
+            start (float): Inclusive start in epoch seconds
+            end (float): Exclusive end in epoch seconds
+
+        Returns:
+            float: Sum of the samples in [start, end)
+            int: Number of samples summed
+        """
+        lo = bisect_left(self.timestamps, start)
+        hi = bisect_left(self.timestamps, end)
+        return self.sums[hi] - self.sums[lo], self.counts[hi] - self.counts[lo]
+
+    def mean(self, start: float = float('-inf'), end: float = float('inf')) -> Optional[float]:
+        """
+        Mean of the window, or None if it holds no samples
+        """
+        total, n = self.total(start, end)
+        return total / n if n else None
@@ -0,0 +1,169 @@
+from typing import Iterable, List, Optional
+import math
+import random
+
+#Items kept by the top compactor; rank error is roughly 1.7 / SKETCH_K and memory stays under ~3 * SKETCH_K floats
+SKETCH_K = 200
+#Each compactor below the top keeps 2/3 as many items as the one above it
+CAPACITY_DECAY = 2 / 3
+
+class KLLSketch:
+    """
+    Mergeable streaming quantile sketch (Karnin, Lang, Liberty 2016)
+
+    Values enter level 0; when a level fills it is sorted and every other item moves up a
+    level with twice the weight, so memory stays bounded however many samples are added.
+
+    Attributes:
+        k (int): Capacity of the top level, trades memory for accuracy
+        n (int): Number of values added, NaN excluded
+        levels (List[List[float]]): Compactors, level h items weigh 2 ** h
+    """
+    __slots__ = ('k', 'n', 'levels', '_rng')
+
+    def __init__(self, k: int = SKETCH_K, seed: int = None):
+        self.k = k
+        self.n = 0
+        self.levels: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def size(self) -> int:
+        """
+        Items currently held
+        """
+        return sum(len(level) for level in self.levels)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * CAPACITY_DECAY ** depth))
+
+    def _compress(self) -> None:
+        """
+        Compacts every level that is at capacity, lowest first
+        """
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                items.sort()
+                # an odd item out stays behind so the total weight is unchanged
+                keep = [items.pop()] if len(items) % 2 else []
+                self.levels[level + 1].extend(items[self._rng.getrandbits(1)::2])
+                self.levels[level] = keep
+            level += 1
+
+    def update(self, value: float) -> None:
+        """
+        Adds one value, ignoring NaN
+        """
+        if value != value:
+            return
+        self.levels[0].append(value)
+        self.n += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def update_many(self, values: Iterable[float]) -> None:
+        """
+        Adds a batch of values, ignoring NaN, filling level 0 a slice at a time
+        """
+        values = [v for v in values if v == v]
+        self.n += len(values)
+        start = 0
+        while start < len(values):
+            space = max(1, self._capacity(0) - len(self.levels[0]))
+            self.levels[0].extend(values[start:start + space])
+            start += space
+            if len(self.levels[0]) >= self._capacity(0):
+                self._compress()
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """
+        Folds another sketch into this one
+
+        Args:
+            other (KLLSketch): Sketch of a disjoint set of values
+
+        Returns:
+            KLLSketch: self
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimates the value at rank q
+
+        Args:
+            q (float): Rank between 0 and 1, e.g. 0.95
+
+        Returns:
+            float: The estimate, or None when the sketch is empty
+        """
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.levels) for value in items)
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+class StatDigest:
+    """
+    Running mean and quantile sketch of one device's stat, fed a batch of samples at a time
+
+    Attributes:
+        device_id (str): The device ID
+        device_name (str): The device name
+        total (float): Sum of the samples, NaN excluded
+        sketch (KLLSketch): Sketch of the samples; its n counts them
+    """
+    __slots__ = ('device_id', 'device_name', 'total', 'sketch')
+
+    def __init__(self, device_id: str, device_name: str, k: int = SKETCH_K):
+        self.device_id = device_id
+        self.device_name = device_name
+        self.total = 0.0
+        self.sketch = KLLSketch(k)
+
+    def update_many(self, values: Iterable[float]) -> None:
+        values = [v for v in values if v == v]
+        self.total += sum(values)
+        self.sketch.update_many(values)
+
+    def mean(self) -> Optional[float]:
+        """
+        Mean of the samples, None when there are none
+        """
+        return self.total / self.sketch.n if self.sketch.n else None
+
+def exact_quantile(values: Iterable[float], q: float) -> Optional[float]:
+    """
+    The value at rank q by sorting, with the same rank rule as KLLSketch.quantile
+
+    Args:
+        values (Iterable[float]): The samples, NaN ignored
+        q (float): Rank between 0 and 1
+
+    Returns:
+        float: The value, or None when there are no samples
+    """
+    ordered = sorted(v for v in values if v == v)
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
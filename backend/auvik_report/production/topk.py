@@ -0,0 +1,74 @@
+from typing import Any, Callable, Generic, Iterable, List, Optional, TypeVar
+import heapq
+import itertools
+
+T = TypeVar('T')
+
+class TopK(Generic[T]):
+    """
+    Streaming "top N by X": keeps the k highest scoring items seen so far in O(k) memory, O(log k) per push
+
+    Ties keep the item seen first, so rankings are stable across runs over the same input.
+
+    Attributes:
+        k (int): How many items to keep, None keeps every item
+        key (Callable): Scores an item when push is not given a score
+    """
+    __slots__ = ('k', 'key', '_heap', '_seq')
+
+    def __init__(self, k: Optional[int], key: Callable[[T], Any] = None):
+        self.k = k
+        self.key = key
+        # min-heap of (score, -arrival, item): the root is the lowest score, the latest arrival among ties
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item: T, score: Any = None) -> bool:
+        """
+        Offers an item
+
+        Args:
+            item (T): The item, never compared itself
+            score (Any): Its score, defaults to key(item)
+
+        Returns:
+            bool: True if the item is currently kept
+        """
+        if score is None:
+            score = self.key(item)
+        entry = (score, -next(self._seq), item)
+        if self.k is None or len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if self.k and entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def extend(self, items: Iterable[T]) -> 'TopK[T]':
+        """
+        Offers every item, scored by key
+
+        Returns:
+            TopK: self
+        """
+        for item in items:
+            self.push(item)
+        return self
+
+    def threshold(self) -> Any:
+        """
+        The score an item must beat to be kept, or None while there is room
+        """
+        if self.k is None or len(self._heap) < self.k or not self._heap:
+            return None
+        return self._heap[0][0]
+
+    def items(self) -> List[T]:
+        """
+        The kept items, highest score first, ties in arrival order
+        """
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
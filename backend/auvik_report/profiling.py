@@ -0,0 +1,190 @@
+from .generate_report import generate_report, OUTPUT_DIR
+from collections import Counter
+from pathlib import Path
+from typing import Tuple
+import os
+import sys
+import time
+import cProfile
+import argparse
+import threading
+
+SAMPLE_INTERVAL = 0.005
+
+#Innermost matching frame decides the stage, so a fetch issued from inside a report section counts as fetch
+STAGE_MARKERS = (
+    ('fetch', ('fetchers.py', 'exp_fetchers.py')),
+    ('pdf', ('pdfkit',)),
+    ('render', ('jinja2', '.html')),
+    ('aggregation', ('reports.py', 'helpers.py', 'exp_reports.py', 'exp_helpers.py')),
+)
+
+#Pool threads that do report work (sections, fetch shards, billing months); sampled besides the report's own thread
+WORKER_PREFIXES = ('report-step', 'auvik-shard', 'auvik-billing')
+
+#Frame a pool thread runs its current task under; without it the thread is idle
+_WORK_ITEM = (os.path.join('concurrent', 'futures', 'thread.py'), 'run')
+
+def stage_of(filenames) -> str:
+    """
+    Attributes a stack to a report stage
+
+    Args:
+        filenames (Iterable[str]): Code filenames of the stack, innermost first
+
+    Returns:
+        str: One of fetch, pdf, render, aggregation or other
+    """
+    for filename in filenames:
+        for stage, markers in STAGE_MARKERS:
+            if any(marker in filename for marker in markers):
+                return stage
+    return 'other'
+
+class StackSampler:
+    """
+    Samples the call stacks of a thread and the busy report worker threads at a fixed interval and counts collapsed stacks
+
+    The worker pools are shared, so a report running at the same time as the profiled one adds its worker
+    samples too. Every busy thread adds a sample, so stage totals are thread seconds and can exceed wall time.
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL, prefixes: Tuple[str, ...] = WORKER_PREFIXES):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.prefixes = prefixes
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='report-profiler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _targets(self) -> set:
+        """
+        Idents of the profiled thread and every live worker thread
+        """
+        workers = {thread.ident for thread in threading.enumerate() if thread.name.startswith(self.prefixes)}
+        return workers | {self.thread_id}
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in self._targets():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self._sample(frame, worker=thread_id != self.thread_id)
+
+    def _sample(self, frame, worker: bool) -> None:
+        names = []
+        filenames = []
+        busy = not worker
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{Path(code.co_filename).stem}:{code.co_name}')
+            filenames.append(code.co_filename)
+            busy = busy or (code.co_name == _WORK_ITEM[1] and code.co_filename.endswith(_WORK_ITEM[0]))
+            frame = frame.f_back
+        if not busy:
+            # a pool thread waiting for work is not report time
+            return
+        names.reverse()
+        self.stacks[stage_of(filenames) + ';' + ';'.join(names)] += 1
+
+    def write_collapsed(self, path: Path) -> None:
+        """
+        Writes the samples in the collapsed-stack format read by flamegraph.pl and speedscope
+
+        Args:
+            path (Path): Destination file
+
+        Returns:
+            None
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+    def stage_totals(self) -> dict:
+        """
+        Sums the samples per stage
+
+        Returns:
+            dict: Stage name mapped to seconds (samples x interval)
+        """
+        totals = Counter()
+        for stack, count in self.stacks.items():
+            totals[stack.split(';', 1)[0]] += count
+        return {stage: round(count * self.interval, 3) for stage, count in totals.most_common()}
+
+def profile_report(tenant_domain: str, period=None) -> Tuple[str, dict]:
+    """
+    Runs generate_report under cProfile and a stack sampler and writes the results next to the PDF
+
+    cProfile only sees the calling thread; the sampler also follows the section, shard and billing pool threads.
+    The report data is always gathered again, so a cached tenant is not profiled as a cache hit.
+
+    Args:
+        tenant_domain (str): The tenant domain prefix
+        period (str | int | ReportPeriod): The report period, defaults to the last 30 days
+
+    Returns:
+        str: The tenant name returned by generate_report
+        dict: Paths of the .prof and .collapsed files plus seconds per stage
+    """
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident())
+
+    start = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        name = generate_report(tenant_domain, period, refresh=True)
+    finally:
+        profiler.disable()
+        sampler.stop()
+    elapsed = time.perf_counter() - start
+
+    OUTPUT_DIR.mkdir(exist_ok=True)
+
+    PROF_OUT = OUTPUT_DIR / f"{tenant_domain}.prof"
+    COLLAPSED_OUT = OUTPUT_DIR / f"{tenant_domain}.collapsed"
+    profiler.dump_stats(str(PROF_OUT))
+    sampler.write_collapsed(COLLAPSED_OUT)
+
+    return name, {
+        'prof': PROF_OUT.name,
+        'collapsed': COLLAPSED_OUT.name,
+        'seconds': round(elapsed, 3),
+        'stages': sampler.stage_totals()
+    }
+
+def is_admin(email: str) -> bool:
+    """
+    Checks the email against the comma separated ADMIN_EMAILS environment variable
+
+    Args:
+        email (str): The user's email
+
+    Returns:
+        bool: True if the user may run profiled reports
+    """
+    admins = {e.strip().lower() for e in os.getenv('ADMIN_EMAILS', '').split(',') if e.strip()}
+    return bool(email) and email.lower() in admins
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate one tenant report under the profiler")
+    parser.add_argument("domain", help="Tenant domain prefix")
+    parser.add_argument("--period", default="30", help="7, 30, 90 or month")
+    args = parser.parse_args()
+
+    name, profile = profile_report(args.domain, args.period)
+    print(f"{name}: {profile['seconds']}s")
+    for stage, seconds in profile['stages'].items():
+        print(f"  {stage:<12} {seconds}s")
+    print(f"cProfile:  {OUTPUT_DIR / profile['prof']}")
+    print(f"Flamegraph input: {OUTPUT_DIR / profile['collapsed']}")
@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+import time
+
+#Receives each progress event of the report being built in this context; None when nobody is listening
+_listener: ContextVar[Optional[Callable[[Dict], None]]] = ContextVar('progress_listener', default=None)
+
+def emit(phase: str, **fields) -> None:
+    """
+    Sends a progress event to the current listener, if any
+
+    Args:
+        phase (str): The report phase, e.g. 'tenants', 'uptime', 'interfaces', 'pdf'
+        **fields: Extra JSON-serialisable event fields
+    """
+    listener = _listener.get()
+    if listener is not None:
+        listener({'phase': phase, **fields})
+
+@contextmanager
+def phase(name: str, **fields):
+    """
+    Emits a 'done' event with the elapsed seconds once the enclosed block finishes
+    """
+    start = time.perf_counter()
+    yield
+    emit(name, status='done', seconds=round(time.perf_counter() - start, 3), **fields)
+
+@contextmanager
+def listen(callback: Callable[[Dict], None]):
+    """
+    Routes progress events raised in this context (and contexts copied from it) to the callback
+    """
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
@@ -0,0 +1,269 @@
+from .production import reports
+from .production.reports import uptime_and_outages, bandwidth_and_networks, open_alerts, device_health
+from .production.fetchers import fetch_device_inventory
+from .production.networks import network_index, network_summary
+from .production.period import ReportPeriod
+from .experimental.exp_fetchers import fetch_network_info
+from .experimental.exp_helpers import L2_interfaces
+from .experimental.exp_reports import offline_devices, device_invetory, network_ids, top_broadcasters, l2_devices
+from .env import load_env
+from . import metrics, progress
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import contextvars
+import os
+import threading
+
+#Load the contents from the .env file
+load_env()
+
+#Steps of one report run at once; each fetch step walks its own pages
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '4'))
+#Registered sections gathered besides the default ones, comma separated (e.g. offline_devices,top_broadcasters)
+REPORT_EXTRA_SECTIONS = tuple(name for name in os.getenv('REPORT_EXTRA_SECTIONS', '').split(',') if name)
+
+#Sections the report template renders
+REPORT_SECTIONS = ("uptime", "outages", "alerts", "bandwidth", "networks", "health")
+
+class Step:
+    """
+    One node of the gathering DAG: an input fetched or derived from other steps, or a report section
+
+    Attributes:
+        name (str): Unique step name; a section's name is also its key in the report data
+        requires (Tuple[str, ...]): Steps whose values are passed to run, in order
+        run (Callable): run(tenant, period, *values) returning the step's value
+        section (bool): True if the value is report data rather than an input
+    """
+    __slots__ = ('name', 'requires', 'run', 'section')
+
+    def __init__(self, name: str, requires: Tuple[str, ...], run: Callable, section: bool):
+        self.name = name
+        self.requires = requires
+        self.run = run
+        self.section = section
+
+STEPS: Dict[str, Step] = {}
+
+_step_pool: ThreadPoolExecutor = None
+_step_pool_lock = threading.Lock()
+
+def _register(name: str, requires: Tuple[str, ...], section: bool) -> Callable:
+    def decorator(run: Callable) -> Callable:
+        if name in STEPS:
+            raise ValueError(f"Report step {name!r} is already registered")
+        STEPS[name] = Step(name, tuple(requires), run, section)
+        return run
+    return decorator
+
+def source(name: str, *requires: str) -> Callable:
+    """
+    Registers an input step. Every section needing it shares the one value, so it is fetched once per report
+    """
+    return _register(name, requires, False)
+
+def section(name: str, *requires: str) -> Callable:
+    """
+    Registers a report section computed from the values of the steps it requires
+    """
+    return _register(name, requires, True)
+
+def sections() -> List[str]:
+    """
+    Names of every registered section
+    """
+    return [name for name, step in STEPS.items() if step.section]
+
+def plan(names: Iterable[str]) -> List[List[str]]:
+    """
+    Orders the steps the named sections need into levels; every step of a level only needs earlier levels
+
+    Args:
+        names (Iterable[str]): Section names
+
+    Returns:
+        List[List[str]]: Step names per level, each needed step exactly once
+
+    Raises:
+        ValueError: For an unknown section or step, or a dependency cycle
+    """
+    needed = {}
+    stack = []
+    for name in names:
+        step = STEPS.get(name)
+        if step is None or not step.section:
+            raise ValueError(f"Unknown report section {name!r}")
+        stack.append(name)
+    while stack:
+        name = stack.pop()
+        if name in needed:
+            continue
+        step = STEPS.get(name)
+        if step is None:
+            raise ValueError(f"Unknown report step {name!r}")
+        needed[name] = step
+        stack.extend(step.requires)
+
+    levels = []
+    done = set()
+    while len(done) < len(needed):
+        level = [name for name, step in needed.items() if name not in done and done.issuperset(step.requires)]
+        if not level:
+            raise ValueError(f"Report steps depend on each other: {sorted(set(needed) - done)}")
+        levels.append(level)
+        done.update(level)
+    return levels
+
+def _run_step(step: Step, tenant: str, period: ReportPeriod, values: List) -> Tuple[Any, float, float]:
+    """
+    Runs one step on a pool thread, returning its value with the requests and pages it took
+    """
+    requests_made = metrics.thread_total('auvik_requests_total')
+    pages = metrics.thread_total('auvik_pages_total')
+    with metrics.timer('report_section_seconds', (step.name,)), progress.phase(step.name):
+        value = step.run(tenant, period, *values)
+    return (value, metrics.thread_total('auvik_requests_total') - requests_made,
+            metrics.thread_total('auvik_pages_total') - pages)
+
+def _pool() -> ThreadPoolExecutor:
+    global _step_pool
+    with _step_pool_lock:
+        if _step_pool is None:
+            # room for two reports at once; each keeps at most REPORT_WORKERS steps in flight
+            _step_pool = ThreadPoolExecutor(max_workers=max(1, 2 * REPORT_WORKERS), thread_name_prefix='report-step')
+        return _step_pool
+
+def gather_sections(tenant: str, period: ReportPeriod, names: Iterable[str] = None) -> Dict[str, Any]:
+    """
+    Gathers report sections, running each needed step once, as soon as the steps it requires are done
+
+    Args:
+        tenant (str): The tenant ID
+        period (ReportPeriod): The report period
+        names (Iterable[str]): Section names, defaults to REPORT_SECTIONS and REPORT_EXTRA_SECTIONS
+
+    Returns:
+        Dict[str, Any]: Section name mapped to its data
+    """
+    names = list(names or REPORT_SECTIONS + REPORT_EXTRA_SECTIONS)
+    needed = {name: STEPS[name] for level in plan(names) for name in level}
+    waiting = {name: set(step.requires) for name, step in needed.items()}
+    values = {}
+    running = {}
+
+    def submit_ready():
+        for name in [name for name, requires in waiting.items() if not requires]:
+            if len(running) >= max(1, REPORT_WORKERS):
+                break
+            step = needed[name]
+            del waiting[name]
+            # steps see the caller's report clock and progress listener
+            future = _pool().submit(contextvars.copy_context().run, _run_step, step, tenant, period,
+                                    [values[required] for required in step.requires])
+            running[future] = name
+
+    submit_ready()
+    try:
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                values[name], requests_made, pages = future.result()
+                # requests made on pool threads count toward the report that asked for them
+                metrics.credit('auvik_requests_total', requests_made)
+                metrics.credit('auvik_pages_total', pages)
+                for requires in waiting.values():
+                    requires.discard(name)
+            submit_ready()
+    finally:
+        # the pool outlives this report, so a failed step must not leave its siblings running for nobody
+        for future in running:
+            future.cancel()
+        wait(running)
+
+    return {name: values[name] for name in names}
+
+############################
+# Inputs
+############################
+@source('inventory')
+def _inventory(tenant: str, period: ReportPeriod) -> List[Dict]:
+    return fetch_device_inventory(tenant)
+
+@source('network_index', 'inventory')
+def _network_index(tenant: str, period: ReportPeriod, inventory: List[Dict]) -> Dict[str, str]:
+    return network_index(tenant, devices=inventory)
+
+@source('network_info')
+def _network_info(tenant: str, period: ReportPeriod) -> List[Dict]:
+    return fetch_network_info(tenant)
+
+@source('availability')
+def _availability(tenant: str, period: ReportPeriod) -> List:
+    return reports.availability_series(tenant, period)
+
+def _bandwidth_source(device_type: str) -> Callable:
+    return lambda tenant, period: reports.bandwidth_series(tenant, period, device_type)
+
+def _health_source(stat: str) -> Callable:
+    return lambda tenant, period: reports.health_series(tenant, period, stat, reports.HEALTH_MODE == 'p95')
+
+for _type in reports.BANDWIDTH_TYPES:
+    source(f'bandwidth-{_type}')(_bandwidth_source(_type))
+for _stat in reports.HEALTH_STATS:
+    source(_stat)(_health_source(_stat))
+
+@source('uptime_pass', 'availability', 'network_index')
+def _uptime_pass(tenant: str, period: ReportPeriod, availability: List, index: Dict[str, str]) -> Tuple[Dict, Dict, Dict]:
+    return uptime_and_outages(tenant, period, index, availability)
+
+@source('bandwidth_pass', 'network_index', *(f'bandwidth-{device_type}' for device_type in reports.BANDWIDTH_TYPES))
+def _bandwidth_pass(tenant: str, period: ReportPeriod, index: Dict[str, str], *dtypes: List) -> Tuple[List[Dict], Dict]:
+    return bandwidth_and_networks(tenant, period, index, list(dtypes))
+
+@source('l2_interfaces', 'inventory')
+def _l2_interfaces(tenant: str, period: ReportPeriod, inventory: List[Dict]) -> List:
+    return L2_interfaces(l2_devices(inventory))
+
+############################
+# Sections
+############################
+@section('uptime', 'uptime_pass')
+def _uptime(tenant: str, period: ReportPeriod, uptime_pass: Tuple) -> Dict:
+    return uptime_pass[0]
+
+@section('outages', 'uptime_pass')
+def _outages(tenant: str, period: ReportPeriod, uptime_pass: Tuple) -> Dict:
+    return uptime_pass[1]
+
+@section('alerts')
+def _alerts(tenant: str, period: ReportPeriod) -> Dict[str, int]:
+    return open_alerts(tenant)
+
+@section('bandwidth', 'bandwidth_pass')
+def _bandwidth(tenant: str, period: ReportPeriod, bandwidth_pass: Tuple) -> List[Dict]:
+    return bandwidth_pass[0]
+
+@section('networks', 'uptime_pass', 'bandwidth_pass')
+def _networks(tenant: str, period: ReportPeriod, uptime_pass: Tuple, bandwidth_pass: Tuple) -> List[Dict]:
+    return network_summary(uptime_pass[2], bandwidth_pass[1])
+
+@section('health', *reports.HEALTH_STATS)
+def _health(tenant: str, period: ReportPeriod, *stats: List) -> List[Dict]:
+    return device_health(tenant, period, stats=stats)
+
+@section('offline_devices', 'inventory')
+def _offline_devices(tenant: str, period: ReportPeriod, inventory: List[Dict]) -> List[Dict]:
+    return offline_devices(tenant, inventory)
+
+@section('device_inventory', 'inventory')
+def _device_inventory(tenant: str, period: ReportPeriod, inventory: List[Dict]) -> Dict[str, int]:
+    return dict(device_invetory(tenant, inventory))
+
+@section('network_ids', 'network_info')
+def _network_ids(tenant: str, period: ReportPeriod, network_info: List[Dict]) -> List[Dict]:
+    return network_ids(tenant, network_info)
+
+@section('top_broadcasters', 'inventory', 'l2_interfaces')
+def _top_broadcasters(tenant: str, period: ReportPeriod, inventory: List[Dict], interfaces: List) -> List[Dict]:
+    return top_broadcasters(tenant, inventory, interfaces)
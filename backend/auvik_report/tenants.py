@@ -1,7 +1,7 @@
 from .production.fetchers import fetch_tenants
 from pathlib import Path
 from typing import List, Dict
-import json
+from . import jsoncodec
 
 DATA_DIR = Path('data')
 TENANTS_DIR = DATA_DIR / 'tenants'
@@ -32,12 +32,10 @@ def populate_tenants() -> None:
     TENANTS_DIR.mkdir(exist_ok=True)
 
     Domain_ID_File = f'{TENANTS_DIR}/domain_id.json'
-    with open(Domain_ID_File, 'w') as f:
-        json.dump({"data": Domain_ID}, f)
+    jsoncodec.dump({"data": Domain_ID}, Domain_ID_File)
 
     Domain_Name_File = f'{TENANTS_DIR}/domain_name.json'
-    with open(Domain_Name_File, 'w') as f:
-        json.dump({"data": Domain_Name}, f)
+    jsoncodec.dump({"data": Domain_Name}, Domain_Name_File)
 
 def gather_tenants() -> List[Dict]:
     """
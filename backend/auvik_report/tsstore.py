@@ -0,0 +1,308 @@
+from .production.series import DeviceSeries, InterfaceSeries
+from typing import Callable, Dict, Iterator, List, Tuple
+from bisect import bisect_left
+from array import array
+from pathlib import Path
+import os
+import sys
+import json
+import time
+import struct
+import threading
+
+DATA_DIR = Path('data')
+STORE_DIR = DATA_DIR / 'timeseries'
+RETENTION_DAYS = 100
+COMPACT_AFTER = 48
+
+#Chunk header: magic, value column count, row count, metadata length
+CHUNK = struct.Struct('<4sHII')
+MAGIC = b'TSC1'
+SERIES_FIELDS = {
+    DeviceSeries: ('id', 'device_id', 'device_name', 'device_type'),
+    InterfaceSeries: ('id', 'interface_name', 'interface_type', 'parent_device'),
+}
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+def _lock_for(path: Path) -> threading.Lock:
+    """
+    One lock per series file so concurrent reports for the same tenant do not interleave appends
+    """
+    with _locks_guard:
+        return _locks.setdefault(str(path), threading.Lock())
+
+def series_path(namespace: str, key: str) -> Path:
+    """
+    Path of the append-only chunk file for a series group
+
+    Args:
+        namespace (str): Usually the tenant ID
+        key (str): The metric key, e.g. 'device-bandwidth-switch'
+
+    Returns:
+        Path: The .bin file, with the manifest alongside as .json
+    """
+    return STORE_DIR / namespace / f'{key}.bin'
+
+def _to_bytes(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array('d', values)
+        values.byteswap()
+    return values.tobytes()
+
+def _from_bytes(data: memoryview) -> array:
+    values = array('d')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def _encode_chunk(series) -> bytes:
+    """
+    Serializes one series as metadata followed by the timestamp column and each value column
+    """
+    meta = json.dumps({field: getattr(series, field) for field in SERIES_FIELDS[type(series)]}).encode()
+    parts = [CHUNK.pack(MAGIC, len(series.columns), len(series), len(meta)), meta, _to_bytes(series.timestamps)]
+    parts.extend(_to_bytes(column) for column in series.columns)
+    return b''.join(parts)
+
+def _iter_chunks(path: Path, start: float, end: float = float('inf')) -> Iterator[Tuple[Dict, array, List[array]]]:
+    """
+    Reads a chunk file one chunk at a time, keeping rows in [start, end)
+
+    Args:
+        path (Path): The chunk file
+        start (float): Oldest timestamp to keep
+        end (float): Exclusive upper bound
+
+    Yields:
+        Tuple[Dict, array, List[array]]: Series metadata, timestamps and value columns of each chunk
+    """
+    with open(path, 'rb') as f:
+        while True:
+            offset = f.tell()
+            header = f.read(CHUNK.size)
+            if not header:
+                return
+            if len(header) < CHUNK.size:
+                raise ValueError(f'Corrupt time-series chunk in {path} at byte {offset}')
+            magic, n_cols, n_rows, meta_len = CHUNK.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f'Corrupt time-series chunk in {path} at byte {offset}')
+            meta = json.loads(f.read(meta_len))
+            width = n_rows * 8
+            timestamps = _from_bytes(f.read(width))
+            columns = [_from_bytes(f.read(width)) for _ in range(n_cols)]
+            lo = bisect_left(timestamps, start)
+            hi = bisect_left(timestamps, end)
+            yield meta, timestamps[lo:hi], [column[lo:hi] for column in columns]
+
+def _read_chunks(path: Path, kind: type, start: float, end: float = float('inf')) -> Dict[str, object]:
+    """
+    Reads every chunk in a file and concatenates them per series, keeping rows in [start, end)
+
+    Args:
+        path (Path): The chunk file
+        kind (type): DeviceSeries or InterfaceSeries
+        start (float): Oldest timestamp to keep
+        end (float): Exclusive upper bound
+
+    Returns:
+        Dict[str, Series]: Series keyed by element ID, in first-seen order
+    """
+    merged = {}
+    unordered = set()
+    if not path.exists():
+        return merged
+    for meta, timestamps, columns in _iter_chunks(path, start, end):
+        current = merged.get(meta['id'])
+        if current is None:
+            merged[meta['id']] = kind(**meta, timestamps=timestamps, columns=tuple(columns))
+        elif len(timestamps):
+            if len(current) and timestamps[0] <= current.timestamps[-1]:
+                # backfilled chunks hold rows older than the ones before them; a repeated row
+                # means a chunk was written twice, e.g. by an interrupted sync of an older version
+                unordered.add(meta['id'])
+            current.timestamps.extend(timestamps)
+            if not current.columns:
+                current.columns = tuple(array('d') for _ in columns)
+            for existing, column in zip(current.columns, columns):
+                existing.extend(column)
+
+    for series_id in unordered:
+        series = merged[series_id]
+        # the row written last wins for a repeated timestamp
+        latest = {ts: i for i, ts in enumerate(series.timestamps)}
+        order = sorted(latest.values(), key=series.timestamps.__getitem__)
+        series.timestamps = array('d', (series.timestamps[i] for i in order))
+        series.columns = tuple(array('d', (column[i] for i in order)) for column in series.columns)
+    return merged
+
+def _read_manifest(path: Path) -> Dict:
+    manifest = path.with_suffix('.json')
+    if manifest.exists():
+        with open(manifest, 'r') as f:
+            return json.load(f)
+    return {'covered': None, 'chunks': 0}
+
+def _write_manifest(path: Path, manifest: Dict) -> None:
+    target = path.with_suffix('.json')
+    tmp = target.with_suffix('.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, target)
+
+def _between(series, start: float, end: float):
+    """
+    Returns a copy of the series holding only rows in [start, end)
+    """
+    lo = bisect_left(series.timestamps, start)
+    hi = bisect_left(series.timestamps, end)
+    if lo == 0 and hi == len(series):
+        return series
+    fields = {field: getattr(series, field) for field in SERIES_FIELDS[type(series)]}
+    return type(series)(**fields, timestamps=series.timestamps[lo:hi], columns=tuple(c[lo:hi] for c in series.columns))
+
+def _compact(path: Path, kind: type, manifest: Dict) -> None:
+    """
+    Rewrites the file as one chunk per series, dropping rows past the retention period
+    """
+    cutoff = time.time() - RETENTION_DAYS * 86400
+    kept = _read_chunks(path, kind, cutoff)
+    tmp = path.with_suffix('.bin.tmp')
+    with open(tmp, 'wb') as f:
+        for series in kept.values():
+            if len(series):
+                f.write(_encode_chunk(series))
+    os.replace(tmp, path)
+    manifest['chunks'] = sum(1 for series in kept.values() if len(series))
+    if manifest['covered'] is not None:
+        manifest['covered'][0] = max(manifest['covered'][0], cutoff)
+
+def _gaps(covered: List[float], start: float, end: float) -> List[Tuple[float, float]]:
+    """
+    The parts of [start, end) not yet in the store, or None if the store has to start over
+
+    Args:
+        covered (List[float]): The [start, end) range already stored, or None
+        start (float): Window start in epoch seconds
+        end (float): Window end in epoch seconds
+
+    Returns:
+        List[Tuple[float, float]]: Ranges to fetch
+    """
+    if covered is None or end < covered[0] or start > covered[1]:
+        # disjoint from what is stored, keeping both would leave a hole in the history
+        return None
+    gaps = []
+    if start < covered[0]:
+        gaps.append((start, covered[0]))
+    if end > covered[1]:
+        gaps.append((covered[1], end))
+    return gaps
+
+def sync(namespace: str, key: str, fetch: Callable, start: float, end: float, kind: type = DeviceSeries,
+         collect: bool = True) -> List:
+    """
+    Fetches only the parts of a window missing from the store and returns the whole window from the store
+
+    Args:
+        namespace (str): Usually the tenant ID
+        key (str): The metric key, e.g. 'device-bandwidth-switch-day'
+        fetch (Callable): fetch(start, end) returning fresh series for the [start, end) epoch range
+        start (float): Window start in epoch seconds
+        end (float): Exclusive window end in epoch seconds
+        kind (type): DeviceSeries or InterfaceSeries
+        collect (bool): False leaves the stored rows for scan() and returns only the series the store does not hold
+
+    Returns:
+        List[Series]: One series per element covering [start, end)
+    """
+    path = series_path(namespace, key)
+    with _lock_for(path):
+        manifest = _read_manifest(path)
+        covered = manifest.get('covered')
+        gaps = _gaps(covered, start, end)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        restart = gaps is None
+        if restart:
+            gaps = [(start, end)]
+            covered = [start, end]
+        else:
+            covered = [min(start, covered[0]), max(end, covered[1])]
+
+        # fetch every gap before touching the file, so a failed fetch leaves the store as it was
+        chunks = []
+        untracked = []
+        unmonitored = {}
+        for gap_start, gap_end in gaps:
+            for series in fetch(gap_start, gap_end):
+                if series.id is None:
+                    # nothing to key the history on, pass it through untracked
+                    untracked.append(series)
+                    continue
+                # the API repeats boundary samples, only rows inside the gap are new
+                rows = _between(series, gap_start, gap_end)
+                if len(rows):
+                    chunks.append(_encode_chunk(rows))
+                else:
+                    unmonitored[series.id] = rows
+
+        if restart:
+            tmp = path.with_suffix('.bin.tmp')
+            with open(tmp, 'wb') as f:
+                f.write(b''.join(chunks))
+            os.replace(tmp, path)
+            manifest['chunks'] = len(chunks)
+            manifest['covered'] = covered
+            _write_manifest(path, manifest)
+        else:
+            size = path.stat().st_size if path.exists() else 0
+            try:
+                with open(path, 'ab') as f:
+                    f.write(b''.join(chunks))
+                manifest['chunks'] += len(chunks)
+                manifest['covered'] = covered
+                if manifest['chunks'] > COMPACT_AFTER:
+                    _compact(path, kind, manifest)
+                _write_manifest(path, manifest)
+            except BaseException:
+                # rows the manifest does not cover would be fetched and appended again
+                if path.exists() and path.stat().st_size > size:
+                    with open(path, 'r+b') as f:
+                        f.truncate(size)
+                raise
+
+        if not collect:
+            return list(unmonitored.values()) + untracked
+        stored = _read_chunks(path, kind, start, end)
+        for series_id, series in unmonitored.items():
+            stored.setdefault(series_id, series)
+        return list(stored.values()) + untracked
+
+def scan(namespace: str, key: str, start: float, end: float, kind: type = DeviceSeries) -> Iterator:
+    """
+    Yields the stored rows of a series group one chunk at a time, without merging them per element
+
+    Only one chunk is in memory at a time, so consumers that fold rows into bounded state (a running
+    mean, a quantile sketch) never hold a whole series. An element can span several chunks, in any order.
+
+    Args:
+        namespace (str): Usually the tenant ID
+        key (str): The metric key, as passed to sync
+        start (float): Window start in epoch seconds
+        end (float): Exclusive window end in epoch seconds
+        kind (type): DeviceSeries or InterfaceSeries
+
+    Yields:
+        Series: The rows of one chunk inside [start, end)
+    """
+    path = series_path(namespace, key)
+    if not path.exists():
+        return
+    # compaction replaces the file, so the open handle keeps reading a consistent copy
+    for meta, timestamps, columns in _iter_chunks(path, start, end):
+        if len(timestamps):
+            yield kind(**meta, timestamps=timestamps, columns=tuple(columns))
@@ -0,0 +1,263 @@
+from .cache import read_cache, CACHE_TTL
+from .production.period import resolve_period
+from .production.topk import TopK
+from .env import load_env
+from . import metrics, jsoncodec, httpcache
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+import argparse
+import atexit
+import logging
+import os
+import threading
+import time
+
+#Load the contents from the .env file
+load_env()
+
+DATA_DIR = Path('data')
+DEMAND_FILE = DATA_DIR / 'warmer' / 'demand.json'
+
+#Local time and weekdays (0 = Monday) the business-hours window opens
+BUSINESS_START: str = os.getenv('BUSINESS_START', '08:00')
+BUSINESS_DAYS = tuple(int(day) for day in os.getenv('BUSINESS_DAYS', '0,1,2,3,4').split(','))
+#Minutes before BUSINESS_START the warm run begins; keep it below CACHE_TTL or the warmed data expires before anyone asks
+WARM_LEAD_MINUTES = int(os.getenv('WARM_LEAD_MINUTES', '30'))
+#Tenant/period pairs refreshed per run, most requested first
+WARM_TOP_K = int(os.getenv('WARM_TOP_K', '10'))
+#Auvik API requests one warm run may spend
+WARM_REQUEST_BUDGET = int(os.getenv('WARM_REQUEST_BUDGET', '2000'))
+#Request counts halve every week so tenants nobody asks for anymore drop out of the top K
+DEMAND_HALF_LIFE = 7 * 86400
+#Seconds between writes of the request counts to DEMAND_FILE; they are kept in memory in between
+DEMAND_FLUSH_SECONDS: int = int(os.getenv('DEMAND_FLUSH_SECONDS', '60'))
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_demand: Dict[str, Dict] = None
+#True when _demand changed since it was last written
+_dirty = False
+_flush_lock = threading.Lock()
+_flusher: threading.Thread = None
+_stop = threading.Event()
+
+def _entries() -> Dict[str, Dict]:
+    """
+    Returns the demand table, reading it from DEMAND_FILE on first use. Call with _lock held
+    """
+    global _demand
+    if _demand is None:
+        try:
+            _demand = jsoncodec.load(DEMAND_FILE)
+        except (OSError, ValueError):
+            _demand = {}
+    return _demand
+
+def flush() -> bool:
+    """
+    Writes the request counts to DEMAND_FILE if they changed since the last write
+
+    Returns:
+        bool: True when it wrote
+    """
+    global _dirty
+    with _flush_lock:
+        with _lock:
+            if _demand is None or not _dirty:
+                return False
+            data = jsoncodec.dumps(_demand)
+            _dirty = False
+        DEMAND_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(DEMAND_FILE, 'wb') as f:
+            f.write(data)
+    return True
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(DEMAND_FLUSH_SECONDS)
+        try:
+            flush()
+        except OSError as e:
+            log.warning("Writing warmer demand failed: %s", e)
+
+def _start_flusher() -> None:
+    """
+    Lazily starts the background writer the first time a request is counted
+    """
+    global _flusher
+    if _flusher is not None:
+        return
+    with _flush_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name='warmer-demand-writer', daemon=True)
+            _flusher.start()
+            atexit.register(flush)
+
+def decayed_score(entry: Dict, now: float) -> float:
+    """
+    The entry's request count decayed to now
+    """
+    return entry['score'] * 0.5 ** ((now - entry['updated']) / DEMAND_HALF_LIFE)
+
+def record_request(tenant_id: str, domain: str, period: str, hit: bool, now: float = None) -> str:
+    """
+    Counts a report data request and whether the cache served it
+
+    Args:
+        tenant_id (str): The tenant ID
+        domain (str): The tenant domain
+        period (str): The report period label
+        hit (bool): True when the cache already had the data
+        now (float): Epoch seconds, defaults to the current time
+
+    Returns:
+        str: 'warm_hit' when the warmer filled the cache, 'hit' when an earlier request did, otherwise 'miss'
+    """
+    global _dirty
+    now = time.time() if now is None else now
+    _start_flusher()
+    with _lock:
+        entries = _entries()
+        key = f'{domain}-{period}'
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = {'tenant_id': tenant_id, 'domain': domain, 'period': period, 'score': 0.0, 'updated': now}
+        entry['score'] = decayed_score(entry, now) + 1
+        entry['updated'] = now
+        entry['tenant_id'] = tenant_id
+        if not hit:
+            result = 'miss'
+        elif now - entry.get('warmed', 0) < CACHE_TTL:
+            result = 'warm_hit'
+        else:
+            result = 'hit'
+        _dirty = True
+    metrics.inc('report_warm_total', (result,))
+    return result
+
+def top_tenants(k: int = None, now: float = None) -> List[Dict]:
+    """
+    The most requested tenant/period pairs
+
+    Args:
+        k (int): How many, defaults to WARM_TOP_K
+        now (float): Epoch seconds, defaults to the current time
+
+    Returns:
+        List[Dict]: Demand entries, highest decayed score first
+    """
+    k = WARM_TOP_K if k is None else k
+    now = time.time() if now is None else now
+    top = TopK(k, key=lambda entry: decayed_score(entry, now))
+    with _lock:
+        top.extend(dict(entry) for entry in _entries().values())
+    return top.items()
+
+def next_run(now: datetime) -> datetime:
+    """
+    The next time a warm run should start, WARM_LEAD_MINUTES before a business day opens
+
+    Args:
+        now (datetime): Local time
+
+    Returns:
+        datetime: Local start time of the next run, strictly after now
+    """
+    hour, minute = (int(part) for part in BUSINESS_START.split(':'))
+    opening = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    lead = timedelta(minutes=WARM_LEAD_MINUTES)
+    while opening - lead <= now or opening.weekday() not in BUSINESS_DAYS:
+        opening += timedelta(days=1)
+    return opening - lead
+
+def warm_once(top_k: int = None, budget: int = None, now: float = None) -> Dict[str, List[str]]:
+    """
+    Refreshes the cached report data of the most requested tenants so it is still fresh when business hours open
+
+    Args:
+        top_k (int): Tenant/period pairs to consider, defaults to WARM_TOP_K
+        budget (int): Auvik API requests this run may spend, defaults to WARM_REQUEST_BUDGET
+        now (float): Epoch seconds the run starts, defaults to the current time
+
+    Returns:
+        Dict[str, List[str]]: Cache names by outcome: refreshed, fresh, budget (skipped to stay in budget) and error
+    """
+    global _dirty
+    from .generate_report import gather_data
+
+    budget = WARM_REQUEST_BUDGET if budget is None else budget
+    now = time.time() if now is None else now
+    opening = now + WARM_LEAD_MINUTES * 60
+    outcome = {'refreshed': [], 'fresh': [], 'budget': [], 'error': []}
+    spent = 0
+
+    for entry in top_tenants(top_k, now):
+        name = f"{entry['domain']}-{entry['period']}"
+        cached = read_cache(name)
+        if cached and cached.get('timestamp', 0) + CACHE_TTL > opening:
+            result = 'fresh'
+        elif spent + entry.get('cost', 0) > budget or spent >= budget:
+            result = 'budget'
+        else:
+            before = metrics.thread_total('auvik_requests_total')
+            try:
+                gather_data(entry['tenant_id'], entry['domain'], resolve_period(entry['period']), refresh=True)
+                result = 'refreshed'
+            except Exception:
+                log.exception("Cache warm failed for %s", name)
+                result = 'error'
+            cost = metrics.thread_total('auvik_requests_total') - before
+            spent += cost
+            if result == 'refreshed':
+                with _lock:
+                    stored = _entries().get(name)
+                    if stored is not None:
+                        stored['warmed'] = time.time()
+                        stored['cost'] = cost
+                        _dirty = True
+        outcome[result].append(name)
+        metrics.inc('warmer_tenants_total', (result,))
+    flush()
+    return outcome
+
+def _run() -> None:
+    while True:
+        start = next_run(datetime.now())
+        if _stop.wait((start - datetime.now()).total_seconds()):
+            return
+        outcome = warm_once()
+        log.info("Cache warm run: %s", {result: len(names) for result, names in outcome.items()})
+        log.info("Pruned %d expired HTTP cache entries", httpcache.prune())
+
+def start() -> threading.Thread:
+    """
+    Starts the background warmer thread, which sleeps until each run time
+
+    Returns:
+        threading.Thread: The daemon thread
+    """
+    _stop.clear()
+    thread = threading.Thread(target=_run, name='cache-warmer', daemon=True)
+    thread.start()
+    return thread
+
+def stop() -> None:
+    """
+    Stops the background warmer thread at its next wake-up
+    """
+    _stop.set()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh cached report data for the most requested tenants now")
+    parser.add_argument("--top", type=int, default=WARM_TOP_K)
+    parser.add_argument("--budget", type=int, default=WARM_REQUEST_BUDGET, help="Auvik API requests this run may spend")
+    args = parser.parse_args()
+
+    for entry in top_tenants(args.top):
+        print(f"  {entry['domain']:<24} {entry['period']:<6} score {decayed_score(entry, time.time()):6.1f}  last cost {entry.get('cost', '-')}")
+    outcome = warm_once(args.top, args.budget)
+    for result, names in outcome.items():
+        print(f"{result:<10} {len(names):>3}  {', '.join(names)}")
+    print(f"next scheduled run: {next_run(datetime.now()):%Y-%m-%d %H:%M}")
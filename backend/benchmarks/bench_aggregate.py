@@ -0,0 +1,71 @@
+"""
+Per-device aggregation (uptime windows and outages, bandwidth averages, health means) on 1 to N worker
+processes, on 30 days of hourly samples from the synthetic tenant
+
+    python -m benchmarks.bench_aggregate --devices 5000 --max-processes 8
+"""
+from mock_auvik import generate_tenants
+from mock_auvik.generator import hours_between
+from auvik_report.production import parallel
+from auvik_report.production.helpers import bandwidth_average, series_mean
+from auvik_report.production.outages import window_scan
+from auvik_report.production.series import DeviceSeries, columns_from_rows
+import argparse
+import os
+import time
+
+def device_series(devices: int, seed: int, stat: str):
+    """
+    One DeviceSeries per device of hourly samples for the stat
+    """
+    tenant = generate_tenants(1, seed=seed, devices=devices)[0]
+    end = int(time.time()) // 3600 * 3600
+    hours = hours_between(end - 30 * 86400, end)
+    series = []
+    for device in tenant.devices:
+        timestamps, columns = columns_from_rows([tenant.device_row(device, stat, ts) for ts in hours])
+        series.append(DeviceSeries(device.id, device.id, device.name, device.type, timestamps, columns))
+    return series, end
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    availability, end = device_series(args.devices, args.seed, 'uptime')
+    bandwidth, _ = device_series(args.devices, args.seed, 'bandwidth')
+    cpu, _ = device_series(args.devices, args.seed, 'cpuUtilization')
+    windows = [('7 Days', end - 7 * 86400), ('30 Days', end - 30 * 86400)]
+    samples = sum(len(s) for s in availability + bandwidth + cpu)
+    print(f"{args.devices} devices, {samples} samples, {os.cpu_count()} cores")
+
+    jobs = (
+        ('uptime', lambda: parallel.aggregate(window_scan, availability, windows, end, 3600)),
+        ('bandwidth', lambda: parallel.aggregate(bandwidth_average, bandwidth)),
+        ('health', lambda: parallel.aggregate(series_mean, cpu)),
+    )
+    parallel.AGGREGATE_MIN_SERIES = 1
+    baseline = None
+    for processes in range(0, args.max_processes + 1):
+        parallel.shutdown()
+        parallel.AGGREGATE_PROCESSES = processes
+        if processes:
+            # start the workers outside the timed runs
+            parallel.aggregate(series_mean, cpu[:processes * parallel.CHUNKS_PER_PROCESS])
+        timings = {}
+        for name, job in jobs:
+            timings[name] = min(measure(job)[1] for _ in range(args.repeat))
+        total = sum(timings.values())
+        baseline = baseline or total
+        label = 'in-process' if processes == 0 else f'{processes} proc'
+        print(f"{label:<11} " + "  ".join(f"{name} {seconds:6.3f}s" for name, seconds in timings.items())
+              + f"  total {total:6.3f}s  speedup {baseline / total:4.2f}x")
+    parallel.shutdown()
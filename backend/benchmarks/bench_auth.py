@@ -0,0 +1,152 @@
+"""
+p99 latency of /api/me and /api/login while report requests keep server threads busy
+
+    python -m benchmarks.bench_auth --reports 3 --me-clients 8 --logins 2 --seconds 20
+
+Runs the real app (create_app) behind waitress when it is installed, otherwise the threaded
+werkzeug server, with a cachelib session store unless --redis is given. Report load is the
+uptime/bandwidth/health sections against the mock Auvik API, one tenant per report client.
+"""
+from mock_auvik import MockAuvikServer, generate_tenants
+from auvik_report.production import fetchers, bandwidth_report, device_health, uptime_report
+from auvik_report import tsstore
+from flask import Blueprint, jsonify
+from config import ApplicationConfig
+from app import create_app
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import requests
+
+PASSWORD = "bench-password"
+
+def make_config(tmp: str, redis_url: str = None) -> type:
+    from cachelib import SimpleCache
+    attrs = {
+        "SECRET_KEY": "bench",
+        "SQLALCHEMY_ECHO": False,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'db.sqlite')}",
+    }
+    if redis_url:
+        attrs.update({"REDIS_URL": redis_url, "SESSION_REDIS": None})
+    else:
+        attrs.update({"SESSION_TYPE": "cachelib", "SESSION_CACHELIB": SimpleCache()})
+    return type("BenchConfig", (ApplicationConfig,), attrs)
+
+def report_blueprint(tenants) -> Blueprint:
+    """
+    /bench/report/<n> builds tenant n's sections from scratch, like /api/generate-report minus the PDF
+    """
+    bench = Blueprint("bench", __name__)
+
+    @bench.post("/bench/report/<int:n>")
+    def report(n):
+        tenant = tenants[n]
+        shutil.rmtree(tsstore.STORE_DIR / tenant.id, ignore_errors=True)
+        uptime_report(tenant.id)
+        bandwidth_report(tenant.id)
+        device_health(tenant.id)
+        return jsonify({"tenant": tenant.id})
+    return bench
+
+def serve(app, threads: int):
+    """
+    Starts the app on a free port and returns (url, stop)
+    """
+    try:
+        from waitress.server import create_server
+        server = create_server(app, host="127.0.0.1", port=0, threads=threads)
+        name = f"waitress threads={threads}"
+        thread = threading.Thread(target=server.run, daemon=True)
+        stop = server.close
+        port = server.effective_port
+    except ImportError:
+        from werkzeug.serving import make_server
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        name = "werkzeug threaded (unbounded threads, install waitress for the production pool)"
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        stop = server.shutdown
+        port = server.server_port
+    thread.start()
+    print(f"server: {name}")
+    return f"http://127.0.0.1:{port}", stop
+
+def percentile(samples: list, p: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+def loop(until: float, fn, samples: list) -> None:
+    while time.perf_counter() < until:
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=300)
+    parser.add_argument("--reports", type=int, default=3, help="concurrent report clients")
+    parser.add_argument("--me-clients", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=2, help="concurrent clients logging in repeatedly")
+    parser.add_argument("--threads", type=int, default=4, help="waitress worker threads")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--redis", help="Redis URL for the session store, default is an in-process cache")
+    args = parser.parse_args()
+
+    tenants = generate_tenants(max(args.reports, 1), devices=args.devices)
+    with MockAuvikServer(tenants) as mock, tempfile.TemporaryDirectory() as tmp:
+        fetchers.base_url = mock.url
+        tsstore.STORE_DIR = tsstore.Path(tmp) / "timeseries"
+        os.environ["REGISTRATION_SECRET"] = "bench"
+
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        app = create_app(make_config(tmp, args.redis))
+        app.register_blueprint(report_blueprint(tenants))
+        url, stop = serve(app, args.threads)
+
+        email = "bench@example.com"
+        requests.post(f"{url}/api/register", json={"email": email, "password": PASSWORD, "confirmPassword": PASSWORD, "invite": "bench"}).raise_for_status()
+
+        #Log the /api/me clients in before the load starts
+        sessions = [requests.Session() for _ in range(args.me_clients)]
+        for http in sessions:
+            http.post(f"{url}/api/login", json={"email": email, "password": PASSWORD}).raise_for_status()
+
+        def me_client(http, samples):
+            loop(until, lambda: http.get(f"{url}/api/me").raise_for_status(), samples)
+
+        def login_client(samples):
+            def login():
+                response = requests.post(f"{url}/api/login", json={"email": email, "password": PASSWORD})
+                if response.status_code == 503:
+                    busy.append(response)
+                else:
+                    response.raise_for_status()
+            loop(until, login, samples)
+
+        def report_client(n, samples):
+            loop(until, lambda: requests.post(f"{url}/bench/report/{n}").raise_for_status(), samples)
+
+        me, login, reports, busy = [], [], [], []
+        until = time.perf_counter() + args.seconds
+        workers = [threading.Thread(target=me_client, args=(http, me)) for http in sessions]
+        workers += [threading.Thread(target=login_client, args=(login,)) for _ in range(args.logins)]
+        workers += [threading.Thread(target=report_client, args=(n, reports)) for n in range(args.reports)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        stop()
+
+        for name, samples in (("/api/me", me), ("/api/login", login), ("report", reports)):
+            if not samples:
+                continue
+            print(f"{name:<12} n={len(samples):<6} p50 {statistics.median(samples) * 1000:8.1f}ms"
+                  f"  p99 {percentile(samples, 99) * 1000:8.1f}ms  max {max(samples) * 1000:8.1f}ms")
+        print(f"logins rejected with 503 (bcrypt queue full): {len(busy)}")
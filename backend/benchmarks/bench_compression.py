@@ -0,0 +1,68 @@
+"""
+Bytes on the wire per Accept-Encoding and bytes on disk per cache format, with decode times
+
+    python -m benchmarks.bench_compression --devices 500
+"""
+from mock_auvik import MockAuvikServer, generate_tenants
+from auvik_report.production import fetchers, bandwidth_report, device_health, uptime_report
+from auvik_report import cache, jsoncodec, tsstore, metrics, httpcache
+import argparse
+import requests
+import tempfile
+import time
+from pathlib import Path
+
+def wire(server: MockAuvikServer, tenant_id: str, encoding: str):
+    """
+    Fetches a month of hourly bandwidth with one Accept-Encoding and returns wire bytes, body bytes and seconds
+    """
+    # requests sends DEFAULT_ACCEPT_ENCODING on every request; narrowed here to compare encodings
+    requests.utils.DEFAULT_ACCEPT_ENCODING = encoding
+    metrics.reset()
+    before = server.wire_bytes
+    start = time.perf_counter()
+    fetchers.fetch_device_stats(tenant_id, 'bandwidth', interval='hour')
+    seconds = time.perf_counter() - start
+    counters, _ = metrics._merge()
+    body = sum(v for (name, _), v in counters.items() if name == 'auvik_response_bytes_total')
+    return server.wire_bytes - before, body, seconds
+
+def best_of(fn, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=500)
+    args = parser.parse_args()
+
+    tenant = generate_tenants(1, devices=args.devices)[0]
+    with MockAuvikServer([tenant]) as server, tempfile.TemporaryDirectory() as tmp:
+        fetchers.base_url = server.url
+        tsstore.STORE_DIR = Path(tmp) / 'timeseries'
+        cache.DATA_DIR = Path(tmp)
+        cache.CACHE_DIR = Path(tmp) / 'cache'
+        # every encoding has to go over the wire, not come back from the HTTP cache
+        httpcache.HTTP_CACHE = False
+
+        print("wire (hourly bandwidth, 30 days)")
+        for encoding in ('identity', 'gzip', 'br'):
+            sent, body, seconds = wire(server, tenant.id, encoding)
+            print(f"  {encoding:<9} {sent / 2**20:8.2f} MiB  ratio {body / sent:5.1f}x  {seconds:6.2f}s")
+
+        data = {
+            'uptime': uptime_report(tenant.id),
+            'bandwidth': bandwidth_report(tenant.id),
+            'health': device_health(tenant.id),
+        }
+        document = {'timestamp': time.time(), 'data': data}
+        plain = jsoncodec.dumps(document)
+        packed = cache.encode_cache(document)
+        print("disk (report cache)")
+        print(f"  json      {len(plain) / 2**10:8.1f} KiB  read {best_of(lambda: jsoncodec.loads(plain)) * 1000:6.2f}ms")
+        print(f"  gzip v{cache.CACHE_VERSION}   {len(packed) / 2**10:8.1f} KiB  read {best_of(lambda: cache.decode_cache(packed)) * 1000:6.2f}ms"
+              f"  ratio {len(plain) / len(packed):5.1f}x")
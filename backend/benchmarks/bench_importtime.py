@@ -0,0 +1,38 @@
+"""
+Cold import time of the Flask app, as a waitress/gunicorn worker pays it on every restart
+
+    python -m benchmarks.bench_importtime --budget 800
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+#Cumulative microseconds of the top-level import in `python -X importtime` output
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+def import_times(module: str = "app") -> list:
+    """
+    Imports the module in a fresh interpreter and returns (cumulative ms, name) for every top-level import, slowest first
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True)
+    times = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match and not match.group(3):
+            times.append((int(match.group(2)) / 1000, match.group(4)))
+    return sorted(times, reverse=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget", type=float, default=800, help="fail when the module takes longer than this many ms")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    times = import_times(args.module)
+    total = next(ms for ms, name in times if name == args.module)
+    for ms, name in times[:args.top]:
+        print(f"{ms:8.1f}ms  {name}")
+    print(f"{args.module}: {total:.1f}ms (budget {args.budget:.0f}ms)")
+    sys.exit(0 if total <= args.budget else 1)
@@ -0,0 +1,69 @@
+"""
+Decode time of a synthetic ~50 MB stat/device/bandwidth response with each JSON backend,
+and with the DeviceStatPage schema that skips fields the reports never read
+
+    python -m benchmarks.bench_json --megabytes 50
+"""
+from mock_auvik import generate_tenants
+from mock_auvik.generator import hours_between
+from auvik_report import jsoncodec
+from auvik_report.production.schemas import DeviceStatPage
+import argparse
+import json
+import time
+
+def synthetic_response(megabytes: float) -> bytes:
+    """
+    Builds one JSON:API stat page with 30 days of hourly bandwidth rows per device until it reaches the size
+    """
+    tenant = generate_tenants(1, devices=200)[0]
+    end = int(time.time()) // 3600 * 3600
+    hours = hours_between(end - 30 * 86400, end)
+    elements = []
+    size = 0
+    while size < megabytes * 2**20:
+        for device in tenant.devices:
+            rows = [tenant.device_row(device, 'bandwidth', ts) for ts in hours]
+            element = {
+                'id': f'{device.id}-{len(elements)}',
+                'type': 'statistics',
+                'attributes': {'stats': [{'statType': 'bandwidth', 'legend': ['Time', 'Transmit', 'Receive', 'Total'], 'unit': 'bitsPerSecond', 'data': rows}]},
+                'relationships': {'device': {'data': {'id': device.id, 'type': 'device', 'deviceName': device.name, 'deviceType': device.type}}},
+            }
+            elements.append(element)
+            size += len(json.dumps(element))
+            if size >= megabytes * 2**20:
+                break
+    return json.dumps({'data': elements, 'links': {}}).encode()
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--megabytes", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payload = synthetic_response(args.megabytes)
+    mib = len(payload) / 2**20
+    print(f"payload {mib:.1f} MiB")
+
+    # what response.json() does: decode to str, then parse
+    baseline = best_of(lambda: json.loads(payload.decode('utf-8')), args.repeat)
+    print(f"{'response.json()':<16} {baseline:7.3f}s  {mib / baseline:7.1f} MiB/s")
+    for name in jsoncodec.BACKENDS:
+        if jsoncodec.select(name) != name:
+            print(f"{name:<16} not installed")
+            continue
+        seconds = best_of(lambda: jsoncodec.loads(payload), args.repeat)
+        print(f"{name:<16} {seconds:7.3f}s  {mib / seconds:7.1f} MiB/s  {baseline / seconds:5.2f}x")
+
+    typed = jsoncodec.typed_loads(DeviceStatPage)
+    seconds = best_of(lambda: typed(payload), args.repeat)
+    print(f"{'schema':<16} {seconds:7.3f}s  {mib / seconds:7.1f} MiB/s  {baseline / seconds:5.2f}x")
@@ -0,0 +1,70 @@
+"""
+p95 per device and metric: KLL sketches versus sorting every sample, on 30 days of hourly
+CPU/memory/storage from the synthetic tenant
+
+    python -m benchmarks.bench_quantiles --devices 2000 --k 200
+"""
+from mock_auvik import generate_tenants
+from mock_auvik.generator import hours_between
+from auvik_report.production.series import DeviceSeries
+from auvik_report.production.sketch import KLLSketch, exact_quantile
+from array import array
+import argparse
+import bisect
+import time
+
+METRICS = ('cpuUtilization', 'memoryUtilization', 'storageUtilization')
+
+def device_columns(devices: int, seed: int):
+    """
+    One packed column of hourly samples per device and metric
+    """
+    tenant = generate_tenants(1, seed=seed, devices=devices)[0]
+    end = int(time.time()) // 3600 * 3600
+    hours = hours_between(end - 30 * 86400, end)
+    return [array('d', (tenant.device_row(device, metric, ts)[1] for ts in hours)) for device in tenant.devices for metric in METRICS]
+
+def measure(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def rank_error(ordered: list, value: float, q: float) -> float:
+    """
+    Distance from q to the rank range the value occupies (ties span several ranks)
+    """
+    low = bisect.bisect_left(ordered, value) / len(ordered)
+    high = bisect.bisect_right(ordered, value) / len(ordered)
+    return max(0.0, low - q, q - high)
+
+def sketched(columns, k: int):
+    out = []
+    for column in columns:
+        sketch = KLLSketch(k, seed=0)
+        sketch.update_many(column)
+        out.append((sketch.quantile(0.95), sketch.size))
+    return out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    columns = device_columns(args.devices, args.seed)
+    samples = sum(len(c) for c in columns)
+    print(f"{len(columns)} series, {samples} samples ({samples // len(columns)} per series)")
+
+    exact, exact_s = measure(lambda: [exact_quantile(c, 0.95) for c in columns])
+    sketch, sketch_s = measure(lambda: sketched(columns, args.k))
+
+    errors = []
+    for column, (estimate, _) in zip(columns, sketch):
+        ordered = sorted(v for v in column if v == v)
+        if estimate is not None:
+            errors.append(rank_error(ordered, estimate, 0.95))
+    held = max(size for _, size in sketch)
+    print(f"{'exact sort':<12} {exact_s:7.3f}s  holds every sample")
+    print(f"{'kll k=' + str(args.k):<12} {sketch_s:7.3f}s  holds <= {held} samples per series")
+    print(f"rank error   mean {sum(errors) / len(errors):.4f}  max {max(errors):.4f}")
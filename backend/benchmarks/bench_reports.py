@@ -0,0 +1,39 @@
+"""
+Times each report section against the mock Auvik API
+
+    python -m benchmarks.bench_reports --devices 2000 --latency 0.05
+"""
+from mock_auvik import MockAuvikServer, generate_tenants
+from auvik_report.production import fetchers, uptime_report, open_alerts, bandwidth_report, device_health
+import argparse
+import time
+
+SECTIONS = (
+    ('uptime', uptime_report),
+    ('alerts', open_alerts),
+    ('bandwidth', bandwidth_report),
+    ('health', device_health),
+)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--interfaces", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    tenant = generate_tenants(1, seed=args.seed, devices=args.devices, interfaces_per_device=args.interfaces)[0]
+    with MockAuvikServer([tenant], latency=args.latency, page_size=args.page_size) as server:
+        fetchers.base_url = server.url
+        total = 0.0
+        for name, section in SECTIONS:
+            start = time.perf_counter()
+            section(tenant.id)
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            print(f"{name:<10} {elapsed:8.2f}s")
+        print(f"{'total':<10} {total:8.2f}s  requests={sum(server.hits.values())}")
+        for endpoint, hits in server.hits.most_common():
+            print(f"  {endpoint:<40} {hits}")
@@ -0,0 +1,42 @@
+"""
+Retained memory of raw JSON:API stat elements versus DeviceSeries, measured with tracemalloc
+
+    python -m benchmarks.bench_series_memory --devices 2000
+"""
+from mock_auvik import MockAuvikServer, generate_tenants
+from auvik_report.production import fetchers
+from auvik_report.production.series import DeviceSeries
+import argparse
+import tracemalloc
+import gc
+import time
+
+def retained(url: str, parse=None):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fetchers.fetch_paginated_data(url, parse)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    samples = sum(len(s) if parse else len(s['attributes']['stats'][0]['data']) for s in result)
+    del result
+    return current, peak, samples, elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--stat", default="bandwidth")
+    args = parser.parse_args()
+
+    tenant = generate_tenants(1, devices=args.devices)[0]
+    with MockAuvikServer([tenant], page_size=100) as server:
+        fetchers.base_url = server.url
+        start, end = fetchers.format_date_range(30)
+        url = f'{server.url}/stat/device/{args.stat}?filter[fromTime]={start}&filter[thruTime]={end}&filter[interval]=hour&tenants={tenant.id}'
+
+        for label, parse in (('dict elements', None), ('DeviceSeries', DeviceSeries.from_element)):
+            current, peak, samples, elapsed = retained(url, parse)
+            print(f"{label:<14} retained={current / 2**20:8.1f} MiB  peak={peak / 2**20:8.1f} MiB  "
+                  f"{current / max(samples, 1):6.1f} B/sample  ({samples} samples, {elapsed:.1f}s)")
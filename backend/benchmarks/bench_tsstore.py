@@ -0,0 +1,46 @@
+"""
+API volume of a full 30-day fetch versus the next day's delta through the local time-series store
+
+    python -m benchmarks.bench_tsstore --devices 500
+"""
+from mock_auvik import MockAuvikServer, generate_tenants
+from auvik_report.production import fetchers, reports
+from auvik_report.production.period import ReportPeriod
+from auvik_report import tsstore, metrics
+from datetime import datetime, timedelta, timezone
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+def volume() -> float:
+    counters, _ = metrics._merge()
+    return sum(v for (name, _), v in counters.items() if name == 'auvik_response_bytes_total')
+
+def run(tenant_id: str, period: ReportPeriod):
+    metrics.reset()
+    start = time.perf_counter()
+    reports.uptime_report(tenant_id, period)
+    reports.device_health(tenant_id, period)
+    return volume(), time.perf_counter() - start
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=500)
+    args = parser.parse_args()
+
+    tenant = generate_tenants(1, devices=args.devices)[0]
+    with MockAuvikServer([tenant]) as server, tempfile.TemporaryDirectory() as tmp:
+        fetchers.base_url = server.url
+        tsstore.STORE_DIR = Path(tmp)
+
+        # first run is yesterday's report: full 30-day window
+        now = datetime.now(timezone.utc)
+        full_bytes, full_time = run(tenant.id, ReportPeriod.rolling(30, now - timedelta(days=1)))
+
+        # today: only the last day is requested
+        delta_bytes, delta_time = run(tenant.id, ReportPeriod.rolling(30, now))
+
+        print(f"full window  {full_bytes / 2**20:8.2f} MiB  {full_time:6.2f}s")
+        print(f"daily delta  {delta_bytes / 2**20:8.2f} MiB  {delta_time:6.2f}s")
+        print(f"reduction    {full_bytes / max(delta_bytes, 1):8.1f}x")
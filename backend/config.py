@@ -1,9 +1,8 @@
-from dotenv import load_dotenv
+from auvik_report.env import load_env
 from datetime import timedelta
 import os
-import redis
 
-load_dotenv('.env')
+load_env()
 
 class ApplicationConfig:
     SECRET_KEY = os.getenv('SECRET_KEY')
@@ -13,7 +12,8 @@ class ApplicationConfig:
     SQLALCHEMY_TRACK_MODIFICATIONS=False
 
     SESSION_TYPE = "redis"
-    SESSION_REDIS = redis.from_url(os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0"))
+    # the client is built in create_app; redis-py only connects on the first session read or write
+    REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
     SESSION_USE_SIGNER = True
     SESSION_PERMANENT = False
     PERMANENT_SESSION_LIFETIME=timedelta(hours=1)
@@ -22,6 +22,17 @@ class ApplicationConfig:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE="Lax"
     SESSION_COOKIE_SECURE = not DEBUG_MODE
+
+    # bcrypt runs on its own small pool so logins cannot take every server thread
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+    BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", "5"))
+    # logins waiting for a bcrypt worker beyond the ones running; more are refused with a 503 at once
+    BCRYPT_QUEUE = int(os.getenv("BCRYPT_QUEUE", "4"))
+    # seconds /api/me trusts the identity cached in the session before re-reading the user
+    IDENTITY_TTL = int(os.getenv("IDENTITY_TTL", "300"))
+
+    # refresh the most requested tenants' report data before business hours (see auvik_report/warmer.py)
+    CACHE_WARMER = os.getenv("CACHE_WARMER", "0") == "1"
     
 
     
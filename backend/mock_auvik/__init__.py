@@ -0,0 +1,2 @@
+from .generator import SyntheticTenant, generate_tenants
+from .server import MockAuvikServer
@@ -0,0 +1,30 @@
+from .generator import generate_tenants
+from .server import MockAuvikServer
+import argparse
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic tenants over a mock Auvik API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tenants", type=int, default=3, help="Number of client tenants")
+    parser.add_argument("--devices", type=int, default=200, help="Devices per tenant")
+    parser.add_argument("--interfaces", type=int, default=4, help="Interfaces per device")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--main-domain", default="mainauvik")
+    args = parser.parse_args()
+
+    tenants = generate_tenants(args.tenants, seed=args.seed, devices=args.devices, interfaces_per_device=args.interfaces)
+    server = MockAuvikServer(
+        tenants, host=args.host, port=args.port, latency=args.latency, rate_limit_rate=args.rate_limit,
+        page_size=args.page_size, main_domain=args.main_domain, seed=args.seed
+    )
+    print(f"Mock Auvik API on {server.url} (BASE_URL={server.url}, MAIN_DOMAIN_PREFIX={args.main_domain})")
+    for tenant in tenants:
+        print(f"  {tenant.domain}: {tenant.id} ({len(tenant.devices)} devices)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,245 @@
+from typing import List, Dict, Tuple
+import math
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+DEVICE_TYPES = (
+    ('switch', 0.30), ('accessPoint', 0.25), ('server', 0.12), ('router', 0.06), ('firewall', 0.05),
+    ('stack', 0.04), ('camera', 0.08), ('storage', 0.03), ('workstation', 0.07),
+)
+INTERFACE_TYPES = ('ethernet', 'ethernet', 'wifi', 'virtualNic')
+SEVERITIES = (('emergency', 0.03), ('critical', 0.12), ('warning', 0.45), ('info', 0.40))
+DEVICE_STATS = {'bandwidth', 'cpuUtilization', 'memoryUtilization', 'storageUtilization',
+                'packetUnicast', 'packetMulticast', 'packetBroadcast'}
+INTERFACE_STATS = {'bandwidth', 'utilization', 'packetLoss', 'packetDiscard', 'packetMulticast',
+                   'packetUnicast', 'packetBroadcast'}
+
+_MASK = (1 << 64) - 1
+
+def _mix(x: int) -> int:
+    """
+    splitmix64 finalizer, used so every sample is a pure function of (seed, hour)
+    """
+    x = (x ^ (x >> 30)) * 0xbf58476d1ce4e5b9 & _MASK
+    x = (x ^ (x >> 27)) * 0x94d049bb133111eb & _MASK
+    return x ^ (x >> 31)
+
+def _unit(seed: int, n: int) -> float:
+    """
+    Deterministic float in [0, 1) for a seed and an index
+    """
+    return _mix((seed + n * 0x9E3779B97F4A7C15) & _MASK) / 18446744073709551616.0
+
+def _pick(options: Tuple, u: float) -> str:
+    """
+    Picks from ((value, weight), ...) using a uniform draw
+    """
+    for value, weight in options:
+        u -= weight
+        if u < 0:
+            return value
+    return options[-1][0]
+
+def _metric_code(name: str) -> int:
+    """
+    Stable integer for a stat name (hash() is salted per process)
+    """
+    code = 0
+    for ch in name:
+        code = (code * 131 + ord(ch)) & _MASK
+    return code
+
+class Device:
+    """
+    One synthetic device; every stat is derived from its seed
+    """
+    __slots__ = ('id', 'name', 'type', 'network', 'online', 'seed', 'monitored', 'interfaces')
+
+    def __init__(self, id: str, name: str, type: str, network: int, online: bool, seed: int, monitored: bool):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.network = network
+        self.online = online
+        self.seed = seed
+        self.monitored = monitored
+        self.interfaces: List[Interface] = []
+
+class Interface:
+    """
+    One synthetic interface belonging to a device
+    """
+    __slots__ = ('id', 'name', 'type', 'device', 'speed', 'seed')
+
+    def __init__(self, id: str, name: str, type: str, device: Device, speed: str, seed: int):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.device = device
+        self.speed = speed
+        self.seed = seed
+
+class SyntheticTenant:
+    """
+    A reproducible tenant: the same seed always yields the same devices, alerts and samples
+    """
+
+    def __init__(self, index: int, seed: int = 0, devices: int = 200, interfaces_per_device: int = 4,
+                 networks: int = 5, alerts: int = 300, outage_rate: float = 0.03):
+        self.index = index
+        self.seed = _mix(seed * 1000003 + index)
+        self.id = str(800000000000000000 + index)
+        self.domain = f'tenant{index:03d}'
+        self.name = f'Tenant {index:03d}'
+        self.outage_rate = outage_rate
+        self.networks = [(str(700000000000000000 + index * 1000 + n), f'Site {n + 1}') for n in range(networks)]
+
+        self.devices: List[Device] = []
+        self.interfaces: Dict[str, Interface] = {}
+        for d in range(devices):
+            dseed = _mix(self.seed ^ (d + 1))
+            dtype = _pick(DEVICE_TYPES, _unit(dseed, 1))
+            device = Device(
+                id=str(900000000000000000 + index * 100000 + d),
+                name=f'{dtype}-{d:05d}',
+                type=dtype,
+                network=int(_unit(dseed, 2) * networks),
+                online=_unit(dseed, 3) >= 0.04,
+                seed=dseed,
+                monitored=_unit(dseed, 4) >= 0.02
+            )
+            for i in range(interfaces_per_device):
+                iseed = _mix(dseed ^ (i + 101))
+                interface = Interface(
+                    id=f'{device.id}{i:03d}',
+                    name=f'port{i + 1}',
+                    type=INTERFACE_TYPES[i % len(INTERFACE_TYPES)],
+                    device=device,
+                    speed='10000000000' if _unit(iseed, 1) < 0.05 else '1000000000',
+                    seed=iseed
+                )
+                device.interfaces.append(interface)
+                self.interfaces[interface.id] = interface
+            self.devices.append(device)
+        self.devices_by_id = {device.id: device for device in self.devices}
+
+        self.alerts = []
+        for a in range(alerts):
+            aseed = _mix(self.seed ^ (a + 5000001))
+            self.alerts.append({
+                'id': str(600000000000000000 + index * 100000 + a),
+                'severity': _pick(SEVERITIES, _unit(aseed, 1)),
+                'status': 'created' if _unit(aseed, 2) < 0.3 else ('paused' if _unit(aseed, 2) < 0.35 else 'resolved'),
+                'dismissed': _unit(aseed, 3) < 0.1,
+                'dispatched': _unit(aseed, 4) >= 0.1,
+                'age': int(_unit(aseed, 5) * 60 * DAY),
+                'device': self.devices[int(_unit(aseed, 6) * len(self.devices))].id if self.devices else None,
+                'name': f'Synthetic alert {a}'
+            })
+
+    def device_row(self, device: Device, stat: str, ts: int) -> list:
+        """
+        One sample row for a device stat at an hourly timestamp
+        """
+        seed = device.seed ^ _metric_code(stat)
+        hour = ts // HOUR
+        wave = math.sin(2 * math.pi * ((hour % 24) / 24.0))
+        noise = _unit(seed, hour) - 0.5
+        if stat == 'uptime':
+            day = hour // 24
+            if _unit(seed, day * 7 + 1) < self.outage_rate:
+                start = int(_unit(seed, day * 7 + 2) * 24)
+                length = 1 + int(_unit(seed, day * 7 + 3) * 6)
+                if start <= hour % 24 < start + length:
+                    return [ts, 0.0]
+            return [ts, 50.0 if _unit(seed, hour) < 0.002 else 100.0]
+        if stat == 'bandwidth':
+            base = 10 ** (5 + 3 * _unit(seed, 0))
+            tx = base * (0.6 + 0.3 * wave + 0.2 * noise)
+            rx = base * (0.9 + 0.4 * wave + 0.2 * (_unit(seed, hour + 1) - 0.5))
+            return [ts, round(tx, 1), round(rx, 1), round(tx + rx, 1)]
+        if stat.startswith('packet'):
+            base = 10 ** (2 + 2 * _unit(seed, 0))
+            tx = base * (1 + 0.5 * wave + noise)
+            rx = base * (1 + 0.5 * wave + _unit(seed, hour + 1) - 0.5)
+            return [ts, round(tx, 1), round(rx, 1)]
+        # utilization percentages; a few devices are pegged during business hours
+        if _unit(seed, 2) < 0.05 and 9 <= hour % 24 < 15:
+            return [ts, 100.0]
+        base = 5 + 55 * _unit(seed, 0)
+        amp = 5 + 20 * _unit(seed, 1)
+        return [ts, round(min(100.0, max(0.0, base + amp * wave + 10 * noise)), 2)]
+
+    def interface_row(self, interface: Interface, stat: str, ts: int) -> list:
+        """
+        One sample row for an interface stat at an hourly timestamp
+        """
+        seed = interface.seed ^ _metric_code(stat)
+        hour = ts // HOUR
+        wave = math.sin(2 * math.pi * ((hour % 24) / 24.0))
+        noise = _unit(seed, hour) - 0.5
+        if stat == 'utilization':
+            # occasional counter-wrap garbage the reports have to filter out
+            if _unit(seed, hour + 7) < 0.001:
+                return [ts, 250.0]
+            base = 1 + 40 * _unit(seed, 0)
+            return [ts, round(max(0.0, base * (1 + 0.5 * wave) + 5 * noise), 2)]
+        if stat == 'bandwidth':
+            base = 10 ** (4 + 3 * _unit(seed, 0))
+            tx = base * (0.7 + 0.3 * wave + 0.2 * noise)
+            rx = base * (0.8 + 0.3 * wave)
+            return [ts, round(tx, 1), round(rx, 1), round(tx + rx, 1)]
+        base = 10 ** (1 + 2 * _unit(seed, 0))
+        return [ts, round(base * (1 + wave + noise), 1), round(base * (1.2 + wave - noise), 1)]
+
+def hours_between(from_ts: int, thru_ts: int) -> range:
+    """
+    Hourly sample timestamps inside [from_ts, thru_ts], both ends inclusive
+    """
+    first = -(-from_ts // HOUR) * HOUR
+    return range(first, thru_ts + 1, HOUR)
+
+def rollup(rows: List[list], interval: str) -> List[list]:
+    """
+    Averages hourly rows into day buckets when a coarser interval is requested
+
+    Args:
+        rows (List[list]): Hourly rows [ts, v1, v2, ...]
+        interval (str): 'hour' or 'day'
+
+    Returns:
+        List[list]: Rows at the requested interval
+    """
+    if interval != 'day' or not rows:
+        return rows
+    out = []
+    bucket = None
+    sums = None
+    count = 0
+    for row in rows:
+        day = row[0] // DAY * DAY
+        if day != bucket:
+            if bucket is not None:
+                out.append([bucket] + [round(s / count, 4) for s in sums])
+            bucket, sums, count = day, [0.0] * (len(row) - 1), 0
+        for i, value in enumerate(row[1:]):
+            sums[i] += value
+        count += 1
+    out.append([bucket] + [round(s / count, 4) for s in sums])
+    return out
+
+def generate_tenants(count: int = 3, seed: int = 0, devices: int = 200, **kwargs) -> List[SyntheticTenant]:
+    """
+    Builds a list of synthetic tenants
+
+    Args:
+        count (int): Number of client tenants
+        seed (int): Seed shared by every tenant
+        devices (int): Devices per tenant
+        **kwargs: Passed through to SyntheticTenant
+
+    Returns:
+        List[SyntheticTenant]: The tenants
+    """
+    return [SyntheticTenant(index, seed=seed, devices=devices, **kwargs) for index in range(1, count + 1)]
@@ -0,0 +1,450 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+from datetime import datetime, timezone, timedelta, date
+from collections import Counter
+from types import SimpleNamespace
+from typing import List, Dict, Callable
+import json
+import gzip
+import time
+import base64
+import hashlib
+import random
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .generator import SyntheticTenant, hours_between, rollup, DEVICE_STATS, INTERFACE_STATS, HOUR
+
+LEGENDS = {
+    'bandwidth': (['Time', 'Transmit', 'Receive', 'Total'], 'bitsPerSecond'),
+    'uptime': (['Time', 'Availability'], 'percentage'),
+}
+
+def parse_time(value: str) -> int:
+    """
+    Parses the Auvik filter timestamp format into epoch seconds
+    """
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ'):
+        try:
+            return int(datetime.strptime(value, fmt).replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            continue
+    raise ValueError(f'Bad time filter: {value}')
+
+def format_time(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+class MockAuvikServer:
+    """
+    Threaded HTTP server that speaks the subset of the Auvik JSON:API used by the report fetchers
+
+    Every 200 carries an ETag, and a request whose If-None-Match matches it gets an empty 304.
+
+    Args:
+        tenants (List[SyntheticTenant]): The client tenants to serve
+        host (str): Bind address
+        port (int): Bind port, 0 picks a free port
+        latency (float): Seconds added to every response
+        rate_limit_rate (float): Fraction of requests answered with 429
+        page_size (int): Default page size when page[first] is not sent
+        main_domain (str): Domain prefix of the parent multi-client tenant
+        seed (int): Seed for latency jitter and 429 injection
+    """
+
+    def __init__(self, tenants: List[SyntheticTenant], host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 rate_limit_rate: float = 0.0, page_size: int = 100, main_domain: str = 'mainauvik', seed: int = 0):
+        self.tenants = tenants
+        self.tenants_by_id = {tenant.id: tenant for tenant in tenants}
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.page_size = page_size
+        self.main_domain = main_domain
+        self.now = int(time.time()) // HOUR * HOUR
+        self.hits = Counter()
+        self.wire_bytes = 0
+        self.not_modified = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'MockAuvikServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-auvik', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _roll(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    ###############################################################Routing######################################################################
+
+    def handle(self, path: str, query: Dict[str, str]):
+        """
+        Dispatches a GET to the matching endpoint
+
+        Returns:
+            int: HTTP status
+            dict: JSON body
+        """
+        parts = [p for p in path.split('/') if p]
+        route = '/'.join(parts)
+        if route == 'tenants/detail':
+            return 200, self._page(path, query, self._tenant_rows(), self._tenant_element)
+        if route == 'stat/deviceAvailability/uptime':
+            return 200, self._device_stats(path, query, 'uptime')
+        if len(parts) == 3 and parts[:2] == ['stat', 'device'] and parts[2] in DEVICE_STATS:
+            return 200, self._device_stats(path, query, parts[2])
+        if len(parts) == 3 and parts[:2] == ['stat', 'interface'] and parts[2] in INTERFACE_STATS:
+            return 200, self._interface_stats(path, query, parts[2])
+        if route == 'alert/history/info':
+            return 200, self._alerts(path, query)
+        if route == 'inventory/device/info':
+            return 200, self._page(path, query, self._filter_devices(query), self._device_element)
+        if len(parts) == 4 and route.startswith('inventory/device/info/'):
+            found = self._device(parts[3])
+            if found is None:
+                return 404, {'errors': [{'title': 'Not Found', 'detail': f'No device {parts[3]}'}]}
+            return 200, {'data': self._device_element(found)}
+        if route == 'inventory/interface/info':
+            return 200, self._page(path, query, self._filter_interfaces(query), self._interface_element)
+        if len(parts) == 4 and route.startswith('inventory/interface/info/'):
+            found = self._interface(parts[3])
+            if found is None:
+                return 404, {'errors': [{'title': 'Not Found', 'detail': f'No interface {parts[3]}'}]}
+            return 200, {'data': self._interface_element(found)}
+        if route == 'inventory/network/info':
+            rows = [(tenant, net) for tenant in self._tenants(query) for net in tenant.networks]
+            return 200, self._page(path, query, rows, self._network_element)
+        if route == 'billing/usage/client':
+            return 200, self._page(path, query, self._billing_rows(query), self._billing_element)
+        return 404, {'errors': [{'title': 'Not Found', 'detail': f'Unknown endpoint {path}'}]}
+
+    def _page(self, path: str, query: Dict[str, str], rows: list, build: Callable) -> Dict:
+        """
+        Slices rows into a JSON:API page and builds only the elements on that page
+        """
+        size = int(query.get('page[first]', self.page_size))
+        offset = 0
+        if 'page[after]' in query:
+            offset = int(base64.urlsafe_b64decode(query['page[after]'].encode()).decode())
+        chunk = rows[offset:offset + size]
+        body = {'data': [build(row) for row in chunk], 'links': {}}
+        base = {k: v for k, v in query.items() if k != 'page[after]'}
+        body['links']['first'] = f'{self.url}{path}?{urlencode(base, safe="[],:")}'
+        if offset + size < len(rows):
+            cursor = base64.urlsafe_b64encode(str(offset + size).encode()).decode()
+            body['links']['next'] = f'{self.url}{path}?{urlencode({**base, "page[after]": cursor}, safe="[],:")}'
+        return body
+
+    ###############################################################Lookups######################################################################
+
+    def _tenants(self, query: Dict[str, str]) -> List[SyntheticTenant]:
+        if 'tenants' not in query:
+            return self.tenants
+        return [self.tenants_by_id[t] for t in query['tenants'].split(',') if t in self.tenants_by_id]
+
+    def _device(self, device_id: str):
+        for tenant in self.tenants:
+            device = tenant.devices_by_id.get(device_id)
+            if device is not None:
+                return tenant, device
+        return None
+
+    def _interface(self, interface_id: str):
+        for tenant in self.tenants:
+            interface = tenant.interfaces.get(interface_id)
+            if interface is not None:
+                return tenant, interface
+        return None
+
+    def _filter_devices(self, query: Dict[str, str]) -> list:
+        rows = []
+        dtype = query.get('filter[deviceType]')
+        status = query.get('filter[onlineStatus]')
+        for tenant in self._tenants(query):
+            for device in tenant.devices:
+                if dtype and device.type != dtype:
+                    continue
+                if status and (device.online != (status == 'online')):
+                    continue
+                rows.append((tenant, device))
+        return rows
+
+    def _filter_interfaces(self, query: Dict[str, str]) -> list:
+        rows = []
+        itype = query.get('filter[interfaceType]')
+        parent = query.get('filter[parentDevice]')
+        if parent:
+            found = self._device(parent)
+            candidates = [(found[0], i) for i in found[1].interfaces] if found else []
+        else:
+            candidates = [(tenant, i) for tenant in self._tenants(query) for i in tenant.interfaces.values()]
+        for tenant, interface in candidates:
+            if itype and interface.type != itype:
+                continue
+            rows.append((tenant, interface))
+        return rows
+
+    ###############################################################Elements######################################################################
+
+    def _tenant_rows(self) -> list:
+        main = SimpleNamespace(id='100000000000000000', domain=self.main_domain, name='Main Tenant')
+        return [(main, 'multiClient')] + [(tenant, 'client') for tenant in self.tenants]
+
+    def _tenant_element(self, row) -> Dict:
+        tenant, tenant_type = row
+        return {
+            'id': tenant.id,
+            'type': 'tenantDetail',
+            'attributes': {'domainPrefix': tenant.domain, 'displayName': tenant.name, 'tenantType': tenant_type}
+        }
+
+    def _network_ref(self, tenant: SyntheticTenant, index: int) -> Dict:
+        net_id, net_name = tenant.networks[index]
+        return {'id': net_id, 'type': 'network', 'attributes': {'networkName': net_name}}
+
+    def _device_element(self, row) -> Dict:
+        tenant, device = row
+        return {
+            'id': device.id,
+            'type': 'device',
+            'attributes': {
+                'deviceName': device.name,
+                'deviceType': device.type,
+                'onlineStatus': 'online' if device.online else 'offline',
+                'lastSeenTime': format_time(self.now - (0 if device.online else 3 * 86400)),
+            },
+            'relationships': {
+                'tenant': {'data': {'id': tenant.id, 'type': 'tenant'}},
+                'networks': {'data': [self._network_ref(tenant, device.network)]},
+                'interfaces': {'data': [{'id': i.id, 'type': 'interface'} for i in device.interfaces]},
+            }
+        }
+
+    def _interface_element(self, row) -> Dict:
+        tenant, interface = row
+        return {
+            'id': interface.id,
+            'type': 'interface',
+            'attributes': {
+                'interfaceName': interface.name,
+                'interfaceType': interface.type,
+                'negotiatedSpeed': interface.speed,
+                'operationalStatus': 'online',
+            },
+            'relationships': {
+                'tenant': {'data': {'id': tenant.id, 'type': 'tenant'}},
+                'parentDevice': {'data': {'id': interface.device.id, 'type': 'device'}},
+            }
+        }
+
+    def _network_element(self, row) -> Dict:
+        tenant, (net_id, net_name) = row
+        return {
+            'id': net_id,
+            'type': 'network',
+            'attributes': {'networkName': net_name, 'networkType': 'routed'},
+            'relationships': {'tenant': {'data': {'id': tenant.id, 'type': 'tenant'}}}
+        }
+
+    def _window(self, query: Dict[str, str]):
+        thru = parse_time(query['filter[thruTime]']) if 'filter[thruTime]' in query else self.now
+        start = parse_time(query['filter[fromTime]']) if 'filter[fromTime]' in query else thru - 30 * 86400
+        return hours_between(start, thru), query.get('filter[interval]', 'hour')
+
+    def _stat_block(self, stat: str, rows: list) -> Dict:
+        legend, unit = LEGENDS.get(stat, (['Time', 'Value'], 'percentage'))
+        if stat.startswith('packet'):
+            legend, unit = ['Time', 'Transmit', 'Receive'], 'packetsPerSecond'
+        return {'statType': stat, 'legend': legend, 'unit': unit, 'data': rows}
+
+    def _device_stats(self, path: str, query: Dict[str, str], stat: str) -> Dict:
+        hours, interval = self._window(query)
+
+        def build(row):
+            tenant, device = row
+            samples = [tenant.device_row(device, stat, ts) for ts in hours] if device.monitored else []
+            return {
+                'id': device.id,
+                'type': 'statistics',
+                'attributes': {'stats': [self._stat_block(stat, rollup(samples, interval))]},
+                'relationships': {
+                    'device': {'data': {'id': device.id, 'type': 'device', 'deviceName': device.name, 'deviceType': device.type}},
+                    'tenant': {'data': {'id': tenant.id, 'type': 'tenant'}},
+                }
+            }
+        return self._page(path, query, self._filter_devices(query), build)
+
+    def _interface_stats(self, path: str, query: Dict[str, str], stat: str) -> Dict:
+        hours, interval = self._window(query)
+
+        def build(row):
+            tenant, interface = row
+            samples = [tenant.interface_row(interface, stat, ts) for ts in hours]
+            return {
+                'id': interface.id,
+                'type': 'statistics',
+                'attributes': {'stats': [self._stat_block(stat, rollup(samples, interval))]},
+                'relationships': {
+                    'interface': {'data': {
+                        'id': interface.id, 'type': 'interface', 'interfaceName': interface.name,
+                        'interfaceType': interface.type, 'parentDevice': interface.device.id
+                    }},
+                    'tenant': {'data': {'id': tenant.id, 'type': 'tenant'}},
+                }
+            }
+        return self._page(path, query, self._filter_interfaces(query), build)
+
+    def _alerts(self, path: str, query: Dict[str, str]) -> Dict:
+        after = parse_time(query['filter[detectedTimeAfter]']) if 'filter[detectedTimeAfter]' in query else None
+        before = parse_time(query['filter[detectedTimeBefore]']) if 'filter[detectedTimeBefore]' in query else None
+        rows = []
+        for tenant in self._tenants(query):
+            for alert in tenant.alerts:
+                detected = self.now - alert['age']
+                if 'filter[status]' in query and alert['status'] != query['filter[status]']:
+                    continue
+                if 'filter[severity]' in query and alert['severity'] != query['filter[severity]']:
+                    continue
+                if 'filter[dismissed]' in query and alert['dismissed'] != (query['filter[dismissed]'] == 'true'):
+                    continue
+                if 'filter[dispatched]' in query and alert['dispatched'] != (query['filter[dispatched]'] == 'true'):
+                    continue
+                if after is not None and detected < after:
+                    continue
+                if before is not None and detected > before:
+                    continue
+                rows.append((tenant, alert, detected))
+
+        def build(row):
+            tenant, alert, detected = row
+            return {
+                'id': alert['id'],
+                'type': 'alert',
+                'attributes': {
+                    'alertId': alert['id'],
+                    'name': alert['name'],
+                    'severity': alert['severity'],
+                    'status': alert['status'],
+                    'detectedOn': format_time(detected),
+                    'dismissed': alert['dismissed'],
+                    'dispatched': alert['dispatched'],
+                },
+                'relationships': {
+                    'tenant': {'data': {'id': tenant.id, 'type': 'tenant'}},
+                    'entity': {'data': {'id': alert['device'], 'type': 'device'}},
+                }
+            }
+        return self._page(path, query, rows, build)
+
+    def _billing_rows(self, query: Dict[str, str]) -> list:
+        start = date.fromisoformat(query.get('filter[fromDate]', date.today().isoformat()))
+        end = date.fromisoformat(query.get('filter[thruDate]', start.isoformat()))
+        rows = []
+        for tenant in self._tenants(query):
+            day = start
+            while day <= end:
+                rows.append((tenant, day))
+                day += timedelta(days=1)
+        return rows
+
+    def _billing_element(self, row) -> Dict:
+        tenant, day = row
+        billable = sum(1 for d in tenant.devices if d.type not in ('workstation', 'camera'))
+        # a little day-to-day churn so range queries have something to sum
+        churn = int(tenant.seed % 7) - 3 + day.toordinal() % 5
+        return {
+            'id': f'{tenant.id}-{day.isoformat()}',
+            'type': 'clientUsage',
+            'attributes': {
+                'clientId': tenant.id,
+                'clientName': tenant.name,
+                'domainPrefix': tenant.domain,
+                'date': day.isoformat(),
+                'deviceCount': len(tenant.devices),
+                'billableDeviceCount': max(0, billable + churn),
+            }
+        }
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        mock: MockAuvikServer = self.server.mock
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        mock.hits['/'.join(p for p in parts.path.split('/') if p and not p.isdigit())] += 1
+
+        if mock.latency:
+            time.sleep(mock.latency * (0.5 + mock._roll()))
+        if mock.rate_limit_rate and mock._roll() < mock.rate_limit_rate:
+            self._send(429, {'errors': [{'title': 'Too Many Requests', 'detail': 'Rate limit exceeded'}]}, {'Retry-After': '1'})
+            return
+        try:
+            status, body = mock.handle(parts.path, query)
+        except (ValueError, KeyError) as e:
+            status, body = 400, {'errors': [{'title': 'Bad Request', 'detail': str(e)}]}
+        self._send(status, body)
+
+    def _encode(self, payload: bytes):
+        """
+        Compresses the body with the best encoding the client accepts
+        """
+        accepted = {e.split(';')[0].strip() for e in self.headers.get('Accept-Encoding', '').split(',')}
+        if 'br' in accepted and brotli is not None:
+            return brotli.compress(payload, quality=4), 'br'
+        if 'gzip' in accepted:
+            return gzip.compress(payload, compresslevel=6, mtime=0), 'gzip'
+        return payload, None
+
+    def _send(self, status: int, body: Dict, headers: Dict[str, str] = None) -> None:
+        raw = json.dumps(body, separators=(',', ':')).encode()
+        mock: MockAuvikServer = self.server.mock
+        if status == 200:
+            etag = '"' + hashlib.sha1(raw).hexdigest()[:16] + '"'
+            headers = {**(headers or {}), 'ETag': etag}
+            if self.headers.get('If-None-Match') == etag:
+                with mock._lock:
+                    mock.not_modified += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+        payload, encoding = self._encode(raw)
+        with mock._lock:
+            mock.wire_bytes += len(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/vnd.api+json')
+        self.send_header('Content-Length', str(len(payload)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,28 @@
+from collections import OrderedDict
+
+import pytest
+
+from auvik_report import tsstore, warmer, httpcache, alertstore, billingstore
+from auvik_report.production import fetchers, networks
+
+#Files and directories under data/ the stores write, as (module, setting, path under the test's data root)
+DATA_PATHS = (
+    (tsstore, "STORE_DIR", "timeseries"),
+    (warmer, "DEMAND_FILE", "warmer/demand.json"),
+    (httpcache, "HTTP_CACHE_DIR", "http"),
+    (alertstore, "ALERT_DB", "alerts/alerts.sqlite"),
+    (billingstore, "BILLING_DB", "billing/billing.sqlite"),
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_data(tmp_path, monkeypatch):
+    """Point every store at a fresh data root per test and forget what earlier tests left in memory"""
+    for module, setting, path in DATA_PATHS:
+        monkeypatch.setattr(module, "DATA_DIR", tmp_path)
+        monkeypatch.setattr(module, setting, tmp_path / path)
+    monkeypatch.setattr(warmer, "_demand", None)
+    monkeypatch.setattr(warmer, "_dirty", False)
+    monkeypatch.setattr(fetchers, "_shard_plan", OrderedDict())
+    monkeypatch.setattr(networks, "_indexes", {})
+    return tmp_path
@@ -0,0 +1,129 @@
+import pytest
+from unittest.mock import patch
+
+from auvik_report import alertstore
+from auvik_report.production import fetchers
+from mock_auvik import MockAuvikServer, generate_tenants
+
+DAY = 86400
+NOW = 1_773_000_000.0
+
+
+def element(id, severity="warning", status="created", detected=NOW - DAY, dismissed=False, dispatched=True):
+    return {
+        "id": id,
+        "attributes": {
+            "name": f"alert {id}",
+            "severity": severity,
+            "status": status,
+            "dismissed": dismissed,
+            "dispatched": dispatched,
+            "detectedOn": alertstore._format(detected),
+        },
+        "relationships": {"entity": {"data": {"id": "dev1", "type": "device"}}},
+    }
+
+
+@pytest.fixture(scope="module")
+def tenant():
+    return generate_tenants(1, seed=9, devices=20, alerts=200)[0]
+
+
+@pytest.fixture
+def server(tenant, monkeypatch):
+    with MockAuvikServer([tenant], page_size=50) as mock:
+        monkeypatch.setattr(fetchers, "base_url", mock.url)
+        yield mock
+
+############################
+# Tests for sync
+############################
+@patch("auvik_report.alertstore.fetch_open_alerts")
+@patch("auvik_report.alertstore.fetch_alert_history")
+def test_sync_backfills_then_pulls_only_since_the_watermark(mock_history, mock_open):
+    mock_history.return_value = [element("1"), element("2", status="resolved")]
+    mock_open.return_value = [element("1")]
+    assert alertstore.sync("t1", now=NOW) == {"fetched": 2, "closed": 0}
+    start, end = mock_history.call_args[0][1]
+    assert start == NOW - alertstore.ALERT_BACKFILL_DAYS * DAY
+
+    mock_history.return_value = [element("3", severity="critical", detected=NOW + 500)]
+    assert alertstore.sync("t1", now=NOW + 600) == {"fetched": 1, "closed": -1}
+    start, end = mock_history.call_args[0][1]
+    assert start == NOW - alertstore.ALERT_OVERLAP
+    assert mock_open.call_count == 1
+    assert sorted(alertstore.open_counts("t1")) == [("critical", "created", 1), ("warning", "created", 1)]
+
+
+@patch("auvik_report.alertstore.fetch_open_alerts")
+@patch("auvik_report.alertstore.fetch_alert_history", return_value=[])
+def test_sync_skips_requests_when_recently_synced(mock_history, mock_open):
+    mock_open.return_value = []
+    alertstore.sync("t1", now=NOW)
+    alertstore.sync("t1", now=NOW + alertstore.ALERT_SYNC_SECONDS - 1)
+    assert mock_history.call_count == 1
+    alertstore.sync("t1", now=NOW + 1, force=True)
+    assert mock_history.call_count == 2
+
+
+@patch("auvik_report.alertstore.fetch_open_alerts")
+@patch("auvik_report.alertstore.fetch_alert_history")
+def test_reconcile_closes_alerts_that_left_the_open_set(mock_history, mock_open):
+    mock_history.return_value = [element("1"), element("2")]
+    mock_open.return_value = [element("1"), element("2")]
+    alertstore.sync("t1", now=NOW)
+    assert alertstore.open_counts("t1") == [("warning", "created", 2)]
+
+    # alert 2 was resolved long after it was detected, which the watermark pull cannot see
+    mock_history.return_value = []
+    mock_open.return_value = [element("1")]
+    assert alertstore.sync("t1", now=NOW + alertstore.ALERT_RECONCILE_SECONDS)["closed"] == 1
+    assert alertstore.open_counts("t1") == [("warning", "created", 1)]
+
+
+
+@patch("auvik_report.alertstore.fetch_open_alerts")
+@patch("auvik_report.alertstore.fetch_alert_history", return_value=[])
+def test_reconcile_on_request_fetches_only_the_open_set(mock_history, mock_open):
+    mock_open.return_value = [element("1"), element("2")]
+    alertstore.sync("t1", now=NOW)
+    mock_open.return_value = [element("1")]
+
+    assert alertstore.sync("t1", now=NOW + alertstore.ALERT_SYNC_SECONDS, reconcile=True) == {"fetched": 0, "closed": 1}
+    assert alertstore.open_counts("t1") == [("warning", "created", 1)]
+    assert (mock_history.call_count, mock_open.call_count) == (1, 2)
+    # not again within ALERT_SYNC_SECONDS
+    assert alertstore.sync("t1", now=NOW + alertstore.ALERT_SYNC_SECONDS + 1, reconcile=True) == {"fetched": 0, "closed": -1}
+    assert mock_open.call_count == 2
+
+    # the watermark did not move, so the next plain sync pulls the history the reconcile skipped
+    alertstore.sync("t1", now=NOW + alertstore.ALERT_SYNC_SECONDS + 2)
+    assert mock_history.call_count == 2
+    start, _ = mock_history.call_args[0][1]
+    assert start == NOW - alertstore.ALERT_OVERLAP
+
+############################
+# Tests for history and trends
+############################
+@patch("auvik_report.alertstore.fetch_open_alerts", return_value=[])
+@patch("auvik_report.alertstore.fetch_alert_history")
+def test_history_and_trend_read_local_state(mock_history, mock_open):
+    mock_history.return_value = [
+        element("1", severity="critical", detected=NOW - 2 * DAY + 10),
+        element("2", severity="warning", detected=NOW - 2 * DAY + 20),
+        element("3", severity="warning", detected=NOW - DAY + 30),
+        element("4", severity="info", detected=NOW - 40 * DAY),
+    ]
+    alertstore.sync("t1", now=NOW)
+    rows = alertstore.history("t1", NOW - 30 * DAY, NOW)
+    assert [row["id"] for row in rows] == ["1", "2", "3"]
+    assert rows[0]["attributes"]["severity"] == "critical"
+    assert rows[0]["attributes"]["detectedOn"] == alertstore._format(NOW - 2 * DAY + 10)
+    trend = alertstore.severity_trend("t1", NOW - 2 * DAY, NOW)
+    assert trend == {NOW - 2 * DAY: {"critical": 1, "warning": 1}, NOW - DAY: {"warning": 1}}
+
+
+def test_open_counts_match_the_open_alert_query(server, tenant):
+    alertstore.sync(tenant.id)
+    local = sum(count for _, _, count in alertstore.open_counts(tenant.id))
+    assert local == len(fetchers.fetch_open_alerts(tenant.id))
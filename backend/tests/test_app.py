@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+
+import pytest
+from cachelib import SimpleCache
+from sqlalchemy import event
+
+import app as app_module
+import auth
+import auvik_report
+from auvik_report import progress
+from config import ApplicationConfig
+from models import db
+
+
+class TestConfig(ApplicationConfig):
+    SECRET_KEY = "test"
+    TESTING = True
+    SQLALCHEMY_ECHO = False
+    SESSION_TYPE = "cachelib"
+    BCRYPT_LOG_ROUNDS = 4
+    IDENTITY_TTL = 60
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("REGISTRATION_SECRET", "invite")
+    config = type("Config", (TestConfig,), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'db.sqlite'}",
+        "SESSION_CACHELIB": SimpleCache(),
+    })
+    flask_app = app_module.create_app(config)
+    with flask_app.test_client() as client:
+        client.post("/api/register", json={"email": "a@example.com", "password": "pw", "confirmPassword": "pw", "invite": "invite"})
+        client.post("/api/logout")
+        client.flask_app = flask_app
+        yield client
+
+
+def count_queries(flask_app):
+    with flask_app.app_context():
+        engine = db.engine
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+############################
+# Tests for login
+############################
+def test_login_verifies_password_on_bcrypt_executor(client, monkeypatch):
+    threads = []
+    check = auth.bcrypt.check_password_hash
+
+    def recording(*args):
+        threads.append(threading.current_thread().name)
+        return check(*args)
+
+    monkeypatch.setattr(auth.bcrypt, "check_password_hash", recording)
+    assert client.post("/api/login", json={"email": "a@example.com", "password": "pw"}).status_code == 200
+    assert client.post("/api/login", json={"email": "a@example.com", "password": "nope"}).status_code == 401
+    assert len(threads) == 2
+    assert all(name.startswith("bcrypt") for name in threads)
+
+
+def test_login_returns_503_when_executor_is_saturated(client, monkeypatch):
+    client.flask_app.config["BCRYPT_TIMEOUT"] = 0.05
+    release = threading.Event()
+    monkeypatch.setattr(auth.bcrypt, "check_password_hash", lambda *args: release.wait())
+    try:
+        response = client.post("/api/login", json={"email": "a@example.com", "password": "pw"})
+    finally:
+        release.set()
+    assert response.status_code == 503
+
+
+
+def test_login_is_refused_at_once_when_slots_are_taken(client, monkeypatch):
+    slots = client.flask_app.extensions["bcrypt_slots"]
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    calls = []
+    monkeypatch.setattr(auth.bcrypt, "check_password_hash", lambda *args: calls.append(args))
+    try:
+        start = time.perf_counter()
+        response = client.post("/api/login", json={"email": "a@example.com", "password": "pw"})
+        elapsed = time.perf_counter() - start
+    finally:
+        for _ in range(taken):
+            slots.release()
+    assert taken == TestConfig.BCRYPT_WORKERS + TestConfig.BCRYPT_QUEUE
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert calls == []
+    assert elapsed < TestConfig.BCRYPT_TIMEOUT
+
+############################
+# Tests for /api/metrics
+############################
+def test_metrics_need_a_session_or_the_scrape_token(client, monkeypatch):
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer "}).status_code == 401
+
+    monkeypatch.setenv("METRICS_TOKEN", "scrape")
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/api/metrics", headers={"Authorization": "Bearer scrape"})
+    assert response.status_code == 200
+    assert "# TYPE report_cache_total counter" in response.get_data(as_text=True)
+
+    monkeypatch.delenv("METRICS_TOKEN")
+    client.post("/api/login", json={"email": "a@example.com", "password": "pw"})
+    assert client.get("/api/metrics").status_code == 200
+
+############################
+# Tests for /api/me
+############################
+def test_me_is_served_from_session_without_database(client):
+    client.post("/api/login", json={"email": "a@example.com", "password": "pw"})
+    statements = count_queries(client.flask_app)
+    for _ in range(3):
+        response = client.get("/api/me")
+        assert response.get_json() == {"id": 1, "email": "a@example.com"}
+    assert statements == []
+
+
+def test_me_reloads_identity_after_ttl(client, monkeypatch):
+    client.post("/api/login", json={"email": "a@example.com", "password": "pw"})
+    statements = count_queries(client.flask_app)
+    now = time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: now + TestConfig.IDENTITY_TTL + 1)
+    assert client.get("/api/me").status_code == 200
+    assert len(statements) == 1
+    assert client.get("/api/me").status_code == 200
+    assert len(statements) == 1
+
+
+def test_me_after_logout_is_unauthorized(client):
+    client.post("/api/login", json={"email": "a@example.com", "password": "pw"})
+    client.post("/api/logout")
+    assert client.get("/api/me").status_code == 401
+
+############################
+# Tests for /api/generate-report/stream
+############################
+def read_events(response):
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if block.startswith("event: "):
+            kind, data = block.split("\n", 1)
+            events.append((kind[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_emits_progress_then_artifact_urls(client, monkeypatch):
+    def fake_generate(domain, period):
+        with progress.phase("tenants"):
+            pass
+        progress.emit("interfaces", done=1, total=1)
+        return "Tenant One"
+
+    monkeypatch.setattr(auvik_report, "generate_report", fake_generate)
+    client.post("/api/login", json={"email": "a@example.com", "password": "pw"})
+    response = client.get("/api/generate-report/stream?domain=one&period=7")
+
+    assert response.mimetype == "text/event-stream"
+    events = read_events(response)
+    assert [kind for kind, _ in events] == ["progress", "progress", "done"]
+    assert events[0][1]["phase"] == "tenants" and "seconds" in events[0][1]
+    assert events[1][1] == {"phase": "interfaces", "done": 1, "total": 1}
+    assert events[2][1] == {"domain": "one", "name": "Tenant One", "period": "7", "preview": "/output/one.pdf", "download": "/output/one.pdf"}
+
+
+def test_stream_reports_errors(client, monkeypatch):
+    def failing(domain, period):
+        raise FileNotFoundError("wkhtmltopdf not found")
+
+    monkeypatch.setattr(auvik_report, "generate_report", failing)
+    client.post("/api/login", json={"email": "a@example.com", "password": "pw"})
+    events = read_events(client.get("/api/generate-report/stream?domain=one"))
+    assert events == [("error", {"error": "wkhtmltopdf not found"})]
+
+
+def test_stream_requires_login_and_valid_period(client):
+    assert client.get("/api/generate-report/stream?domain=one").status_code == 401
+    client.post("/api/login", json={"email": "a@example.com", "password": "pw"})
+    assert client.get("/api/generate-report/stream?domain=one&period=12").status_code == 400
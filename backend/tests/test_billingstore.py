@@ -0,0 +1,108 @@
+import pytest
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+from auvik_report import billingstore, metrics
+from auvik_report.production import fetchers
+from mock_auvik import MockAuvikServer, generate_tenants
+
+#Noon on 2026-03-10 UTC, so the last complete day is 2026-03-09
+NOW = datetime(2026, 3, 10, 12, tzinfo=timezone.utc).timestamp()
+
+
+def element(day, client="c1", billable=10):
+    return {
+        "id": f"{client}-{day}",
+        "attributes": {"clientId": client, "clientName": client.upper(), "domainPrefix": client,
+                       "date": day, "deviceCount": billable + 2, "billableDeviceCount": billable},
+    }
+
+
+def fake_usage(tenant, first, last):
+    days = [date.fromordinal(n).isoformat()
+            for n in range(date.fromisoformat(first).toordinal(), date.fromisoformat(last).toordinal() + 1)]
+    # no usage is reported on the 5th of any month
+    return [element(day, billable=int(day[-2:])) for day in days if not day.endswith("-05")]
+
+
+@pytest.fixture(scope="module")
+def tenant():
+    return generate_tenants(1, seed=11, devices=20)[0]
+
+
+@pytest.fixture
+def server(tenant, monkeypatch):
+    with MockAuvikServer([tenant], page_size=25) as mock:
+        monkeypatch.setattr(fetchers, "base_url", mock.url)
+        yield mock
+
+############################
+# Tests for ranges
+############################
+def test_month_and_quarter_ranges():
+    assert billingstore.month_range(2026, 2) == (date(2026, 2, 1), date(2026, 2, 28))
+    assert billingstore.month_range(2025, 12) == (date(2025, 12, 1), date(2025, 12, 31))
+    assert billingstore.quarter_range(2026, 1) == (date(2026, 1, 1), date(2026, 3, 31))
+    assert billingstore.quarter_range(2026, 4) == (date(2026, 10, 1), date(2026, 12, 31))
+
+
+def test_day_runs_split_gaps_and_long_runs():
+    days = [date(2026, 3, d) for d in (1, 2, 3, 5, 6, 7, 8, 9, 10, 11, 12, 20)]
+    assert billingstore.day_runs(days, size=4) == [
+        (date(2026, 3, 1), date(2026, 3, 3)),
+        (date(2026, 3, 5), date(2026, 3, 8)),
+        (date(2026, 3, 9), date(2026, 3, 12)),
+        (date(2026, 3, 20), date(2026, 3, 20)),
+    ]
+
+############################
+# Tests for ingest
+############################
+@patch("auvik_report.billingstore.fetch_billing_usage", side_effect=fake_usage)
+def test_ingest_fetches_each_day_once(mock_fetch):
+    assert billingstore.ingest("t1", date(2026, 3, 1), date(2026, 3, 9), now=NOW) == 9
+    assert mock_fetch.call_count == 2
+    # the day without usage is remembered as ingested
+    assert billingstore.ingest("t1", date(2026, 3, 1), date(2026, 3, 9), now=NOW) == 0
+    assert mock_fetch.call_count == 2
+
+    assert billingstore.ingest("t1", date(2026, 2, 27), date(2026, 3, 2), now=NOW) == 2
+    assert mock_fetch.call_args.args == ("t1", "2026-02-27", "2026-02-28")
+
+
+@patch("auvik_report.billingstore.fetch_billing_usage", side_effect=fake_usage)
+def test_ingest_skips_incomplete_days(mock_fetch):
+    assert billingstore.ingest("t1", date(2026, 3, 8), date(2026, 3, 31), now=NOW) == 2
+    assert billingstore.missing_days("t1", date(2026, 3, 8), date(2026, 3, 11)) == [date(2026, 3, 10), date(2026, 3, 11)]
+
+
+@patch("auvik_report.billingstore.fetch_billing_usage", side_effect=fake_usage)
+def test_sync_backfills_the_configured_days(mock_fetch, monkeypatch):
+    monkeypatch.setattr(billingstore, "BILLING_BACKFILL_DAYS", 20)
+    assert billingstore.sync("t1", now=NOW) == 20
+    assert billingstore.missing_days("t1", date(2026, 2, 18), date(2026, 3, 9)) == []
+    assert mock_fetch.call_count == 3
+
+############################
+# Tests for range queries
+############################
+@patch("auvik_report.billingstore.fetch_billing_usage", side_effect=fake_usage)
+def test_range_usage_sums_locally(mock_fetch):
+    first, last = billingstore.month_range(2026, 2)
+    rows = billingstore.range_usage("t1", first, last, now=NOW)
+    assert rows == [{"Client": "c1", "Name": "C1", "Domain": "c1", "Days": 27,
+                     "Average Billable": 14.9, "Peak Billable": 28, "Device Days": 401}]
+    calls = mock_fetch.call_count
+
+    assert billingstore.range_usage("t1", first, last, now=NOW) == rows
+    assert mock_fetch.call_count == calls
+    assert len(billingstore.daily_usage("t1", date(2026, 2, 1), date(2026, 2, 7))) == 6
+
+
+def test_backfill_against_mock_counts_requests(server, tenant, monkeypatch):
+    monkeypatch.setattr(billingstore, "BILLING_CHUNK_DAYS", 10)
+    before = metrics.thread_total("auvik_requests_total")
+    rows = billingstore.range_usage(tenant.id, date(2026, 1, 1), date(2026, 1, 31), now=NOW)
+    assert metrics.thread_total("auvik_requests_total") - before == 4
+    assert rows[0]["Days"] == 31
+    assert rows[0]["Name"] == tenant.name
@@ -0,0 +1,51 @@
+import json
+import time
+
+import pytest
+
+from auvik_report import cache
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    return tmp_path / "cache"
+
+############################
+# Tests for the file format
+############################
+def test_set_cache_writes_compressed_versioned_file(cache_dir):
+    data = {"uptime": {"Router": {"30 Days": 99.9}}, "bandwidth": [{"Device": "FW1"}] * 200}
+    cache.set_cache(data, "tenant1")
+    blob = (cache_dir / "tenant1_cache.avrc").read_bytes()
+    assert blob.startswith(cache.CACHE_MAGIC)
+    assert len(blob) < len(json.dumps(data)) / 5
+    assert cache.get_cache("tenant1") == data
+
+
+def test_get_cache_treats_file_without_header_as_miss(cache_dir):
+    cache_dir.mkdir()
+    plain = {"timestamp": time.time(), "data": {"alerts": {"Critical": 1}}}
+    (cache_dir / "tenant1_cache.avrc").write_text(json.dumps(plain))
+    assert cache.get_cache("tenant1") is None
+
+
+def test_get_cache_treats_unknown_version_as_miss(cache_dir):
+    cache_dir.mkdir()
+    blob = cache.CACHE_HEADER.pack(cache.CACHE_MAGIC, cache.CACHE_VERSION + 1) + b"future"
+    (cache_dir / "tenant1_cache.avrc").write_bytes(blob)
+    assert cache.get_cache("tenant1") is None
+
+
+def test_get_cache_treats_truncated_file_as_miss(cache_dir):
+    cache.set_cache({"alerts": {}}, "tenant1")
+    path = cache_dir / "tenant1_cache.avrc"
+    path.write_bytes(path.read_bytes()[:-8])
+    assert cache.get_cache("tenant1") is None
+
+
+def test_get_cache_expires(cache_dir, monkeypatch):
+    cache.set_cache({"alerts": {}}, "tenant1")
+    monkeypatch.setattr(cache.time, "time", lambda: 1e12)
+    assert cache.get_cache("tenant1") is None
@@ -0,0 +1,65 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+
+from auvik_report import capture
+
+
+@pytest.fixture
+def capture_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(capture, "DATA_DIR", tmp_path / "data")
+    monkeypatch.setattr(capture, "CAPTURE_DIR", tmp_path / "data" / "capture")
+    monkeypatch.setattr(capture, "_start_writer", lambda: None)
+    capture._responses.clear()
+    capture._errors.clear()
+    return tmp_path / "data" / "capture"
+
+
+def make_response(body=b'{"data": []}', status=200):
+    response = MagicMock()
+    response.status_code = status
+    response.url = "http://fake-base/inventory/device/info"
+    response.content = body
+    response.text = body.decode()
+    return response
+
+############################
+# Tests for capture_response
+############################
+def test_capture_response_disabled_is_noop(capture_dir, monkeypatch):
+    monkeypatch.setattr(capture, "CAPTURE_ENABLED", False)
+    capture.capture_response(make_response())
+    assert len(capture._responses) == 0
+
+
+def test_capture_response_respects_sample_rate(capture_dir, monkeypatch):
+    monkeypatch.setattr(capture, "CAPTURE_ENABLED", True)
+    monkeypatch.setattr(capture, "CAPTURE_SAMPLE_RATE", 0.0)
+    capture.capture_response(make_response())
+    assert len(capture._responses) == 0
+
+
+def test_capture_response_flushes_to_jsonl(capture_dir, monkeypatch):
+    monkeypatch.setattr(capture, "CAPTURE_ENABLED", True)
+    monkeypatch.setattr(capture, "CAPTURE_SAMPLE_RATE", 1.0)
+    capture.capture_response(make_response())
+    capture.flush()
+
+    lines = (capture_dir / capture.CAPTURE_FILE).read_text().splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry["status"] == 200
+    assert entry["body"] == '{"data": []}'
+    assert len(capture._responses) == 0
+
+############################
+# Tests for capture_error
+############################
+def test_capture_error_written_by_flush(capture_dir):
+    capture.capture_error(make_response(b"server exploded", status=500))
+    assert not (capture_dir / capture.ERROR_FILE).exists()
+
+    capture.flush()
+    log = (capture_dir / capture.ERROR_FILE).read_text()
+    assert "[HTTP 500]" in log
+    assert "server exploded" in log
@@ -2,6 +2,7 @@ import pytest
 import requests
 from unittest.mock import patch, MagicMock
 from datetime import datetime
+import json
 import os
 
 # Fake environment variables for testing
@@ -18,7 +19,79 @@ from auvik_report.production.fetchers import (
     fetch_device_stats,
     fetch_device_availability_stats,
     fetch_interface_stats,
+    shard_count,
+    shard_windows,
 )
+from auvik_report.production import fetchers
+from auvik_report.production.schemas import DeviceStatPage
+from auvik_report import metrics
+
+############################
+# Tests for time shards
+############################
+def test_shard_windows_split_on_interval_boundaries():
+    day = 86400
+    shards = shard_windows((0, 30 * day), "day", 4)
+    assert shards == [(0, 7 * day), (7 * day, 15 * day), (15 * day, 22 * day), (22 * day, 30 * day)]
+    assert all(start % day == 0 for start, _ in shards)
+
+
+def test_shard_windows_never_more_than_buckets():
+    assert shard_windows((0, 2 * 3600), "hour", 8) == [(0, 3600), (3600, 7200)]
+    assert shard_windows((0, 86400), "day", 4) == [(0, 86400)]
+
+
+def test_shard_count_follows_observed_pages(monkeypatch):
+    monkeypatch.setattr("auvik_report.production.fetchers.SHARD_PAGES", 4)
+    monkeypatch.setattr("auvik_report.production.fetchers.FETCH_SHARDS", 3)
+    assert shard_count(0) == 1
+    assert shard_count(4) == 1
+    assert shard_count(5) == 2
+    assert shard_count(100) == 3
+
+def fake_time_paged(url, parse=None, schema=None):
+    # one page per day of the window, like an API that pages by sample count
+    days = (datetime.strptime(url.split("thruTime]=")[1][:10], "%Y-%m-%d")
+            - datetime.strptime(url.split("fromTime]=")[1][:10], "%Y-%m-%d")).days + 1
+    metrics.inc("auvik_pages_total", ("stat/device/bandwidth",), days)
+    return []
+
+
+@patch("auvik_report.production.fetchers.fetch_paginated_data", side_effect=fake_time_paged)
+def test_fetch_shards_adapt_to_page_count(mock_fetch, monkeypatch):
+    monkeypatch.setattr("auvik_report.production.fetchers.SHARD_PAGES", 10)
+    monkeypatch.setattr("auvik_report.production.fetchers.FETCH_SHARDS", 4)
+    fetch_device_stats("tenant123", "bandwidth")
+    assert mock_fetch.call_count == 1
+    fetch_device_stats("tenant123", "bandwidth")
+    assert mock_fetch.call_count == 1 + 3
+    # shards walked fewer pages each, so the plan is re-estimated from their total and stays sharded
+    fetch_device_stats("tenant123", "bandwidth")
+    assert mock_fetch.call_count == 1 + 3 + 3
+
+
+@patch("auvik_report.production.fetchers.fetch_paginated_data", side_effect=fake_time_paged)
+def test_fetch_shards_compare_pages_per_day(mock_fetch, monkeypatch):
+    monkeypatch.setattr("auvik_report.production.fetchers.SHARD_PAGES", 10)
+    monkeypatch.setattr("auvik_report.production.fetchers.FETCH_SHARDS", 4)
+    day = 86400
+    fetch_device_stats("tenant123", "bandwidth", window=(0, 30 * day), interval="day")
+    # a 1-day delta projects to a single page, so it stays serial
+    fetch_device_stats("tenant123", "bandwidth", window=(30 * day, 31 * day), interval="day")
+    assert mock_fetch.call_count == 2
+    # the short delta's page count does not make the next full window look unshardable
+    fetch_device_stats("tenant123", "bandwidth", window=(0, 30 * day), interval="day")
+    assert mock_fetch.call_count == 2 + 3
+    fetch_device_stats("tenant123", "bandwidth", window=(0, 30 * day), interval="day")
+    assert mock_fetch.call_count == 2 + 3 + 3
+
+
+@patch("auvik_report.production.fetchers.fetch_paginated_data", side_effect=fake_time_paged)
+def test_shard_plan_forgets_least_recent_queries(mock_fetch, monkeypatch):
+    monkeypatch.setattr("auvik_report.production.fetchers.SHARD_PLAN_SIZE", 2)
+    for tenant in ("t1", "t2", "t3"):
+        fetch_device_stats(tenant, "bandwidth")
+    assert [key.split("tenants=")[1] for key in fetchers._shard_plan] == ["t2", "t3"]
 
 ############################
 # Tests for format_date_range
@@ -39,10 +112,13 @@ def test_format_date_range_time_difference():
 ################################
 # Tests for fetch_paginated_data
 ################################
+def page(body):
+    return json.dumps(body).encode()
+
 @patch("auvik_report.production.fetchers.requests.get")
 def test_fetch_paginated_data_single_page(mock_get):
     mock_response = MagicMock()
-    mock_response.json.return_value = {"data": [{"id": 1}], "links": {}}
+    mock_response.content = page({"data": [{"id": 1}], "links": {}})
     mock_response.raise_for_status.return_value = None
     mock_get.return_value = mock_response
 
@@ -52,14 +128,14 @@ def test_fetch_paginated_data_single_page(mock_get):
 @patch("auvik_report.production.fetchers.requests.get")
 def test_fetch_paginated_data_multiple_pages(mock_get):
     first_page = MagicMock()
-    first_page.json.return_value = {
+    first_page.content = page({
         "data": [{"id": 1}],
         "links": {"next": "http://fake-url.com/page2"},
-    }
+    })
     first_page.raise_for_status.return_value = None
 
     second_page = MagicMock()
-    second_page.json.return_value = {"data": [{"id": 2}], "links": {}}
+    second_page.content = page({"data": [{"id": 2}], "links": {}})
     second_page.raise_for_status.return_value = None
 
     mock_get.side_effect = [first_page, second_page]
@@ -76,7 +152,7 @@ def test_fetch_paginated_data_network_error(mock_get):
 @patch("auvik_report.production.fetchers.requests.get")
 def test_fetch_paginated_data_invalid_json(mock_get):
     mock_response = MagicMock()
-    mock_response.json.side_effect = ValueError("Bad JSON")
+    mock_response.content = b'{"data": [Bad JSON'
     mock_response.raise_for_status.return_value = None
     mock_get.return_value = mock_response
 
@@ -86,16 +162,48 @@ def test_fetch_paginated_data_invalid_json(mock_get):
 @patch("auvik_report.production.fetchers.requests.get")
 def test_fetch_paginated_data_circular_pagination(mock_get):
     first_page = MagicMock()
-    first_page.json.return_value = {
+    first_page.content = page({
         "data": [{"id": 1}],
         "links": {"next": "http://fake-url.com/page1"},
-    }
+    })
     first_page.raise_for_status.return_value = None
     mock_get.return_value = first_page
 
     with pytest.raises(RuntimeError, match="circular pagination"):
         fetch_paginated_data("http://fake-url.com/page1")
 
+@patch("auvik_report.production.fetchers.requests.get")
+def test_fetch_paginated_data_with_schema(mock_get):
+    element = {
+        "id": "dev1",
+        "type": "statistics",
+        "attributes": {"stats": [{"statType": "cpuUtilization", "unit": "percentage", "data": [[1700000000, 12.5]]}]},
+        "relationships": {
+            "device": {"data": {"id": "dev1", "deviceName": "SW1", "deviceType": "switch", "extra": True}},
+            "tenant": {"data": {"id": "t1"}},
+        },
+    }
+    first_page = MagicMock()
+    first_page.content = page({"data": [element], "links": {"next": "http://fake-url.com/page2"}, "meta": {}})
+    second_page = MagicMock()
+    second_page.content = page({"data": [], "links": {}})
+    mock_get.side_effect = [first_page, second_page]
+
+    result = fetch_paginated_data("http://fake-url.com/page1", schema=DeviceStatPage)
+    assert mock_get.call_count == 2
+    assert result[0].relationships.device.data.deviceName == "SW1"
+    assert result[0].attributes.stats[0].data == [[1700000000, 12.5]]
+    assert not hasattr(result[0], "type")
+
+@patch("auvik_report.production.fetchers.requests.get")
+def test_fetch_paginated_data_schema_mismatch(mock_get):
+    mock_response = MagicMock()
+    mock_response.content = page({"data": [{"id": 5}], "links": {}})
+    mock_get.return_value = mock_response
+
+    with pytest.raises(RuntimeError, match="Invalid JSON"):
+        fetch_paginated_data("http://fake-url.com", schema=DeviceStatPage)
+
 ################################
 # Tests for fetcher functions
 ################################
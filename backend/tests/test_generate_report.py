@@ -1,3 +1,4 @@
+import sys
 import json
 import pytest
 import importlib
@@ -12,25 +13,18 @@ gr = importlib.import_module("auvik_report.generate_report")
 ############################
 @patch.object(gr, "get_cache")
 @patch.object(gr, "set_cache")
-@patch.object(gr, "device_health")
-@patch.object(gr, "bandwidth_report")
-@patch.object(gr, "open_alerts")
-@patch.object(gr, "uptime_report")
-def test_gather_data_fetches_when_no_cache(
-    mock_uptime, mock_alerts, mock_bandwidth, mock_health, mock_set, mock_get
-):
+@patch.object(gr, "gather_sections")
+def test_gather_data_fetches_when_no_cache(mock_sections, mock_set, mock_get):
     mock_get.return_value = None
-    mock_uptime.return_value = {"Router": 99.9}
-    mock_alerts.return_value = {"Critical": 1}
-    mock_bandwidth.return_value = [{"Device": "SW1"}]
-    mock_health.return_value = [{"name": "Router1"}]
+    mock_sections.return_value = {"uptime": {"Router": 99.9}, "outages": {"timeline": [], "longest": []}}
 
     result = gr.gather_data("tid1", "Tenant1")
-    assert "uptime" in result
-    assert "alerts" in result
-    assert "bandwidth" in result
-    assert "health" in result
-    mock_set.assert_called_once()
+    assert result["uptime"] == {"Router": 99.9}
+    assert result["outages"] == {"timeline": [], "longest": []}
+    tenant, _, names = mock_sections.call_args.args
+    assert tenant == "tid1"
+    assert names == gr.REPORT_SECTIONS
+    mock_set.assert_called_once_with(mock_sections.return_value, "Tenant1-30")
 
 
 @patch.object(gr, "get_cache")
@@ -75,15 +69,28 @@ def test_gather_tenants_populates_if_files_missing(mock_populate, tmp_path, monk
 ############################
 # Tests for generate_report
 ############################
-@patch.object(gr, "pdfkit")
+@pytest.fixture
+def rendering(tmp_path, monkeypatch):
+    """Stubs the Jinja environment and pdfkit, which generate_report imports when it runs"""
+    template_mock = MagicMock()
+    template_mock.render.return_value = "<html>Report</html>"
+    env_mock = MagicMock()
+    env_mock.get_template.return_value = template_mock
+    pdfkit_mock = MagicMock()
+
+    monkeypatch.setattr("jinja2.Environment", lambda *a, **k: env_mock)
+    monkeypatch.setitem(sys.modules, "pdfkit", pdfkit_mock)
+    monkeypatch.setattr(gr, "OUTPUT_DIR", tmp_path / "output")
+    monkeypatch.setattr(gr, "WKHTML_PATH", str(tmp_path / "wkhtmltopdf"))
+    monkeypatch.setattr(gr.Path, "exists", lambda self: True)
+    return template_mock, pdfkit_mock
+
+
 @patch.object(gr, "gather_data")
 @patch.object(gr, "gather_tenants")
-@patch.object(gr, "input")
-def test_generate_report_happy_path(
-    mock_input, mock_gather_tenants, mock_gather_data, mock_pdfkit, tmp_path, monkeypatch
-):
+def test_generate_report_happy_path(mock_gather_tenants, mock_gather_data, rendering, tmp_path):
+    template_mock, pdfkit_mock = rendering
     mock_gather_tenants.return_value = ({"dom1": "tid1"}, {"dom1": "Tenant1"})
-    mock_input.side_effect = ["dom1"]
     mock_gather_data.return_value = {
         "uptime": {"Router": 99.9},
         "alerts": {"Critical": 1},
@@ -91,51 +98,32 @@ def test_generate_report_happy_path(
         "health": [],
     }
 
-    template_mock = MagicMock()
-    template_mock.render.return_value = "<html>Report</html>"
-    env_mock = MagicMock()
-    env_mock.get_template.return_value = template_mock
-    monkeypatch.setattr(gr, "Environment", lambda *a, **k: env_mock)
-
-    monkeypatch.setattr(gr, "OUTPUT_DIR", tmp_path / "output")
-    monkeypatch.setattr(gr, "HTML_OUT", tmp_path / "output" / "report.html")
-    monkeypatch.setattr(gr, "PDF_OUT", tmp_path / "output" / "report.pdf")
-    monkeypatch.setattr(gr.Path, "exists", lambda self: True)
-
-    gr.generate_report()
+    assert gr.generate_report("dom1") == "Tenant1"
 
-    assert (tmp_path / "output" / "report.html").exists()
+    assert (tmp_path / "output" / "dom1.html").read_text() == "<html>Report</html>"
     template_mock.render.assert_called_once()
-    mock_pdfkit.from_file.assert_called_once()
+    assert mock_gather_data.call_args.args[:2] == ("tid1", "dom1")
+    html, pdf = pdfkit_mock.from_file.call_args.args
+    assert (html, pdf) == (str(tmp_path / "output" / "dom1.html"), str(tmp_path / "output" / "dom1.pdf"))
 
 
 @patch.object(gr, "gather_tenants")
-@patch.object(gr, "input")
-def test_generate_report_invalid_domain_triggers_repopulate(
-    mock_input, mock_gather_tenants, tmp_path, monkeypatch
-):
-    mock_gather_tenants.return_value = ({"dom1": "tid1"}, {"dom1": "Tenant1"})
-    mock_input.side_effect = ["wrongdom", "dom1"]
-
-    template_mock = MagicMock()
-    template_mock.render.return_value = "<html>Report</html>"
-    env_mock = MagicMock()
-    env_mock.get_template.return_value = template_mock
-    monkeypatch.setattr(gr, "Environment", lambda *a, **k: env_mock)
-
+def test_generate_report_invalid_domain_triggers_repopulate(mock_gather_tenants, rendering, tmp_path, monkeypatch):
+    # the tenant files predate dom2, repopulating adds it
+    mock_gather_tenants.side_effect = [
+        ({"dom1": "tid1"}, {"dom1": "Tenant1"}),
+        ({"dom1": "tid1", "dom2": "tid2"}, {"dom1": "Tenant1", "dom2": "Tenant2"}),
+    ]
+    populated = []
+    monkeypatch.setattr(gr, "populate_tenants", lambda: populated.append(True))
     monkeypatch.setattr(gr, "gather_data", lambda *a, **k: {
         "uptime": {},
         "alerts": {},
         "bandwidth": [],
         "health": [],
     })
-    monkeypatch.setattr(gr, "populate_tenants", lambda: None)
-    monkeypatch.setattr(gr, "OUTPUT_DIR", tmp_path / "output")
-    monkeypatch.setattr(gr, "HTML_OUT", tmp_path / "output" / "report.html")
-    monkeypatch.setattr(gr, "PDF_OUT", tmp_path / "output" / "report.pdf")
-    monkeypatch.setattr(gr.Path, "exists", lambda self: True)
-    monkeypatch.setattr(gr, "pdfkit", MagicMock())
 
-    gr.generate_report()
+    assert gr.generate_report("dom2") == "Tenant2"
 
-    assert (tmp_path / "output" / "report.html").exists()
+    assert populated == [True]
+    assert (tmp_path / "output" / "dom2.html").exists()
@@ -1,4 +1,5 @@
 import pytest
+from array import array
 from unittest.mock import patch
 
 from auvik_report.production.helpers import (
@@ -7,7 +8,24 @@ from auvik_report.production.helpers import (
     bandwidth_average,
     max_interface_average,
     stats_per_device,
+    digest_series,
 )
+from auvik_report.production.period import ReportPeriod
+from auvik_report.production.series import DeviceSeries, InterfaceSeries
+
+
+#Fixture timestamps are hour offsets into the default report period
+PERIOD_START = ReportPeriod.rolling(30).start_ts
+
+
+def in_period(series):
+    for s in series:
+        s.timestamps = array("d", (PERIOD_START + t * 3600 for t in s.timestamps))
+    return series
+
+
+def device_series(elements):
+    return in_period([DeviceSeries.from_element(e) for e in elements])
 
 ############################
 # Tests for score_calculator
@@ -29,6 +47,16 @@ def test_score_calculator_partial_missing_values():
     expected = 100 - (0.35 * 0 + 0.4 * 50 + 0.25 * 0)
     assert result == expected
 
+def test_score_calculator_weights_p95():
+    stats = {"cpu": 20, "memory": 20, "storage": 20, "cpu_p95": 100, "memory_p95": 20, "storage_p95": 20}
+    assert score_calculator(stats) == pytest.approx(80)
+    assert score_calculator(stats, p95_weight=0.5) == pytest.approx(100 - (0.35 * 60 + 0.4 * 20 + 0.25 * 20))
+
+
+def test_score_calculator_ignores_weight_without_p95():
+    stats = {"cpu": 20, "memory": 20, "storage": 20}
+    assert score_calculator(stats, p95_weight=0.5) == pytest.approx(80)
+
 ############################
 # Tests for health_scores
 ############################
@@ -48,6 +76,23 @@ def test_health_scores_excludes_high_scores():
     result = health_scores(stats)
     assert result == []
 
+def test_health_scores_lowest_first_capped_to_rows():
+    stats = {
+        "dev1": {"name": "SW1", "cpu": 80.0, "memory": 80.0, "storage": 80.0},
+        "dev2": {"name": "SW2", "cpu": 100.0, "memory": 100.0, "storage": 100.0},
+        "dev3": {"name": "SW3", "cpu": 90.0, "memory": 90.0, "storage": 90.0},
+    }
+    assert [row["name"] for row in health_scores(stats)] == ["SW2", "SW3", "SW1"]
+    assert [row["name"] for row in health_scores(stats, rows=2)] == ["SW2", "SW3"]
+
+def test_health_scores_flags_pegged_device_only_with_p95():
+    # pegged at 100% CPU and memory a quarter of the time, idle otherwise
+    stats = {"dev1": {"name": "SW1", "cpu": 40.0, "memory": 40.0, "storage": 20.0, "cpu_p95": 100.0, "memory_p95": 100.0, "storage_p95": 20.0}}
+    assert health_scores(stats) == []
+    report = health_scores(stats, p95_weight=0.5)
+    assert report == [{"name": "SW1", "cpu": 40.0, "memory": 40.0, "storage": 20.0, "health": 42.5,
+                       "cpu_p95": 100.0, "memory_p95": 100.0, "storage_p95": 20.0}]
+
 ############################
 # Tests for bandwidth_average
 ############################
@@ -64,14 +109,14 @@ def test_bandwidth_average_with_data():
             ]
         }
     }
-    tx_avg, rx_avg, total_avg = bandwidth_average(device)
+    tx_avg, rx_avg, total_avg = bandwidth_average(DeviceSeries.from_element(device))
     assert tx_avg == pytest.approx(1.5, rel=1e-3)
     assert rx_avg == pytest.approx(2.5, rel=1e-3)
     assert total_avg == pytest.approx(4.0, rel=1e-3)
 
 def test_bandwidth_average_no_data():
     device = {"attributes": {"stats": [{"data": []}]}}
-    tx_avg, rx_avg, total_avg = bandwidth_average(device)
+    tx_avg, rx_avg, total_avg = bandwidth_average(DeviceSeries.from_element(device))
     assert tx_avg == rx_avg == total_avg == 0
 
 ############################
@@ -79,7 +124,7 @@ def test_bandwidth_average_no_data():
 ############################
 @patch("auvik_report.production.helpers.fetch_interface_stats")
 def test_max_interface_average_returns_highest(mock_fetch):
-    mock_fetch.return_value = [
+    mock_fetch.return_value = in_period([InterfaceSeries.from_element(e) for e in [
         {
             "id": "int1",
             "attributes": {"stats": [{"data": [[1, 50], [2, 70]]}]},
@@ -90,22 +135,22 @@ def test_max_interface_average_returns_highest(mock_fetch):
             "attributes": {"stats": [{"data": [[1, 20], [2, 30]]}]},
             "relationships": {"interface": {"data": {"interfaceName": "eth1"}}},
         },
-    ]
-    device = {"id": "dev1"}
+    ]])
+    device = DeviceSeries(id="dev1")
     name, avg = max_interface_average(device)
     assert name == "eth0"
     assert avg == 60
 
 @patch("auvik_report.production.helpers.fetch_interface_stats")
 def test_max_interface_average_handles_empty_data(mock_fetch):
-    mock_fetch.return_value = [
+    mock_fetch.return_value = [InterfaceSeries.from_element(
         {
             "id": "int1",
             "attributes": {"stats": [{"data": []}]},
             "relationships": {"interface": {"data": {"interfaceName": "eth0"}}},
         }
-    ]
-    device = {"id": "dev1"}
+    )]
+    device = DeviceSeries(id="dev1")
     name, avg = max_interface_average(device)
     assert name == "NA"
     assert avg == 0
@@ -138,7 +183,7 @@ def test_stats_per_device_aggregates_correctly():
             "attributes": {"stats": [{"data": [[1, 40], [2, 60]]}]},
         }
     ]
-    result = stats_per_device(cpu, memory, storage)
+    result = stats_per_device(device_series(cpu), device_series(memory), device_series(storage))
     dev = result["dev1"]
     assert dev["id"] == "dev1"
     assert dev["name"] == "Router1"
@@ -156,8 +201,45 @@ def test_stats_per_device_handles_empty_stats():
         }
     ]
     memory, storage = [], []
-    result = stats_per_device(cpu, memory, storage)
+    result = stats_per_device(device_series(cpu), device_series(memory), device_series(storage))
     dev = result["dev1"]
     assert dev["cpu"] is None
     assert dev["memory"] is None
     assert dev["storage"] is None
+
+
+def test_stats_per_device_estimates_p95_when_asked():
+    pegged = [[t, 100 if t % 4 == 0 else 10] for t in range(720)]
+    cpu = [{"relationships": {"device": {"data": {"id": "dev1", "deviceName": "SW1"}}}, "attributes": {"stats": [{"data": pegged}]}}]
+    result = stats_per_device(device_series(cpu), [], [], quantiles=True)
+    dev = result["dev1"]
+    assert dev["cpu"] == 32.5
+    assert dev["cpu_p95"] == 100.0
+    assert "memory_p95" not in dev
+    assert "cpu_p95" not in stats_per_device(device_series(cpu), [], [])["dev1"]
+
+
+def test_stats_per_device_p95_spans_every_series_of_a_device():
+    quiet = [[t, 10] for t in range(90)]
+    pegged = [[t, 100] for t in range(90, 100)]
+    cpu = [{"relationships": {"device": {"data": {"id": "dev1", "deviceName": "SW1"}}}, "attributes": {"stats": [{"data": data}]}}
+           for data in (quiet, pegged)]
+    result = stats_per_device(device_series(cpu), [], [], quantiles=True)
+    # 10% of the combined samples are pegged, so the p95 is too; neither series alone says so
+    assert result["dev1"]["cpu_p95"] == 100.0
+
+############################
+# Tests for digest_series
+############################
+def test_digest_series_folds_chunks_per_device():
+    chunks = [
+        DeviceSeries("a", "dev1", "SW1", timestamps=array("d", [0, 1]), columns=(array("d", [10, 20]),)),
+        DeviceSeries("b", "dev2", "SW2", timestamps=array("d", [0]), columns=(array("d", [5]),)),
+        DeviceSeries("a", "dev1", "SW1", timestamps=array("d", [2]), columns=(array("d", [float("nan")]),)),
+        DeviceSeries("a", "dev1", "SW1", timestamps=array("d", [3]), columns=(array("d", [30]),)),
+    ]
+    digests = digest_series(chunks)
+    assert [digest.device_id for digest in digests] == ["dev1", "dev2"]
+    assert digests[0].mean() == 20.0
+    assert len(digests[0].sketch) == 3
+    assert digests[0].sketch.quantile(1.0) == 30
@@ -0,0 +1,171 @@
+import os
+import time
+import threading
+import pytest
+from types import SimpleNamespace
+
+from auvik_report import httpcache, metrics, jsoncodec
+from auvik_report.production import fetchers
+from mock_auvik import MockAuvikServer, generate_tenants
+
+
+def response(status=200, body=b'{"data":[]}', **headers):
+    return SimpleNamespace(status_code=status, content=body, headers=headers)
+
+
+@pytest.fixture(scope="module")
+def tenant():
+    return generate_tenants(1, seed=5, devices=30)[0]
+
+
+@pytest.fixture
+def server(tenant, monkeypatch):
+    with MockAuvikServer([tenant], page_size=25) as mock:
+        monkeypatch.setattr(fetchers, "base_url", mock.url)
+        yield mock
+
+############################
+# Tests for the entry store
+############################
+def test_normalize_url_sorts_query_and_lowercases_host():
+    a = httpcache.normalize_url("HTTP://API.Example.com/stat?b=2&a=1#frag")
+    b = httpcache.normalize_url("http://api.example.com/stat?a=1&b=2")
+    assert a == b == "http://api.example.com/stat?a=1&b=2"
+    assert httpcache.entry_path("http://x/s?a=1&b=2") == httpcache.entry_path("http://x/s?b=2&a=1")
+
+
+def test_store_and_lookup_round_trip():
+    httpcache.store("http://x/s?a=1", response(body=b"payload", ETag='"v1"', **{"Last-Modified": "Sun, 01 Mar 2026 00:00:00 GMT"}))
+    entry = httpcache.lookup("http://x/s?a=1")
+    assert entry.body == b"payload"
+    assert entry.fresh()
+    assert entry.validators() == {"If-None-Match": '"v1"', "If-Modified-Since": "Sun, 01 Mar 2026 00:00:00 GMT"}
+
+
+def test_store_honours_cache_control():
+    assert httpcache.store("http://x/a", response(ETag='"v1"', **{"Cache-Control": "no-store"})) is None
+    assert httpcache.store("http://x/b", response(**{"Cache-Control": "no-cache"})) is None
+    assert httpcache.store("http://x/c", response(status=500, ETag='"v1"')) is None
+    entry = httpcache.store("http://x/d", response(ETag='"v1"', **{"Cache-Control": "private, max-age=60"}))
+    assert entry.max_age == 60
+    assert not entry.fresh(entry.stored + 61)
+    assert httpcache.lookup("http://x/a") is None
+
+
+def test_responses_without_validators_are_not_reused():
+    assert httpcache.store("http://x/a", response()) is None
+    assert httpcache.store("http://x/b", response(**{"Cache-Control": "max-age=30"})).max_age == 30
+    assert httpcache.store("http://x/c", response(ETag='"v1"')).max_age == httpcache.HTTP_CACHE_FRESH
+
+
+def test_concurrent_stores_of_one_url_all_succeed():
+    bodies = [f'{{"data":[{i}]}}'.encode() for i in range(8)]
+    errors = []
+    start = threading.Barrier(len(bodies))
+
+    def store(body):
+        start.wait()
+        try:
+            for _ in range(20):
+                httpcache.store("http://x/s", response(body=body, ETag='"v1"'))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=store, args=(body,)) for body in bodies]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert httpcache.lookup("http://x/s").body in bodies
+    assert not list(httpcache.entry_path("http://x/s").parent.glob("*.tmp"))
+
+
+def test_failed_store_is_not_fatal(monkeypatch):
+    def full(*args):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(httpcache.os, "replace", full)
+    entry = httpcache.store("http://x/s", response(body=b"payload", ETag='"v1"'))
+    assert entry.body == b"payload"
+    assert httpcache.lookup("http://x/s") is None
+    assert not list(httpcache.entry_path("http://x/s").parent.glob("*.tmp"))
+
+
+def test_lookup_ignores_corrupt_entries():
+    path = httpcache.entry_path("http://x/s")
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"AVH1\xff")
+    assert httpcache.lookup("http://x/s") is None
+
+
+def test_prune_removes_old_entries():
+    httpcache.store("http://x/s", response(ETag='"v1"'))
+    assert httpcache.prune() == 0
+    assert httpcache.prune(now=httpcache.lookup("http://x/s").stored + httpcache.HTTP_CACHE_RETENTION + 60) == 1
+    assert httpcache.lookup("http://x/s") is None
+
+
+
+def test_entries_are_compressed():
+    body = b'{"data":[' + b'{"value":1.0},' * 500 + b'{}]}'
+    httpcache.store("http://x/s", response(body=body, ETag='"v1"'))
+    assert httpcache.entry_path("http://x/s").stat().st_size < len(body) // 4
+    assert httpcache.lookup("http://x/s").body == body
+
+
+def test_uncompressed_entries_are_still_read():
+    meta = jsoncodec.dumps({"url": "http://x/s", "etag": '"v1"', "last_modified": None, "stored": 1.0, "max_age": 0})
+    path = httpcache.entry_path("http://x/s")
+    path.parent.mkdir(parents=True)
+    path.write_bytes(httpcache.ENTRY_HEADER.pack(b"AVH1", len(meta)) + meta + b"payload")
+    entry = httpcache.lookup("http://x/s")
+    assert entry.body == b"payload"
+    assert entry.etag == '"v1"'
+
+
+def test_store_prunes_without_the_warmer(monkeypatch):
+    httpcache.store("http://x/old", response(ETag='"v1"'))
+    old = httpcache.entry_path("http://x/old")
+    expired = time.time() - httpcache.HTTP_CACHE_RETENTION - 60
+    os.utime(old, (expired, expired))
+    monkeypatch.setattr(httpcache, "_last_prune", time.time())
+    httpcache.store("http://x/new", response(ETag='"v1"'))
+    # not due yet
+    assert old.exists()
+    monkeypatch.setattr(httpcache, "_last_prune", time.time() - httpcache.HTTP_CACHE_PRUNE_SECONDS - 1)
+    httpcache.store("http://x/new", response(ETag='"v2"'))
+    assert not old.exists()
+    assert httpcache.lookup("http://x/new").etag == '"v2"'
+
+############################
+# Tests against the mock server
+############################
+def test_repeat_fetch_is_served_without_requests(server, tenant):
+    first = fetchers.fetch_device_stats(tenant.id, "bandwidth")
+    requests_made = server.hits.total()
+    second = fetchers.fetch_device_stats(tenant.id, "bandwidth")
+    assert server.hits.total() == requests_made
+    assert [s.id for s in second] == [s.id for s in first]
+    assert [list(s.timestamps) for s in second] == [list(s.timestamps) for s in first]
+
+
+def test_stale_entries_are_revalidated_with_etags(server, tenant, monkeypatch):
+    monkeypatch.setattr(httpcache, "HTTP_CACHE_FRESH", 0)
+    fetchers.fetch_device_stats(tenant.id, "bandwidth")
+    pages = server.hits.total()
+    wire = server.wire_bytes
+    before = metrics.thread_total("auvik_http_cache_total")
+    again = fetchers.fetch_device_stats(tenant.id, "bandwidth")
+    assert server.not_modified == pages
+    assert server.wire_bytes == wire
+    assert metrics.thread_total("auvik_http_cache_total") - before == pages
+    assert len(again) == len(tenant.devices)
+
+
+def test_cache_can_be_turned_off(server, tenant, monkeypatch):
+    monkeypatch.setattr(httpcache, "HTTP_CACHE", False)
+    fetchers.fetch_device_stats(tenant.id, "bandwidth")
+    pages = server.hits.total()
+    fetchers.fetch_device_stats(tenant.id, "bandwidth")
+    assert server.hits.total() == 2 * pages
+    assert not any(httpcache.HTTP_CACHE_DIR.glob("*/*.bin"))
@@ -0,0 +1,54 @@
+import pytest
+
+from auvik_report import jsoncodec
+
+AVAILABLE = [name for name in jsoncodec.BACKENDS if jsoncodec.select(name) == name]
+
+
+@pytest.fixture
+def restore_backend():
+    previous = jsoncodec.BACKEND
+    yield
+    jsoncodec.select(previous)
+
+############################
+# Tests for each backend
+############################
+@pytest.mark.parametrize("backend", AVAILABLE)
+def test_round_trip_from_bytes(backend, restore_backend):
+    jsoncodec.select(backend)
+    body = {"data": [{"id": "1", "attributes": {"stats": [{"data": [[1700000000, 12.5, None]]}]}}], "links": {}}
+    encoded = jsoncodec.dumps(body)
+    assert isinstance(encoded, bytes)
+    assert jsoncodec.loads(encoded) == body
+    assert jsoncodec.loads(encoded.decode()) == body
+
+
+@pytest.mark.parametrize("backend", AVAILABLE)
+def test_invalid_json_raises_value_error(backend, restore_backend):
+    jsoncodec.select(backend)
+    with pytest.raises(ValueError):
+        jsoncodec.loads(b'{"data": [')
+
+
+@pytest.mark.parametrize("backend", AVAILABLE)
+def test_file_round_trip(backend, restore_backend, tmp_path):
+    jsoncodec.select(backend)
+    jsoncodec.dump({"timestamp": 1.5, "data": {"Router": {"30 Days": 99.9}}}, tmp_path / "cache.json")
+    assert jsoncodec.load(tmp_path / "cache.json") == {"timestamp": 1.5, "data": {"Router": {"30 Days": 99.9}}}
+
+############################
+# Tests for select
+############################
+def test_select_falls_back_when_backend_is_missing(monkeypatch, restore_backend):
+    def missing():
+        raise ImportError("not installed")
+
+    monkeypatch.setitem(jsoncodec.BACKENDS, "orjson", missing)
+    assert jsoncodec.select("orjson") != "orjson"
+    assert jsoncodec.loads(b"[1]") == [1]
+
+
+def test_stdlib_backend_is_always_available(restore_backend):
+    assert "json" in AVAILABLE
+    assert jsoncodec.select("json") == "json"
@@ -0,0 +1,76 @@
+import threading
+import pytest
+
+from auvik_report import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+############################
+# Tests for endpoint_label
+############################
+def test_endpoint_label_strips_query_and_ids():
+    assert metrics.endpoint_label(
+        "http://fake-base/stat/device/bandwidth?filter[interval]=hour&tenants=123"
+    ) == "stat/device/bandwidth"
+    assert metrics.endpoint_label(
+        "http://fake-base/inventory/device/info/835038309615014653"
+    ) == "inventory/device/info/{id}"
+
+############################
+# Tests for counters and histograms
+############################
+def test_counters_merge_across_threads():
+    def work():
+        for _ in range(100):
+            metrics.inc("auvik_pages_total", ("stat/device/bandwidth",))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    body = metrics.render_metrics()
+    assert 'auvik_pages_total{endpoint="stat/device/bandwidth"} 400' in body
+
+
+def test_histogram_exposition_is_cumulative():
+    metrics.observe("report_render_seconds", 0.02)
+    metrics.observe("report_render_seconds", 2.0)
+
+    body = metrics.render_metrics()
+    assert "# TYPE report_render_seconds histogram" in body
+    assert 'report_render_seconds_bucket{le="0.01"} 0' in body
+    assert 'report_render_seconds_bucket{le="0.05"} 1' in body
+    assert 'report_render_seconds_bucket{le="5.0"} 2' in body
+    assert 'report_render_seconds_bucket{le="+Inf"} 2' in body
+    assert "report_render_seconds_count 2" in body
+
+
+def test_label_values_are_escaped():
+    metrics.inc("report_cache_total", ('we"ird', "uptime", "hit"))
+    body = metrics.render_metrics()
+    assert 'tenant="we\\"ird"' in body
+
+
+def test_exited_threads_are_folded_into_one_store():
+    def work():
+        metrics.inc("auvik_pages_total", ("stat/device/bandwidth",))
+        metrics.observe("report_render_seconds", 0.02)
+
+    for _ in range(20):
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+
+    body = metrics.render_metrics()
+    assert 'auvik_pages_total{endpoint="stat/device/bandwidth"} 20' in body
+    assert 'report_render_seconds_count 20' in body
+    # only threads still running keep a store of their own
+    assert all(store.alive() for store in metrics._stores)
+    assert len(metrics._stores) <= threading.active_count()
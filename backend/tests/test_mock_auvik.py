@@ -0,0 +1,135 @@
+import pytest
+import requests
+
+from auvik_report import metrics, httpcache
+from auvik_report.production import fetchers
+from auvik_report.production.networks import network_index
+from mock_auvik import MockAuvikServer, generate_tenants
+from mock_auvik.generator import rollup
+
+
+@pytest.fixture(scope="module")
+def tenant():
+    return generate_tenants(1, seed=7, devices=60)[0]
+
+
+@pytest.fixture
+def server(tenant, monkeypatch):
+    # request counts below are per fetch; the response cache has its own tests
+    monkeypatch.setattr(httpcache, "HTTP_CACHE", False)
+    with MockAuvikServer([tenant], page_size=25, main_domain="prefix") as mock:
+        monkeypatch.setattr(fetchers, "base_url", mock.url)
+        monkeypatch.setattr(fetchers, "main_domain_prefix", "prefix")
+        yield mock
+
+############################
+# Tests for the generator
+############################
+def test_generator_is_seedable():
+    a = generate_tenants(1, seed=3, devices=20)[0]
+    b = generate_tenants(1, seed=3, devices=20)[0]
+    c = generate_tenants(1, seed=4, devices=20)[0]
+    assert [d.type for d in a.devices] == [d.type for d in b.devices]
+    assert a.device_row(a.devices[0], "cpuUtilization", 3600) == b.device_row(b.devices[0], "cpuUtilization", 3600)
+    assert [d.type for d in a.devices] != [d.type for d in c.devices]
+
+
+def test_rollup_averages_hours_into_days():
+    rows = [[0, 10.0], [3600, 30.0], [86400, 50.0]]
+    assert rollup(rows, "day") == [[0, 20.0], [86400, 50.0]]
+    assert rollup(rows, "hour") == rows
+
+############################
+# Tests against the fetchers
+############################
+def test_fetch_tenants_lists_main_and_clients(server, tenant):
+    tenants = fetchers.fetch_tenants()
+    domains = [t["attributes"]["domainPrefix"] for t in tenants]
+    assert domains == ["prefix", tenant.domain]
+
+
+def test_device_stats_follow_pagination(server, tenant):
+    stats = fetchers.fetch_device_stats(tenant.id, "cpuUtilization")
+    assert len(stats) == len(tenant.devices)
+    assert server.hits["stat/device/cpuUtilization"] == 3
+    monitored = next(s for s in stats if len(s))
+    # cpu is reported as a mean, so 30 whole days come back as daily buckets
+    assert len(monitored) == 30
+
+
+def test_device_stats_hourly_interval(server, tenant):
+    stats = fetchers.fetch_device_stats(tenant.id, "cpuUtilization", interval="hour")
+    monitored = next(s for s in stats if len(s))
+    assert len(monitored) == 720
+
+
+def test_device_stats_filter_by_type(server, tenant):
+    stats = fetchers.fetch_device_stats(tenant.id, "bandwidth", "switch")
+    expected = sum(1 for d in tenant.devices if d.type == "switch")
+    assert len(stats) == expected
+    assert all(s.device_type == "switch" for s in stats)
+
+
+def test_interface_stats_by_parent_device(server, tenant):
+    device = tenant.devices[0]
+    interfaces = fetchers.fetch_interface_stats(device.id, "utilization")
+    assert [i.parent_device for i in interfaces] == [device.id] * len(device.interfaces)
+
+
+def as_rows(series):
+    return [(s.id, list(s.timestamps), [str(list(c)) for c in s.columns]) for s in series]
+
+
+@pytest.mark.parametrize("stat, interval", [("bandwidth", "hour"), ("cpuUtilization", None), ("uptime", None)])
+def test_sharded_fetch_matches_serial(server, tenant, monkeypatch, stat, interval):
+    monkeypatch.setattr(fetchers, "SHARD_PAGES", 1)
+    fetch = lambda: (fetchers.fetch_device_availability_stats(tenant.id) if stat == "uptime"
+                     else fetchers.fetch_device_stats(tenant.id, stat, interval=interval))
+    serial = fetch()
+    pages = server.hits.total()
+    assert pages == 3
+    sharded = fetch()
+    # three pages observed, so the second fetch runs three shards of three pages each
+    assert server.hits.total() - pages == 9
+    assert as_rows(sharded) == as_rows(serial)
+    # the mock pages by device, so shards walked as many pages as the serial fetch and the query goes back to serial
+    fetch()
+    assert server.hits.total() - pages == 12
+
+
+def test_shard_requests_count_toward_the_calling_thread(server, tenant, monkeypatch):
+    monkeypatch.setattr(fetchers, "SHARD_PAGES", 1)
+    fetchers.fetch_device_stats(tenant.id, "bandwidth")
+    before = metrics.thread_total("auvik_requests_total")
+    fetchers.fetch_device_stats(tenant.id, "bandwidth")
+    assert metrics.thread_total("auvik_requests_total") - before == 9
+
+
+def test_open_alerts_match_filters(server, tenant):
+    alerts = fetchers.fetch_open_alerts(tenant.id)
+    expected = [a for a in tenant.alerts if a["status"] == "created" and not a["dismissed"] and a["dispatched"]]
+    assert len(alerts) == len(expected)
+
+
+def test_network_index_from_inventory(server, tenant):
+    index = network_index(tenant.id)
+    assert index == {device.id: tenant.networks[device.network][1] for device in tenant.devices}
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_compressed_responses_decode_transparently(server, tenant, monkeypatch, encoding):
+    # requests offers every encoding it can decode by default; narrow it to compare them
+    monkeypatch.setattr(requests.utils, "DEFAULT_ACCEPT_ENCODING", encoding)
+    compressed = fetchers.fetch_device_stats(tenant.id, "bandwidth", interval="hour")
+    wire = server.wire_bytes
+    monkeypatch.setattr(requests.utils, "DEFAULT_ACCEPT_ENCODING", "identity")
+    plain = fetchers.fetch_device_stats(tenant.id, "bandwidth", interval="hour")
+    assert [len(s) for s in compressed] == [len(s) for s in plain]
+    assert wire * 2 < server.wire_bytes - wire
+
+
+def test_rate_limit_injection_surfaces_as_error(tenant, monkeypatch):
+    with MockAuvikServer([tenant], rate_limit_rate=1.0) as mock:
+        monkeypatch.setattr(fetchers, "base_url", mock.url)
+        with pytest.raises(RuntimeError, match="429"):
+            fetchers.fetch_device_availability_stats(tenant.id)
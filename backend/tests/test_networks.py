@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from auvik_report.production import networks
+from auvik_report.production.networks import build_index, network_index, network_of, network_summary
+from auvik_report.production.series import DeviceSeries
+
+
+def device(id, *names):
+    return {
+        "id": id,
+        "relationships": {"networks": {"data": [
+            {"id": f"net-{name}", "attributes": {"networkName": name}} for name in names
+        ]}},
+    }
+
+
+############################
+# Tests for build_index
+############################
+def test_build_index_maps_devices_to_their_network():
+    index = build_index([device("d1", "HQ"), device("d2", "Branch"), device("d3")])
+    assert index == {"d1": "HQ", "d2": "Branch"}
+
+
+def test_build_index_marks_devices_in_several_networks():
+    assert build_index([device("d1", "HQ", "Branch")]) == {"d1": "Multiple"}
+
+
+def test_build_index_falls_back_to_the_network_id():
+    element = {"id": "d1", "relationships": {"networks": {"data": [{"id": "net1"}]}}}
+    assert build_index([element]) == {"d1": "net1"}
+
+
+def test_network_of_prefers_the_device_id():
+    index = {"d1": "HQ"}
+    assert network_of(index, DeviceSeries(id="stat1", device_id="d1")) == "HQ"
+    assert network_of(index, DeviceSeries(id="d1")) == "HQ"
+    assert network_of(index, DeviceSeries(id="d2")) == "Unassigned"
+
+
+############################
+# Tests for network_index
+############################
+@patch("auvik_report.production.networks.fetch_device_inventory")
+def test_network_index_is_built_once_per_ttl(mock_inventory):
+    mock_inventory.return_value = [device("d1", "HQ")]
+    assert network_index("tenant1", now=1000) == {"d1": "HQ"}
+    assert network_index("tenant1", now=1000 + networks.NETWORK_INDEX_TTL - 1) == {"d1": "HQ"}
+    assert mock_inventory.call_count == 1
+
+    mock_inventory.return_value = [device("d1", "Branch")]
+    assert network_index("tenant1", now=1000 + networks.NETWORK_INDEX_TTL) == {"d1": "Branch"}
+    assert network_index("tenant2", now=1000) == {"d1": "Branch"}
+    assert mock_inventory.call_count == 3
+
+
+############################
+# Tests for network_summary
+############################
+def test_network_summary_joins_uptime_and_bandwidth():
+    rows = network_summary(
+        {"HQ": {"30 Days": 99.0}, "Unassigned": {"30 Days": 50.0}, "Branch": {"30 Days": 98.0}},
+        {"HQ": {"Devices": 2, "TX": 1.0, "RX": 2.0, "Total": 3.0}, "Lab": {"Devices": 1, "TX": 0.5, "RX": 0.5, "Total": 1.0}},
+    )
+    assert [row["Network"] for row in rows] == ["Branch", "HQ", "Lab", "Unassigned"]
+    assert rows[0] == {"Network": "Branch", "Uptime": {"30 Days": 98.0}, "Devices": 0, "TX": 0, "RX": 0, "Total": 0}
+    assert rows[1]["Total"] == 3.0 and rows[1]["Uptime"] == {"30 Days": 99.0}
+    assert rows[2]["Uptime"] == {}
@@ -0,0 +1,71 @@
+from array import array
+
+import pytest
+
+from auvik_report.production.outages import scan_availability, outage_row, outage_timeline, longest_outages
+from auvik_report.production.series import PrefixSums
+
+HOUR = 3600
+T0 = 1_700_000_000 // HOUR * HOUR
+
+
+def series(values, start=T0, step=HOUR):
+    return array("d", (start + i * step for i in range(len(values)))), array("d", values)
+
+############################
+# Tests for scan_availability
+############################
+def test_runs_below_threshold_become_outages():
+    ts, col = series([100, 0, 0, 100, 20, 100, 0])
+    sums, outages = scan_availability(ts, col, HOUR)
+    assert outages == [
+        (T0 + HOUR, T0 + 3 * HOUR, 2 * HOUR),
+        (T0 + 4 * HOUR, T0 + 5 * HOUR, 0.8 * HOUR),
+        (T0 + 6 * HOUR, T0 + 7 * HOUR, HOUR),  # still open at the end of the series
+    ]
+
+
+def test_prefix_sums_match_a_separate_pass():
+    ts, col = series([100, float("nan"), 0, 50, 100])
+    sums, _ = scan_availability(ts, col, HOUR)
+    expected = PrefixSums(ts, col)
+    assert sums.sums == expected.sums
+    assert sums.counts == expected.counts
+    assert sums.mean() == pytest.approx(62.5)
+
+
+def test_partial_hours_above_threshold_are_not_outages():
+    ts, col = series([100, 50, 99, 100])
+    assert scan_availability(ts, col, HOUR)[1] == []
+
+
+def test_missing_samples_and_gaps_split_runs():
+    ts, col = series([0, float("nan"), 0])
+    assert [o[:2] for o in scan_availability(ts, col, HOUR)[1]] == [(T0, T0 + HOUR), (T0 + 2 * HOUR, T0 + 3 * HOUR)]
+
+    ts = array("d", [T0, T0 + HOUR, T0 + 5 * HOUR])
+    col = array("d", [0, 0, 0])
+    assert [o[:2] for o in scan_availability(ts, col, HOUR)[1]] == [(T0, T0 + 2 * HOUR), (T0 + 5 * HOUR, T0 + 6 * HOUR)]
+
+############################
+# Tests for the tenant views
+############################
+def test_timeline_merges_overlapping_device_outages():
+    a = [(T0, T0 + 2 * HOUR, 0), (T0 + 10 * HOUR, T0 + 11 * HOUR, 0)]
+    b = [(T0 + HOUR, T0 + 3 * HOUR, 0)]
+    c = [(T0 + 3 * HOUR, T0 + 4 * HOUR, 0)]  # touching counts as the same incident
+    timeline = outage_timeline([a, b, c])
+    assert [(i["Hours"], i["Outages"]) for i in timeline] == [(4.0, 3), (1.0, 1)]
+    assert timeline[0]["Start"] == outage_row("x", "y", a[0])["Start"]
+
+
+def test_longest_outages_keep_first_seen_on_ties():
+    rows = [(HOUR, {"Device": "a"}), (3 * HOUR, {"Device": "b"}), (HOUR, {"Device": "c"}), (2 * HOUR, {"Device": "d"})]
+    assert [r["Device"] for r in longest_outages(rows, 3)] == ["b", "d", "a"]
+
+
+def test_outage_row_formats_utc():
+    row = outage_row("SW1", "Switch", (T0, T0 + 3 * HOUR, 1.5 * HOUR))
+    assert row["Hours"] == 3.0
+    assert row["Downtime"] == 1.5
+    assert row["End"].endswith(":00")
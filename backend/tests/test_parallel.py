@@ -0,0 +1,88 @@
+import math
+import pytest
+from array import array
+from unittest.mock import patch
+
+from auvik_report.production import parallel
+from auvik_report.production.helpers import bandwidth_average, series_mean, stats_per_device
+from auvik_report.production.outages import window_scan
+from auvik_report.production.period import ReportPeriod
+from auvik_report.production.reports import uptime_and_outages
+from auvik_report.production.series import DeviceSeries
+
+
+def series(n, width=3, start=0.0, id=None, device_type=None):
+    return DeviceSeries(
+        id=id, device_id=id, device_name=id, device_type=device_type,
+        timestamps=array("d", (start + 3600 * i for i in range(n))),
+        columns=tuple(array("d", (float((i * (c + 7)) % 101) for i in range(n))) for c in range(width)),
+    )
+
+
+@pytest.fixture(scope="module")
+def processes():
+    """Aggregate every list, however short, in two worker processes"""
+    with patch.object(parallel, "AGGREGATE_PROCESSES", 2), patch.object(parallel, "AGGREGATE_MIN_SERIES", 1):
+        yield
+        parallel.shutdown()
+
+############################
+# Tests for chunks
+############################
+def test_chunks_balance_samples_and_cover_every_series():
+    offsets = array("q", [0, 0, 3, 8, 18, 19, 40])
+    runs = parallel.chunks(offsets, 3)
+    assert runs[0][0] == 0 and runs[-1][1] == 6
+    assert all(a[1] == b[0] for a, b in zip(runs, runs[1:]))
+    assert len(runs) <= 3
+    assert parallel.chunks(array("q", [0]), 4) == []
+
+############################
+# Tests for SharedSeries
+############################
+def test_shared_series_round_trip_pads_missing_columns():
+    data = [series(4), series(0), series(2, width=1)]
+    with parallel.SharedSeries(data) as shared:
+        name, offsets, width = shared.handle()
+        view = shared.shm.buf.cast("d")
+        total = shared.offsets[-1]
+        assert width == 3 and list(shared.offsets) == [0, 4, 4, 6]
+        assert list(view[0:4]) == list(data[0].timestamps)
+        assert list(view[2 * total:2 * total + 4]) == list(data[0].columns[1])
+        assert math.isnan(view[3 * total + 4])
+        view.release()
+
+############################
+# Tests for aggregate
+############################
+def test_aggregate_stays_in_process_below_the_threshold():
+    with patch.object(parallel, "AGGREGATE_PROCESSES", 2), patch.object(parallel, "pool") as mock_pool:
+        assert parallel.aggregate(series_mean, [series(3)]) == [series_mean(series(3))]
+        mock_pool.assert_not_called()
+
+
+def test_aggregate_in_processes_matches_in_process(processes):
+    data = [series(n) for n in (5, 0, 30, 1, 200)]
+    assert parallel.aggregate(bandwidth_average, data) == [bandwidth_average(d) for d in data]
+    assert parallel.aggregate(series_mean, data) == [series_mean(d) for d in data]
+    windows = [("7 Days", 24 * 3600.0), ("30 Days", 0.0)]
+    expected = [window_scan(d, windows, 1e9, 3600) for d in data]
+    assert parallel.aggregate(window_scan, data, windows, 1e9, 3600) == expected
+
+
+@patch("auvik_report.production.reports.fetch_device_availability_stats")
+def test_uptime_and_outages_in_processes(mock_fetch, processes):
+    start = ReportPeriod.rolling(30).start_ts
+    availability = [series(500, width=1, start=start, id=f"d{i}", device_type="switch") for i in range(6)]
+    expected = uptime_and_outages("t1", availability=availability, index={})
+    with patch.object(parallel, "AGGREGATE_PROCESSES", 0):
+        assert uptime_and_outages("t1", availability=availability, index={}) == expected
+    assert expected[0]["Switch"]
+    mock_fetch.assert_not_called()
+
+
+def test_stats_per_device_in_processes(processes):
+    cpu = [series(10, width=1, id="d1"), series(0, width=1, id="d2")]
+    stats = stats_per_device(cpu, [], [])
+    assert stats["d1"]["cpu"] == round(series_mean(cpu[0]), 2)
+    assert stats["d2"]["cpu"] is None
@@ -0,0 +1,111 @@
+import pytest
+from datetime import datetime, timezone
+
+from auvik_report.production import fetchers
+from auvik_report.production.helpers import stats_per_device
+from auvik_report.production.period import ReportPeriod, resolve_period, choose_interval, format_window, snapshot, snapshot_now
+from mock_auvik import MockAuvikServer, generate_tenants
+
+NOW = datetime(2026, 3, 15, 13, 45, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="module")
+def tenant():
+    return generate_tenants(1, seed=11, devices=30)[0]
+
+
+@pytest.fixture
+def server(tenant, monkeypatch):
+    with MockAuvikServer([tenant], page_size=50) as mock:
+        monkeypatch.setattr(fetchers, "base_url", mock.url)
+        yield mock
+
+############################
+# Tests for ReportPeriod
+############################
+def test_rolling_period_covers_whole_days():
+    period = ReportPeriod.rolling(7, NOW)
+    assert period.end == datetime(2026, 3, 15, tzinfo=timezone.utc)
+    assert period.start == datetime(2026, 3, 8, tzinfo=timezone.utc)
+    assert period.days == 7
+    assert period.heading == "Mar 08 - Mar 14, 2026"
+
+
+def test_calendar_month_is_previous_month():
+    period = ReportPeriod.calendar_month(NOW)
+    assert period.start == datetime(2026, 2, 1, tzinfo=timezone.utc)
+    assert period.end == datetime(2026, 3, 1, tzinfo=timezone.utc)
+    assert period.days == 28
+    assert period.heading == "February 2026"
+
+
+def test_resolve_period_accepts_known_values():
+    assert resolve_period(None).label == "30"
+    assert resolve_period(90).days == 90
+    assert resolve_period(" Month ").label == "month"
+    with pytest.raises(ValueError):
+        resolve_period("14")
+
+
+def test_format_window_makes_thru_time_inclusive():
+    period = ReportPeriod.rolling(7, NOW)
+    assert format_window((period.start_ts, period.end_ts)) == ("2026-03-08T00:00:00.000Z", "2026-03-14T23:59:59.000Z")
+
+
+def test_snapshot_clock_is_on_the_hour():
+    now = snapshot_now()
+    assert (now.minute, now.second, now.microsecond) == (0, 0, 0)
+    assert fetchers.format_date_range(30)[1].endswith(":00:00.000Z")
+
+
+def test_snapshot_pins_the_clock_and_outer_pin_wins():
+    with snapshot(NOW):
+        assert snapshot_now() == NOW
+        assert resolve_period(7).end == datetime(2026, 3, 15, tzinfo=timezone.utc)
+        with snapshot(datetime(2026, 3, 16, tzinfo=timezone.utc)) as inner:
+            assert inner == NOW
+    assert snapshot_now() != NOW
+
+############################
+# Tests for choose_interval
+############################
+def test_means_use_daily_buckets():
+    assert choose_interval("cpuUtilization", 90) == "day"
+    assert choose_interval("bandwidth", 7) == "day"
+
+
+def test_filtered_stats_keep_hourly_samples():
+    assert choose_interval("utilization", 30) == "hour"
+    assert choose_interval("packetBroadcast", 30) == "hour"
+    # outages are found in the hourly availability samples
+    assert choose_interval("uptime", 7) == "hour"
+
+############################
+# Hourly versus daily aggregates on mock data
+############################
+@pytest.mark.parametrize("days", [7, 30])
+def test_daily_means_match_hourly_means(server, tenant, days):
+    period = ReportPeriod.rolling(days)
+    window = (period.start_ts, period.end_ts)
+    stats = ("cpuUtilization", "memoryUtilization", "storageUtilization")
+    hourly = stats_per_device(*(fetchers.fetch_device_stats(tenant.id, s, window=window, interval="hour") for s in stats))
+    daily = stats_per_device(*(fetchers.fetch_device_stats(tenant.id, s, window=window, interval="day") for s in stats))
+
+    assert hourly.keys() == daily.keys()
+    for device_id, expected in hourly.items():
+        for stat in ("cpu", "memory", "storage"):
+            if expected[stat] is None:
+                assert daily[device_id][stat] is None
+            else:
+                assert daily[device_id][stat] == pytest.approx(expected[stat], abs=0.01)
+
+
+def test_daily_uptime_matches_hourly_uptime(server, tenant):
+    period = ReportPeriod.rolling(30)
+    window = (period.start_ts, period.end_ts)
+    hourly = fetchers.fetch_device_availability_stats(tenant.id, window, "hour")
+    daily = fetchers.fetch_device_availability_stats(tenant.id, window, "day")
+    for h, d in zip(hourly, daily):
+        if len(h):
+            assert len(d) == 30
+            assert sum(d.columns[0]) / len(d) == pytest.approx(sum(h.columns[0]) / len(h), abs=0.001)
@@ -0,0 +1,88 @@
+import time
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from auvik_report import profiling
+
+
+def slow_fetch():
+    end = time.perf_counter() + 0.1
+    while time.perf_counter() < end:
+        pass
+
+
+def fake_generate_report(domain, period=None, refresh=False):
+    slow_fetch()
+    return "Tenant One"
+
+############################
+# Tests for stage_of
+############################
+def test_stage_of_prefers_innermost_marker():
+    stack = [
+        "/lib/requests/sessions.py",
+        "/app/auvik_report/production/fetchers.py",
+        "/app/auvik_report/production/helpers.py",
+        "/app/auvik_report/production/reports.py",
+    ]
+    assert profiling.stage_of(stack) == "fetch"
+    assert profiling.stage_of(stack[2:]) == "aggregation"
+    assert profiling.stage_of(["/app/templates/report.html"]) == "render"
+    assert profiling.stage_of(["/app/app.py"]) == "other"
+
+############################
+# Tests for profile_report
+############################
+@patch.object(profiling, "generate_report", side_effect=fake_generate_report)
+def test_profile_report_writes_prof_and_collapsed(mock_generate, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "OUTPUT_DIR", tmp_path)
+
+    name, profile = profiling.profile_report("dom1")
+
+    assert name == "Tenant One"
+    mock_generate.assert_called_once_with("dom1", None, refresh=True)
+    assert profile["prof"] == "dom1.prof"
+    stats = pstats.Stats(str(tmp_path / "dom1.prof"))
+    assert any(func[2] == "slow_fetch" for func in stats.stats)
+
+    lines = (tmp_path / "dom1.collapsed").read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "test_profiling:slow_fetch" in stack
+    assert int(count) > 0
+
+@patch.object(profiling, "generate_report")
+def test_profile_report_samples_worker_threads(mock_generate, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "STAGE_MARKERS", (("fetch", ("test_profiling.py",)),))
+    idle = ThreadPoolExecutor(max_workers=1, thread_name_prefix="auvik-shard")
+    idle.submit(lambda: None).result()
+
+    def report_on_pool(domain, period=None, refresh=False):
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-step") as pool:
+            pool.submit(slow_fetch).result()
+        return "Tenant One"
+
+    mock_generate.side_effect = report_on_pool
+    try:
+        _, profile = profiling.profile_report("dom1")
+    finally:
+        idle.shutdown()
+
+    # the report thread only waited, the fetch ran on the step thread
+    assert profile["stages"]["fetch"] >= 0.05
+    stacks = (tmp_path / "dom1.collapsed").read_text()
+    assert "thread:_worker;thread:run;test_profiling:slow_fetch" in stacks
+    # the idle shard thread added nothing
+    assert all("thread:_worker" not in line or "thread:run" in line for line in stacks.splitlines())
+
+############################
+# Tests for is_admin
+############################
+def test_is_admin_reads_env(monkeypatch):
+    monkeypatch.setenv("ADMIN_EMAILS", "Boss@example.com, ops@example.com")
+    assert profiling.is_admin("boss@example.com")
+    assert not profiling.is_admin("intern@example.com")
+    monkeypatch.delenv("ADMIN_EMAILS")
+    assert not profiling.is_admin("boss@example.com")
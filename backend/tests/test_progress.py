@@ -0,0 +1,54 @@
+import contextvars
+import threading
+
+from auvik_report import progress
+
+############################
+# Tests for emit and listen
+############################
+def test_emit_without_listener_is_a_no_op():
+    progress.emit("uptime", status="done")
+
+
+def test_listen_collects_events_and_restores_previous_listener():
+    outer, inner = [], []
+    with progress.listen(outer.append):
+        with progress.listen(inner.append):
+            progress.emit("uptime", status="done")
+        progress.emit("alerts", status="done")
+    progress.emit("health", status="done")
+    assert inner == [{"phase": "uptime", "status": "done"}]
+    assert outer == [{"phase": "alerts", "status": "done"}]
+
+
+def test_listener_follows_copied_context_into_threads():
+    events = []
+    with progress.listen(events.append):
+        context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(progress.emit, "pdf"))
+    thread.start()
+    thread.join()
+    assert events == [{"phase": "pdf"}]
+
+
+def test_other_threads_do_not_receive_events():
+    events = []
+    with progress.listen(events.append):
+        thread = threading.Thread(target=progress.emit, args=("pdf",))
+        thread.start()
+        thread.join()
+    assert events == []
+
+############################
+# Tests for phase
+############################
+def test_phase_emits_done_with_timing():
+    events = []
+    with progress.listen(events.append):
+        with progress.phase("bandwidth", devices=3):
+            pass
+    assert len(events) == 1
+    assert events[0]["phase"] == "bandwidth"
+    assert events[0]["status"] == "done"
+    assert events[0]["devices"] == 3
+    assert events[0]["seconds"] >= 0
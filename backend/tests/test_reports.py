@@ -1,19 +1,47 @@
+import time
 import pytest
+from array import array
 from unittest.mock import patch
 
 from auvik_report.production.reports import (
     uptime_report,
+    uptime_and_outages,
     open_alerts,
     bandwidth_report,
+    bandwidth_and_networks,
     device_health,
 )
+from auvik_report.production.period import ReportPeriod
+from auvik_report.production.series import DeviceSeries
+from auvik_report import progress, alertstore
+
+
+#Fixture timestamps are hour offsets into the default report period
+PERIOD_START = ReportPeriod.rolling(30).start_ts
+
+
+def in_period(series):
+    for s in series:
+        s.timestamps = array("d", (PERIOD_START + t * 3600 for t in s.timestamps))
+    return series
+
+
+def device_series(elements):
+    return in_period([DeviceSeries.from_element(e) for e in elements])
+
+
+@pytest.fixture(autouse=True)
+def empty_inventory():
+    """Devices are in no network unless a test passes its own index"""
+    with patch("auvik_report.production.networks.fetch_device_inventory", return_value=[]) as mock_inventory:
+        yield mock_inventory
 
 ############################
 # Tests for uptime_report
 ############################
 @patch("auvik_report.production.reports.fetch_device_availability_stats")
 def test_uptime_report_computes_averages(mock_fetch):
-    mock_fetch.return_value = [
+    mock_fetch.return_value = device_series([
         {
             "relationships": {"device": {"data": {"deviceType": "router"}}},
             "attributes": {"stats": [{"data": [[1, 90], [2, 100]]}]},
@@ -22,44 +50,122 @@ def test_uptime_report_computes_averages(mock_fetch):
             "relationships": {"device": {"data": {"deviceType": "switch"}}},
             "attributes": {"stats": [{"data": [[1, 80]]}]},
         },
-    ]
+    ])
+    result = uptime_report("tenant1")
+    assert result["Router"]["30 Days"] == pytest.approx(95.0, rel=1e-3)
+    assert result["Switch"]["30 Days"] == pytest.approx(80.0, rel=1e-3)
+    # every sample is older than a week
+    assert "7 Days" not in result["Router"]
+
+
+@patch("auvik_report.production.reports.fetch_device_availability_stats")
+def test_uptime_report_splits_windows(mock_fetch):
+    last_week = 23 * 24
+    mock_fetch.return_value = device_series([
+        {
+            "relationships": {"device": {"data": {"deviceType": "router"}}},
+            "attributes": {"stats": [{"data": [[1, 100], [2, 100], [last_week, 40], [last_week + 1, 60]]}]},
+        },
+    ])
     result = uptime_report("tenant1")
-    assert result["Router"] == pytest.approx(95.0, rel=1e-3)
-    assert result["Switch"] == pytest.approx(80.0, rel=1e-3)
+    assert list(result["Router"]) == ["7 Days", "30 Days"]
+    assert result["Router"]["7 Days"] == 50.0
+    assert result["Router"]["30 Days"] == 75.0
 
 
 @patch("auvik_report.production.reports.fetch_device_availability_stats")
 def test_uptime_report_handles_access_point_name(mock_fetch):
-    mock_fetch.return_value = [
+    mock_fetch.return_value = device_series([
         {
             "relationships": {"device": {"data": {"deviceType": "accessPoint"}}},
             "attributes": {"stats": [{"data": [[1, 50], [2, 100]]}]},
         }
-    ]
+    ])
     result = uptime_report("tenant1")
     assert "Access Point" in result
-    assert result["Access Point"] == 75.0
+    assert result["Access Point"]["30 Days"] == 75.0
+
+
+@patch("auvik_report.production.reports.fetch_device_availability_stats")
+def test_uptime_and_outages_come_from_one_fetch(mock_fetch):
+    mock_fetch.return_value = device_series([
+        {
+            "relationships": {"device": {"data": {"id": "r1", "deviceName": "R1", "deviceType": "router"}}},
+            "attributes": {"stats": [{"data": [[0, 100], [1, 0], [2, 0], [3, 100]]}]},
+        },
+        {
+            "relationships": {"device": {"data": {"id": "s1", "deviceName": "S1", "deviceType": "switch"}}},
+            "attributes": {"stats": [{"data": [[0, 100], [1, 100], [2, 0], [3, 0], [4, 0]]}]},
+        },
+    ])
 
+    uptime, outages, networks = uptime_and_outages("tenant1")
+    assert mock_fetch.call_count == 1
+    assert mock_fetch.call_args.args[2] == "hour"
+    assert uptime == {"Router": {"30 Days": 50.0}, "Switch": {"30 Days": 40.0}}
+    assert [(o["Device"], o["Hours"]) for o in outages["longest"]] == [("S1", 3.0), ("R1", 2.0)]
+    assert [(i["Hours"], i["Outages"]) for i in outages["timeline"]] == [(4.0, 2)]
+    assert networks == {"Unassigned": {"30 Days": 44.444}}
+
+
+@patch("auvik_report.production.reports.fetch_device_availability_stats")
+def test_uptime_and_outages_subtotals_per_network(mock_fetch):
+    element = lambda id, device_type, samples: {
+        "relationships": {"device": {"data": {"id": id, "deviceName": id, "deviceType": device_type}}},
+        "attributes": {"stats": [{"data": samples}]},
+    }
+    mock_fetch.return_value = device_series([
+        element("r1", "router", [[1, 100], [2, 80]]),
+        element("s1", "switch", [[1, 60]]),
+        element("s2", "switch", [[1, 100]]),
+    ])
+
+    uptime, _, networks = uptime_and_outages("tenant1", index={"r1": "HQ", "s1": "HQ", "s2": "Branch"})
+    assert mock_fetch.call_count == 1
+    assert uptime == {"Router": {"30 Days": 90.0}, "Switch": {"30 Days": 80.0}}
+    assert networks == {"HQ": {"30 Days": 80.0}, "Branch": {"30 Days": 100.0}}
 
 ############################
 # Tests for open_alerts
 ############################
-@patch("auvik_report.production.reports.fetch_open_alerts")
-def test_open_alerts_counts_by_severity_and_status(mock_fetch):
-    mock_fetch.return_value = [
-        {"attributes": {"severity": "critical", "status": "active"}},
-        {"attributes": {"severity": "critical", "status": "paused"}},
-        {"attributes": {"severity": "warning", "status": "paused"}},
-    ]
+def alert(id, severity, status="created", dismissed=False):
+    return {"id": id, "attributes": {"severity": severity, "status": status, "dismissed": dismissed,
+                                     "dispatched": True, "detectedOn": "2026-03-01T00:00:00.000Z"}}
+
+
+@patch("auvik_report.alertstore.fetch_alert_history")
+@patch("auvik_report.alertstore.fetch_open_alerts")
+def test_open_alerts_counts_by_severity_from_local_state(mock_open, mock_history):
+    mock_history.return_value = [alert("1", "critical"), alert("2", "critical"), alert("3", "warning"),
+                                 alert("4", "info", status="resolved"), alert("5", "info", dismissed=True)]
+    mock_open.return_value = [alert("1", "critical"), alert("2", "critical"), alert("3", "warning")]
     result = open_alerts("tenant1")
     assert result["Critical"] == 2
     assert result["Warning"] == 1
-    assert result["Paused"] == 2  # extra count when status == Paused
+    assert result["Info"] == 0
+    assert result["Paused"] == 0
 
 
-@patch("auvik_report.production.reports.fetch_open_alerts")
-def test_open_alerts_no_devices(mock_fetch):
-    mock_fetch.return_value = []
+@patch("auvik_report.alertstore.fetch_alert_history", return_value=[])
+@patch("auvik_report.alertstore.fetch_open_alerts")
+def test_open_alerts_fetch_only_the_open_set_per_report(mock_open, mock_history):
+    mock_open.return_value = [alert("1", "critical"), alert("2", "critical")]
+    alertstore.sync("tenant1")
+    mock_history.reset_mock()
+    mock_open.reset_mock()
+    # alert 2 was resolved; the report must not wait ALERT_RECONCILE_SECONDS to see it
+    mock_open.return_value = [alert("1", "critical")]
+    now = time.time()
+    for report in range(1, 4):
+        with patch("auvik_report.alertstore.time.time", return_value=now + report * alertstore.ALERT_SYNC_SECONDS):
+            assert open_alerts("tenant1")["Critical"] == 1
+        # one open set query per report, no history
+        assert (mock_open.call_count, mock_history.call_count) == (report, 0)
+
+
+@patch("auvik_report.alertstore.fetch_alert_history", return_value=[])
+@patch("auvik_report.alertstore.fetch_open_alerts", return_value=[])
+def test_open_alerts_no_devices(mock_open, mock_history):
     result = open_alerts("tenant1")
     assert result == {"No Devices": 0}
 
@@ -72,7 +178,7 @@ def test_open_alerts_no_devices(mock_fetch):
 @patch("auvik_report.production.reports.fetch_device_stats")
 def test_bandwidth_report_builds_entries(mock_fetch, mock_bandwidth, mock_max_iface):
     mock_fetch.side_effect = [
-        [  # firewalls
+        device_series([  # firewalls
             {
                 "relationships": {
                     "device": {"data": {"deviceName": "FW1", "deviceType": "firewall"}}
@@ -80,7 +186,7 @@ def test_bandwidth_report_builds_entries(mock_fetch, mock_bandwidth, mock_max_if
                 "attributes": {"stats": [{"data": [[1, 100, 200, 300]]}]},
                 "id": "fw1",
             }
-        ],
+        ]),
         [],  # routers
         [],  # switches
         [],  # stack
@@ -99,6 +205,7 @@ def test_bandwidth_report_builds_entries(mock_fetch, mock_bandwidth, mock_max_if
     assert entry["Total"] == 3.0
     assert entry["Top Interface"] == "eth0"
     assert entry["Average Utilization"] == 50
+    assert entry["Windows"] == {"7 Days": 0, "30 Days": 0.0003}
 
 
 @patch("auvik_report.production.reports.max_interface_average")
@@ -108,7 +215,7 @@ def test_bandwidth_report_skips_devices_with_no_stats(
     mock_fetch, mock_bandwidth, mock_max_iface
 ):
     mock_fetch.side_effect = [
-        [
+        device_series([
             {
                 "relationships": {
                     "device": {"data": {"deviceName": "SW1", "deviceType": "switch"}}
@@ -116,7 +223,7 @@ def test_bandwidth_report_skips_devices_with_no_stats(
                 "attributes": {"stats": [{"data": []}]},  # empty data
                 "id": "sw1",
             }
-        ],
+        ]),
         [],
         [],
         [],
@@ -129,6 +236,68 @@ def test_bandwidth_report_skips_devices_with_no_stats(
     assert result == []
 
 
+@patch("auvik_report.production.reports.max_interface_average")
+@patch("auvik_report.production.reports.bandwidth_average")
+@patch("auvik_report.production.reports.fetch_device_stats")
+def test_bandwidth_report_emits_interface_fan_out_progress(mock_fetch, mock_bandwidth, mock_max_iface):
+    element = lambda name: {
+        "relationships": {"device": {"data": {"deviceName": name, "deviceType": "router"}}},
+        "attributes": {"stats": [{"data": [[1, 10, 20, 30]]}]},
+        "id": name,
+    }
+    mock_fetch.side_effect = [[], device_series([element("R1"), element("R2")]), [], [], []]
+    mock_bandwidth.return_value = (10, 20, 30)
+    mock_max_iface.return_value = ("eth0", 50)
+
+    events = []
+    with progress.listen(events.append):
+        bandwidth_report("tenant1")
+    assert events == [
+        {"phase": "interfaces", "done": 0, "total": 2},
+        {"phase": "interfaces", "done": 1, "total": 2},
+        {"phase": "interfaces", "done": 2, "total": 2},
+    ]
+
+@patch("auvik_report.production.reports.REPORT_TABLE_ROWS", 2)
+@patch("auvik_report.production.reports.max_interface_average")
+@patch("auvik_report.production.reports.bandwidth_average")
+@patch("auvik_report.production.reports.fetch_device_stats")
+def test_bandwidth_report_fans_out_only_for_top_rows(mock_fetch, mock_bandwidth, mock_max_iface):
+    element = lambda name: {
+        "relationships": {"device": {"data": {"deviceName": name, "deviceType": "router"}}},
+        "attributes": {"stats": [{"data": [[1, 10, 20, 30]]}]},
+        "id": name,
+    }
+    mock_fetch.side_effect = [[], device_series([element("R1"), element("R2"), element("R3"), element("R4")]), [], [], []]
+    totals = {"R1": 5.0, "R2": 40.0, "R3": 5.0, "R4": 40.0}
+    mock_bandwidth.side_effect = lambda device: (0, 0, totals[device.device_name])
+    mock_max_iface.return_value = ("eth0", 50)
+
+    result = bandwidth_report("tenant1")
+    assert [entry["Device"] for entry in result] == ["R2", "R4"]
+    assert [call.args[0].device_name for call in mock_max_iface.call_args_list] == ["R2", "R4"]
+
+
+@patch("auvik_report.production.reports.REPORT_TABLE_ROWS", 1)
+@patch("auvik_report.production.reports.max_interface_average")
+@patch("auvik_report.production.reports.fetch_device_stats")
+def test_bandwidth_network_subtotals_cover_devices_outside_the_table(mock_fetch, mock_max_iface):
+    element = lambda name, tx, rx: {
+        "relationships": {"device": {"data": {"id": name, "deviceName": name, "deviceType": "switch"}}},
+        "attributes": {"stats": [{"data": [[1, tx * 1e6, rx * 1e6, (tx + rx) * 1e6]]}]},
+        "id": name,
+    }
+    mock_fetch.side_effect = [[], [], device_series([element("S1", 1, 2), element("S2", 3, 4), element("S3", 5, 6)]), [], []]
+    mock_max_iface.return_value = ("eth0", 50)
+
+    rows, networks = bandwidth_and_networks("tenant1", index={"S1": "HQ", "S2": "HQ"})
+    assert [row["Device"] for row in rows] == ["S3"]
+    assert mock_fetch.call_count == 5
+    assert networks == {
+        "HQ": {"Devices": 2, "TX": 4.0, "RX": 6.0, "Total": 10.0},
+        "Unassigned": {"Devices": 1, "TX": 5.0, "RX": 6.0, "Total": 11.0},
+    }
+
 ############################
 # Tests for device_health
 ############################
@@ -137,14 +306,14 @@ def test_bandwidth_report_skips_devices_with_no_stats(
 @patch("auvik_report.production.reports.fetch_device_stats")
 def test_device_health_calls_dependencies(mock_fetch, mock_stats, mock_health):
     mock_fetch.side_effect = [
-        [
+        device_series([
             {
                 "relationships": {
                     "device": {"data": {"id": "dev1", "deviceName": "Router1"}}
                 },
                 "attributes": {"stats": [{"data": [[1, 10], [2, 20]]}]},
             }
-        ],  # cpu
+        ]),  # cpu
         [],  # memory
         [],  # storage
     ]
@@ -156,3 +325,18 @@ def test_device_health_calls_dependencies(mock_fetch, mock_stats, mock_health):
     assert result == [{"name": "Router1", "health": 50}]
     mock_stats.assert_called_once()
     mock_health.assert_called_once()
+
+
+@patch("auvik_report.production.reports.fetch_device_stats")
+def test_device_health_p95_mode_reads_hourly_samples(mock_fetch):
+    pegged = [[t, 100 if t % 4 == 0 else 10] for t in range(24 * 30)]
+    mock_fetch.side_effect = [
+        device_series([{"relationships": {"device": {"data": {"id": "dev1", "deviceName": "SW1"}}}, "attributes": {"stats": [{"data": pegged}]}}]),
+        device_series([{"relationships": {"device": {"data": {"id": "dev1", "deviceName": "SW1"}}}, "attributes": {"stats": [{"data": pegged}]}}]),
+        [],
+    ]
+
+    report = device_health("tenant1", mode="p95")
+    assert {call.kwargs["interval"] for call in mock_fetch.call_args_list} == {"hour"}
+    assert report[0]["name"] == "SW1"
+    assert report[0]["cpu_p95"] == 100.0
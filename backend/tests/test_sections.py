@@ -0,0 +1,141 @@
+import threading
+import pytest
+
+from auvik_report import sections, metrics, progress, httpcache
+from auvik_report.production import fetchers
+from auvik_report.production.period import ReportPeriod, snapshot, snapshot_now
+from auvik_report.experimental import exp_fetchers
+from mock_auvik import MockAuvikServer, generate_tenants
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty step registry, so tests register their own steps"""
+    monkeypatch.setattr(sections, "STEPS", {})
+    return sections.STEPS
+
+
+@pytest.fixture(scope="module")
+def tenant():
+    return generate_tenants(1, seed=5, devices=12, alerts=40)[0]
+
+
+@pytest.fixture
+def server(tenant, monkeypatch):
+    monkeypatch.setattr(httpcache, "HTTP_CACHE", False)
+    with MockAuvikServer([tenant], page_size=25) as mock:
+        monkeypatch.setattr(fetchers, "base_url", mock.url)
+        monkeypatch.setattr(exp_fetchers, "base_url", mock.url)
+        yield mock
+
+############################
+# Tests for plan
+############################
+def test_plan_orders_shared_steps_once():
+    levels = sections.plan(sections.REPORT_SECTIONS + ("top_broadcasters", "offline_devices"))
+    steps = [name for level in levels for name in level]
+    assert len(steps) == len(set(steps))
+    assert steps.count("inventory") == 1
+    position = {name: i for i, level in enumerate(levels) for name in level}
+    for name in steps:
+        assert all(position[required] < position[name] for required in sections.STEPS[name].requires)
+
+
+def test_plan_rejects_unknown_sections_and_cycles(registry):
+    sections.source("a", "b")(lambda tenant, period, b: b)
+    sections.source("b", "a")(lambda tenant, period, a: a)
+    sections.section("loop", "a")(lambda tenant, period, a: a)
+    sections.section("orphan", "missing")(lambda tenant, period, missing: missing)
+    with pytest.raises(ValueError, match="Unknown report section"):
+        sections.plan(["a"])
+    with pytest.raises(ValueError, match="Unknown report step"):
+        sections.plan(["orphan"])
+    with pytest.raises(ValueError, match="depend on each other"):
+        sections.plan(["loop"])
+
+
+def test_steps_register_once(registry):
+    sections.source("a")(lambda tenant, period: 1)
+    with pytest.raises(ValueError, match="already registered"):
+        sections.section("a")(lambda tenant, period: 1)
+
+############################
+# Tests for gather_sections
+############################
+def test_gather_sections_runs_each_step_once_with_its_inputs(registry):
+    calls = []
+    lock = threading.Lock()
+
+    def step(name, value):
+        def run(tenant, period, *values):
+            with lock:
+                calls.append(name)
+            metrics.inc("auvik_requests_total", ("test",))
+            return value(*values)
+        return run
+
+    sections.source("shared")(step("shared", lambda: 2))
+    sections.source("other")(step("other", lambda: 3))
+    sections.section("double", "shared")(step("double", lambda shared: shared * 2))
+    sections.section("product", "shared", "other")(step("product", lambda shared, other: shared * other))
+
+    before = metrics.thread_total("auvik_requests_total")
+    data = sections.gather_sections("t1", ReportPeriod.rolling(30), ["product", "double"])
+    assert data == {"product": 6, "double": 4}
+    assert sorted(calls) == ["double", "other", "product", "shared"]
+    # steps ran on pool threads but their requests count toward the caller
+    assert metrics.thread_total("auvik_requests_total") - before == 4
+
+
+def test_gather_sections_keeps_the_report_context(registry):
+    seen = {}
+    sections.section("clock")(lambda tenant, period: seen.setdefault("now", snapshot_now()))
+    events = []
+    with snapshot(), progress.listen(events.append):
+        sections.gather_sections("t1", ReportPeriod.rolling(30), ["clock"])
+        assert seen["now"] == snapshot_now()
+    assert [event["phase"] for event in events] == ["clock"]
+
+
+def test_gather_sections_reuses_one_pool(registry, monkeypatch):
+    monkeypatch.setattr(sections, "REPORT_WORKERS", 2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def run(tenant, period):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        threading.Event().wait(0.01)
+        with lock:
+            running.pop()
+        return threading.current_thread().name
+
+    for name in ("a", "b", "c", "d"):
+        sections.section(name)(run)
+    names = set()
+    for _ in range(5):
+        names.update(sections.gather_sections("t1", ReportPeriod.rolling(30), ["a", "b", "c", "d"]).values())
+    # every report ran on the same few threads, at most REPORT_WORKERS steps at once
+    assert all(name.startswith("report-step") for name in names)
+    assert len(names) <= sections._step_pool._max_workers
+    assert max(peak) <= 2
+
+
+def test_gather_sections_raises_step_errors(registry):
+    def fail(tenant, period):
+        raise RuntimeError("boom")
+    sections.section("broken")(fail)
+    with pytest.raises(RuntimeError, match="boom"):
+        sections.gather_sections("t1", ReportPeriod.rolling(30), ["broken"])
+
+
+def test_every_section_against_mock_requests_inventory_once(server, tenant):
+    names = sections.sections()
+    data = sections.gather_sections(tenant.id, ReportPeriod.rolling(30), names)
+    assert list(data) == names
+    assert server.hits["inventory/device/info"] == 1
+    assert server.hits["inventory/network/info"] == 1
+    assert sum(data["device_inventory"].values()) == len(tenant.devices)
+    assert {row["Network"] for row in data["networks"]} <= {name for _, name in tenant.networks}
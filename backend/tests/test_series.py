@@ -0,0 +1,107 @@
+import math
+import pytest
+
+from array import array
+
+import msgspec
+
+from auvik_report.production.schemas import DeviceStat, InterfaceStat
+from auvik_report.production.series import DeviceSeries, InterfaceSeries, PrefixSums, columns_from_rows, merge_shards
+
+############################
+# Tests for columns_from_rows
+############################
+def test_columns_from_rows_transposes():
+    timestamps, columns = columns_from_rows([[1, 10, 20, 30], [2, 11, 21, 32]])
+    assert list(timestamps) == [1.0, 2.0]
+    assert [list(c) for c in columns] == [[10.0, 11.0], [20.0, 21.0], [30.0, 32.0]]
+
+
+def test_columns_from_rows_handles_iso_timestamps_and_gaps():
+    timestamps, (values,) = columns_from_rows([["1970-01-01T01:00:00.000Z", None], ["1970-01-01T02:00:00.000Z", 5]])
+    assert list(timestamps) == [3600.0, 7200.0]
+    assert math.isnan(values[0])
+    assert values[1] == 5.0
+
+
+def test_columns_from_rows_empty():
+    timestamps, columns = columns_from_rows([])
+    assert len(timestamps) == 0
+    assert columns == ()
+
+############################
+# Tests for from_element
+############################
+def test_device_series_from_element():
+    series = DeviceSeries.from_element({
+        "id": "dev1",
+        "relationships": {"device": {"data": {"id": "dev1", "deviceName": "SW1", "deviceType": "switch"}}},
+        "attributes": {"stats": [{"data": [[1, 50.5], [2, 70]]}]},
+    })
+    assert (series.id, series.device_id, series.device_name, series.device_type) == ("dev1", "dev1", "SW1", "switch")
+    assert len(series) == 2
+    assert sum(series.columns[0]) == pytest.approx(120.5)
+    with pytest.raises(AttributeError):
+        series.extra = 1
+
+
+def test_interface_series_from_element():
+    series = InterfaceSeries.from_element({
+        "id": "int1",
+        "relationships": {"interface": {"data": {"interfaceName": "eth0", "interfaceType": "ethernet", "parentDevice": "dev1"}}},
+        "attributes": {"stats": [{"data": [[1, 3, 4]]}]},
+    })
+    assert (series.interface_name, series.interface_type, series.parent_device) == ("eth0", "ethernet", "dev1")
+    assert list(series.columns[1]) == [4.0]
+
+def test_from_struct_matches_from_element():
+    element = {
+        "id": "dev1",
+        "attributes": {"stats": [{"data": [[1700000000, 10, 20, 30], [1700003600, 11, None, 33]]}]},
+        "relationships": {"device": {"data": {"id": "dev1", "deviceName": "FW1", "deviceType": "firewall"}}},
+    }
+    struct = msgspec.convert(element, DeviceStat)
+    a, b = DeviceSeries.from_element(element), DeviceSeries.from_struct(struct)
+    assert (a.id, a.device_id, a.device_name, a.device_type) == (b.id, b.device_id, b.device_name, b.device_type)
+    assert a.timestamps == b.timestamps
+    assert [list(c)[:1] for c in a.columns] == [list(c)[:1] for c in b.columns]
+    assert math.isnan(b.columns[1][1])
+
+
+def test_interface_from_struct_without_stats():
+    struct = msgspec.convert({"id": "int1", "relationships": {"interface": {"data": {"interfaceName": "eth0"}}}}, InterfaceStat)
+    series = InterfaceSeries.from_struct(struct)
+    assert series.interface_name == "eth0"
+    assert len(series) == 0
+
+############################
+# Tests for merge_shards
+############################
+def test_merge_shards_stitches_in_time_order_and_drops_boundary_duplicates():
+    first = [DeviceSeries("d1", timestamps=array("d", [0, 1]), columns=(array("d", [10, 11]),)),
+             DeviceSeries("d2", timestamps=array("d", []), columns=())]
+    second = [DeviceSeries("d1", timestamps=array("d", [1, 2]), columns=(array("d", [11, 12]),)),
+              DeviceSeries("d2", timestamps=array("d", [2]), columns=(array("d", [5]),)),
+              DeviceSeries("d3", timestamps=array("d", [2]), columns=(array("d", [7]),))]
+    merged = merge_shards([first, second])
+    assert [s.id for s in merged] == ["d1", "d2", "d3"]
+    assert list(merged[0].timestamps) == [0, 1, 2]
+    assert list(merged[0].columns[0]) == [10, 11, 12]
+    assert list(merged[1].timestamps) == [2]
+    assert list(merged[1].columns[0]) == [5]
+
+############################
+# Tests for PrefixSums
+############################
+def test_prefix_sums_answer_any_window():
+    sums = PrefixSums(array("d", [0, 10, 20, 30]), array("d", [1, 2, 3, 4]))
+    assert sums.total() == (10, 4)
+    assert sums.total(10, 30) == (5, 2)
+    assert sums.mean(20) == 3.5
+    assert sums.mean(40) is None
+
+
+def test_prefix_sums_skip_missing_samples():
+    sums = PrefixSums(array("d", [0, 10, 20]), array("d", [2, math.nan, 4]))
+    assert sums.total() == (6, 2)
+    assert sums.mean(5, 15) is None
@@ -0,0 +1,64 @@
+import bisect
+import random
+
+import pytest
+
+from auvik_report.production.sketch import KLLSketch, exact_quantile
+
+
+def rank_of(ordered, value):
+    return bisect.bisect_left(ordered, value) / len(ordered)
+
+
+@pytest.fixture
+def samples():
+    rng = random.Random(7)
+    return [rng.gauss(50, 15) for _ in range(50_000)]
+
+############################
+# Tests for KLLSketch
+############################
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.95, 0.99])
+def test_quantile_is_within_rank_error(samples, q):
+    sketch = KLLSketch(seed=1)
+    sketch.update_many(samples)
+    ordered = sorted(samples)
+    assert abs(rank_of(ordered, sketch.quantile(q)) - q) < 0.02
+
+
+def test_memory_stays_bounded(samples):
+    sketch = KLLSketch(k=100, seed=1)
+    for value in samples:
+        sketch.update(value)
+    assert len(sketch) == len(samples)
+    assert sketch.size < 3 * 100
+
+
+def test_merge_matches_single_sketch_accuracy(samples):
+    parts = [KLLSketch(seed=i) for i in range(5)]
+    for i, part in enumerate(parts):
+        part.update_many(samples[i::5])
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    ordered = sorted(samples)
+    assert len(merged) == len(samples)
+    assert abs(rank_of(ordered, merged.quantile(0.95)) - 0.95) < 0.02
+
+
+def test_small_inputs_are_exact():
+    values = [float(v) for v in range(100)]
+    random.Random(3).shuffle(values)
+    sketch = KLLSketch()
+    sketch.update_many(values)
+    assert sketch.quantile(0.95) == exact_quantile(values, 0.95) == 94.0
+
+
+def test_nan_is_ignored_and_empty_is_none():
+    sketch = KLLSketch()
+    assert sketch.quantile(0.95) is None
+    sketch.update(float("nan"))
+    sketch.update_many([float("nan"), 5.0])
+    assert len(sketch) == 1
+    assert sketch.quantile(0.95) == 5.0
+    assert exact_quantile([float("nan")], 0.5) is None
@@ -0,0 +1,34 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+#Modules only report generation needs; a worker must not pay for them until the first report
+DEFERRED = ["pdfkit", "requests", "auvik_report.generate_report", "auvik_report.production.fetchers"]
+
+
+def run(code, cwd):
+    result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True,
+                            env={"PYTHONPATH": str(BACKEND), "PATH": ""})
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+############################
+# Tests for cold start
+############################
+def test_import_app_defers_report_modules(tmp_path):
+    out = run("import sys, json, app; print(json.dumps(sorted(sys.modules)))", tmp_path)
+    loaded = set(json.loads(out.splitlines()[-1]))
+    assert not loaded & set(DEFERRED)
+
+
+def test_import_app_does_not_touch_database(tmp_path):
+    run("import app", tmp_path)
+    assert not (tmp_path / "db.sqlite").exists()
+
+
+def test_package_exports_resolve_lazily(tmp_path):
+    out = run("import sys, auvik_report; f = auvik_report.resolve_period; print('auvik_report.generate_report' in sys.modules, f.__name__)", tmp_path)
+    assert out.split() == ["False", "resolve_period"]
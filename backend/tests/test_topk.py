@@ -0,0 +1,78 @@
+import heapq
+import random
+
+from auvik_report.production.topk import TopK
+
+
+############################
+# Tests for TopK
+############################
+def test_topk_keeps_highest_scores_in_order():
+    top = TopK(3)
+    for score in [5, 1, 9, 3, 7, 2]:
+        top.push(f"item{score}", score)
+    assert top.items() == ["item9", "item7", "item5"]
+    assert len(top) == 3
+
+
+def test_topk_ties_keep_first_seen():
+    top = TopK(2)
+    for name in ["a", "b", "c"]:
+        top.push(name, 1.0)
+    assert top.items() == ["a", "b"]
+
+
+def test_topk_ties_ordered_by_arrival():
+    top = TopK(None)
+    top.push("a", 2)
+    top.push("b", 3)
+    top.push("c", 2)
+    assert top.items() == ["b", "a", "c"]
+
+
+def test_topk_push_reports_whether_kept():
+    top = TopK(1)
+    assert top.push("a", 1) is True
+    assert top.push("b", 1) is False
+    assert top.push("c", 2) is True
+    assert top.items() == ["c"]
+
+
+def test_topk_none_keeps_every_item():
+    top = TopK(None, key=lambda x: x).extend(range(50))
+    assert top.items() == list(range(49, -1, -1))
+    assert top.threshold() is None
+
+
+def test_topk_zero_keeps_nothing():
+    top = TopK(0)
+    assert top.push("a", 1) is False
+    assert top.items() == []
+
+
+def test_topk_uses_key_and_never_compares_items():
+    # dicts are not orderable, so equal scores must not fall through to the item
+    top = TopK(2, key=lambda d: d["score"])
+    top.extend([{"score": 1}, {"score": 1}, {"score": 0}])
+    assert top.items() == [{"score": 1}, {"score": 1}]
+
+
+def test_topk_threshold():
+    top = TopK(2)
+    top.push("a", 5)
+    assert top.threshold() is None
+    top.push("b", 3)
+    assert top.threshold() == 3
+    top.push("c", 4)
+    assert top.threshold() == 4
+
+
+def test_topk_matches_full_sort():
+    rng = random.Random(7)
+    scores = [rng.randint(0, 100) for _ in range(2000)]
+    top = TopK(25)
+    for i, score in enumerate(scores):
+        top.push(i, score)
+    expected = [i for i, _ in sorted(enumerate(scores), key=lambda pair: -pair[1])[:25]]
+    assert top.items() == expected
+    assert [scores[i] for i in top.items()] == heapq.nlargest(25, scores)
@@ -0,0 +1,166 @@
+import pytest
+from array import array
+from types import SimpleNamespace
+
+from auvik_report import tsstore
+from auvik_report.production.series import DeviceSeries, InterfaceSeries
+
+HOUR = 3600
+DAY = 86400
+#A fixed midnight keeps windows day-aligned like real report periods
+END = 1_760_000_000 // DAY * DAY
+
+
+def make_series(device_id, hours, value=1.0):
+    timestamps = array("d", hours)
+    return DeviceSeries(
+        id=device_id, device_id=device_id, device_name=f"name-{device_id}", device_type="switch",
+        timestamps=timestamps, columns=(array("d", [value] * len(hours)),)
+    )
+
+
+def hours(start, end):
+    """Every hour in [start, end) plus the boundary sample the API repeats"""
+    return list(range(int(start), int(end) + 1, HOUR))
+
+
+def window(days, end=END):
+    return end - days * DAY, end
+
+############################
+# Tests for sync
+############################
+def test_sync_full_then_delta():
+    calls = []
+
+    def fetch(start, end, value=10.0):
+        calls.append((start, end))
+        return [make_series("dev1", hours(start, end), value)]
+
+    result = tsstore.sync("tenant1", "device-cpuUtilization", fetch, *window(2))
+    assert calls == [window(2)]
+    assert len(result[0]) == 48
+
+    result = tsstore.sync("tenant1", "device-cpuUtilization", lambda s, e: fetch(s, e, 20.0), *window(2, END + DAY))
+    assert calls[1] == (END, END + DAY)
+    series = result[0]
+    assert len(series) == 48
+    assert series.device_name == "name-dev1"
+    assert series.timestamps[0] == END - DAY
+    assert list(series.timestamps) == sorted(set(series.timestamps))
+    assert series.columns[0][-1] == 20.0
+
+
+def test_sync_skips_fetch_when_window_is_stored():
+    tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e))], *window(30))
+    calls = []
+    result = tsstore.sync("tenant1", "k", lambda s, e: calls.append((s, e)) or [], *window(7))
+    assert calls == []
+    assert len(result[0]) == 7 * 24
+
+
+def test_sync_backfills_older_range_in_order():
+    tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e))], *window(7))
+    calls = []
+
+    def fetch(start, end):
+        calls.append((start, end))
+        return [make_series("dev1", hours(start, end), 5.0)]
+
+    result = tsstore.sync("tenant1", "k", fetch, *window(30))
+    assert calls == [(END - 30 * DAY, END - 7 * DAY)]
+    assert len(result[0]) == 30 * 24
+    assert list(result[0].timestamps) == sorted(result[0].timestamps)
+    assert result[0].columns[0][0] == 5.0
+
+
+def test_sync_starts_over_on_disjoint_window():
+    tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e))], *window(2))
+    later = window(2, END + 10 * DAY)
+    result = tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev2", hours(s, e))], *later)
+    assert [s.id for s in result] == ["dev2"]
+    manifest = tsstore._read_manifest(tsstore.series_path("tenant1", "k"))
+    assert manifest["covered"] == list(later)
+
+
+def test_failed_delta_fetch_leaves_the_store_unchanged():
+    tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e))], *window(1))
+
+    def failing(start, end):
+        # the first series arrives, then the connection drops
+        yield make_series("dev1", hours(start, end), 2.0)
+        raise ConnectionError("reset")
+
+    later = (END - DAY, END + 12 * HOUR)
+    with pytest.raises(ConnectionError):
+        tsstore.sync("tenant1", "k", failing, *later)
+    result = tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e), 2.0)], *later)
+    assert len(result[0]) == 36
+    assert list(result[0].timestamps) == sorted(set(result[0].timestamps))
+
+
+def test_failed_fetch_on_disjoint_window_keeps_the_old_history():
+    tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e))], *window(2))
+
+    def failing(start, end):
+        raise ConnectionError("reset")
+
+    with pytest.raises(ConnectionError):
+        tsstore.sync("tenant1", "k", failing, *window(2, END + 10 * DAY))
+    calls = []
+    result = tsstore.sync("tenant1", "k", lambda s, e: calls.append((s, e)) or [], *window(2))
+    assert calls == []
+    assert len(result[0]) == 48
+
+
+def test_scan_yields_stored_chunks_without_merging():
+    tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e)), make_series("dev2", hours(s, e))], *window(2))
+    extras = tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e), 2.0)],
+                          END - DAY, END + 6 * HOUR, collect=False)
+    assert extras == []
+    chunks = list(tsstore.scan("tenant1", "k", END - DAY, END + 6 * HOUR))
+    assert [chunk.device_id for chunk in chunks] == ["dev1", "dev2", "dev1"]
+    assert sum(len(chunk) for chunk in chunks if chunk.device_id == "dev1") == 30
+    assert all(END - DAY <= ts < END + 6 * HOUR for chunk in chunks for ts in chunk.timestamps)
+
+
+def test_read_chunks_drops_repeated_rows():
+    path = tsstore.series_path("tenant1", "k")
+    path.parent.mkdir(parents=True)
+    chunk = tsstore._encode_chunk(make_series("dev1", [0, HOUR, 2 * HOUR], 1.0))
+    repeat = tsstore._encode_chunk(make_series("dev1", [HOUR, 2 * HOUR], 3.0))
+    path.write_bytes(chunk + repeat)
+    series = tsstore._read_chunks(path, DeviceSeries, 0)["dev1"]
+    assert list(series.timestamps) == [0, HOUR, 2 * HOUR]
+    assert list(series.columns[0]) == [1.0, 3.0, 3.0]
+
+
+def test_sync_keeps_devices_missing_from_delta():
+    tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e)), make_series("dev2", hours(s, e))], *window(1))
+    result = tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e))], END - DAY, END + HOUR)
+    assert sorted(s.id for s in result) == ["dev1", "dev2"]
+    assert len(next(s for s in result if s.id == "dev2")) == 24
+    assert len(next(s for s in result if s.id == "dev1")) == 25
+
+
+def test_sync_compacts_without_losing_rows(monkeypatch):
+    monkeypatch.setattr(tsstore, "COMPACT_AFTER", 3)
+    monkeypatch.setattr(tsstore, "time", SimpleNamespace(time=lambda: END))
+    for h in range(6):
+        tsstore.sync("tenant1", "k", lambda s, e: [make_series("dev1", hours(s, e))], END - 6 * HOUR, END - (5 - h) * HOUR)
+    manifest = tsstore._read_manifest(tsstore.series_path("tenant1", "k"))
+    assert manifest["chunks"] <= 3
+    result = tsstore.sync("tenant1", "k", lambda s, e: [], END - 6 * HOUR, END)
+    assert len(result[0]) == 6
+
+
+def test_sync_round_trips_interface_series():
+    start, end = END - 3 * HOUR, END
+    series = InterfaceSeries(
+        id="int1", interface_name="eth0", interface_type="ethernet", parent_device="dev1",
+        timestamps=array("d", hours(start, end)[:3]), columns=(array("d", [1, 2, 3]), array("d", [4, 5, 6]))
+    )
+    tsstore.sync("interfaces", "utilization-dev1", lambda s, e: [series], start, end, InterfaceSeries)
+    result = tsstore.sync("interfaces", "utilization-dev1", lambda s, e: [], start, end, InterfaceSeries)
+    assert result[0].interface_name == "eth0"
+    assert [list(c) for c in result[0].columns] == [[1, 2, 3], [4, 5, 6]]
@@ -0,0 +1,145 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from auvik_report import cache, metrics, warmer
+import auvik_report.generate_report as gr
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+
+
+@pytest.fixture
+def fake_gather(monkeypatch):
+    """Stands in for gather_data: writes the cache and spends `cost` Auvik requests per tenant"""
+    calls = []
+    costs = {}
+
+    def gather(tenant_id, domain, period, refresh=False):
+        assert refresh
+        calls.append(f"{domain}-{period.label}")
+        if domain == "broken":
+            raise RuntimeError("Auvik down")
+        metrics.inc("auvik_requests_total", ("stat/device/bandwidth", "200"), costs.get(domain, 10))
+        cache.set_cache({"alerts": {}}, f"{domain}-{period.label}")
+
+    monkeypatch.setattr(gr, "gather_data", gather)
+    gather.calls = calls
+    gather.costs = costs
+    return gather
+
+############################
+# Tests for record_request
+############################
+def test_record_request_classifies_hits():
+    assert warmer.record_request("t1", "one", "30", hit=False, now=NOW) == "miss"
+    assert warmer.record_request("t1", "one", "30", hit=True, now=NOW + 60) == "hit"
+
+
+def test_record_request_persists_and_decays():
+    warmer.record_request("t1", "one", "30", hit=False, now=NOW)
+    warmer.record_request("t1", "one", "30", hit=False, now=NOW)
+    assert warmer.flush()
+    warmer._demand = None  # as after a restart
+    warmer.record_request("t1", "one", "30", hit=False, now=NOW + warmer.DEMAND_HALF_LIFE)
+    entry = warmer.top_tenants(now=NOW + warmer.DEMAND_HALF_LIFE)[0]
+    assert entry["score"] == pytest.approx(2 * 0.5 + 1)
+
+
+def test_record_request_counts_in_memory_until_flushed():
+    warmer.record_request("t1", "one", "30", hit=False, now=NOW)
+    assert not warmer.DEMAND_FILE.exists()
+    assert warmer.flush()
+    assert not warmer.flush()
+    assert warmer.DEMAND_FILE.exists()
+
+
+def test_top_tenants_prefers_recent_demand():
+    for _ in range(3):
+        warmer.record_request("t1", "old", "30", hit=False, now=NOW)
+    for _ in range(3):
+        warmer.record_request("t2", "new", "30", hit=False, now=NOW + 2 * warmer.DEMAND_HALF_LIFE)
+    warmer.record_request("t3", "rare", "7", hit=False, now=NOW + 2 * warmer.DEMAND_HALF_LIFE)
+    top = warmer.top_tenants(2, now=NOW + 2 * warmer.DEMAND_HALF_LIFE)
+    assert [entry["domain"] for entry in top] == ["new", "rare"]
+
+############################
+# Tests for next_run
+############################
+@pytest.mark.parametrize("now, expected", [
+    (datetime(2024, 3, 4, 6, 0), datetime(2024, 3, 4, 7, 30)),   # Monday before the run
+    (datetime(2024, 3, 4, 7, 30), datetime(2024, 3, 5, 7, 30)),  # Monday at the run, next is Tuesday
+    (datetime(2024, 3, 8, 9, 0), datetime(2024, 3, 11, 7, 30)),  # Friday morning, skips the weekend
+])
+def test_next_run_leads_business_days(monkeypatch, now, expected):
+    monkeypatch.setattr(warmer, "BUSINESS_START", "08:00")
+    monkeypatch.setattr(warmer, "BUSINESS_DAYS", (0, 1, 2, 3, 4))
+    monkeypatch.setattr(warmer, "WARM_LEAD_MINUTES", 30)
+    assert warmer.next_run(now) == expected
+
+############################
+# Tests for warm_once
+############################
+def test_warm_once_refreshes_top_tenants_and_then_counts_warm_hits(fake_gather):
+    now = time.time()
+    for domain in ("one", "two"):
+        warmer.record_request("t", domain, "30", hit=False, now=now)
+
+    outcome = warmer.warm_once(top_k=5, budget=100, now=now)
+    assert sorted(outcome["refreshed"]) == ["one-30", "two-30"]
+    assert warmer.record_request("t", "one", "30", hit=True) == "warm_hit"
+
+
+def test_warm_once_skips_tenants_that_stay_fresh(fake_gather):
+    now = time.time()
+    warmer.record_request("t", "one", "30", hit=False, now=now)
+    cache.set_cache({"alerts": {}}, "one-30")
+
+    outcome = warmer.warm_once(top_k=5, budget=100, now=now)
+    assert outcome["fresh"] == ["one-30"]
+    assert fake_gather.calls == []
+
+    later = now + cache.CACHE_TTL  # the file will have expired by the time business hours open
+    assert warmer.warm_once(top_k=5, budget=100, now=later)["refreshed"] == ["one-30"]
+
+
+def test_warm_once_stays_within_request_budget(fake_gather):
+    now = time.time()
+    for domain, requests in (("big", 3), ("small", 2), ("tiny", 1)):
+        for _ in range(requests):
+            warmer.record_request("t", domain, "30", hit=False, now=now)
+    fake_gather.costs.update({"big": 60, "small": 30, "tiny": 5})
+
+    first = warmer.warm_once(budget=70, now=now)
+    # a tenant's cost is unknown until it has been warmed once, so a run can overshoot by one tenant
+    assert first["refreshed"] == ["big-30", "small-30"]
+    assert first["budget"] == ["tiny-30"]
+
+
+def test_warm_once_uses_last_cost_to_skip_expensive_tenants(fake_gather):
+    now = time.time()
+    for domain, requests in (("big", 2), ("small", 1)):
+        for _ in range(requests):
+            warmer.record_request("t", domain, "30", hit=False, now=now)
+    fake_gather.costs.update({"big": 60, "small": 5})
+    warmer.warm_once(budget=100, now=now)
+
+    later = now + cache.CACHE_TTL
+    outcome = warmer.warm_once(budget=50, now=later)
+    assert outcome["budget"] == ["big-30"]
+    assert outcome["refreshed"] == ["small-30"]
+
+
+def test_warm_once_reports_errors_and_continues(fake_gather):
+    now = time.time()
+    for domain in ("broken", "one"):
+        warmer.record_request("t", domain, "30", hit=False, now=now)
+    outcome = warmer.warm_once(budget=100, now=now)
+    assert outcome["error"] == ["broken-30"]
+    assert outcome["refreshed"] == ["one-30"]
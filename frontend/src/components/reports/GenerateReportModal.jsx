@@ -20,6 +20,7 @@ function GenerateReportModal ({isOpen, isGenerating, progress, results, previewU
               <p className='modal-progress'>
                 {progress.current + 1} of {progress.total}
               </p>
+              {progress.phase && <p className='modal-phase'>{progress.phase}</p>}
             </div>
             <div className='modal-footer'>
               <button className='btn btn-secondary'onClick={onClose}>Close</button>
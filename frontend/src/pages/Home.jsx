@@ -4,7 +4,7 @@ import SelectedTenantList from '../components/tenants/SelectedTenantList';
 import GenerateReportButton from '../components/reports/GenerateReportButton';
 import GenerateReportModal from '../components/reports/GenerateReportModal';
 import PreviewModal from '../components/reports/PreviewModal'
-import { generateReport } from '../services/reportService';
+import { describeProgress, streamReport } from '../services/reportService';
 import './Home.css';
 
 function Home() {
@@ -19,12 +19,14 @@ function Home() {
   async function handleGenerateReports() {
     setIsOpen(true);
     setIsGenerating(true);
-    setProgress({ current: 0, total: selectedTenants.length});
+    setProgress({ current: 0, total: selectedTenants.length, phase: null });
     setResults([]);
     
-    for (let selectedTenant of selectedTenants) {
-      const result = await generateReport(selectedTenant)
-      setProgress({ current: progress.current + 1, total: selectedTenants.length});
+    for (let [index, selectedTenant] of selectedTenants.entries()) {
+      setProgress({ current: index, total: selectedTenants.length, phase: null });
+      const result = await streamReport(selectedTenant, (event) =>
+        setProgress(prev => ({ ...prev, phase: describeProgress(event) }))
+      );
       setResults(prev => [...prev, result]);
     }
     setIsGenerating(false)
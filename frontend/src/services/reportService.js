@@ -10,4 +10,39 @@ export async function generateReport(domain) {
   if (!res.ok) throw new Error("Failed to fetch tenants");
   const data = await res.json()
   return data;
-}
\ No newline at end of file
+}
+
+const PHASE_LABELS = {
+  tenants: "Looking up tenant",
+  cache: "Loaded cached data",
+  uptime: "Uptime",
+  alerts: "Alerts",
+  bandwidth: "Bandwidth",
+  interfaces: "Interfaces",
+  health: "Device health",
+  html: "Rendering report",
+  pdf: "Rendering PDF",
+};
+
+export function describeProgress(event) {
+  const label = PHASE_LABELS[event.phase] ?? event.phase;
+  if (event.total !== undefined) return `${label} ${event.done}/${event.total}`;
+  if (event.seconds !== undefined) return `${label} done in ${event.seconds.toFixed(1)}s`;
+  return label;
+}
+
+export function streamReport(domain, onProgress) {
+  return new Promise((resolve, reject) => {
+    const params = new URLSearchParams({ domain });
+    const source = new EventSource(`/api/generate-report/stream?${params}`, { withCredentials: true });
+    source.addEventListener("progress", (e) => onProgress(JSON.parse(e.data)));
+    source.addEventListener("done", (e) => {
+      source.close();
+      resolve(JSON.parse(e.data));
+    });
+    source.addEventListener("error", (e) => {
+      source.close();
+      reject(new Error(e.data ? JSON.parse(e.data).error : "Report stream failed"));
+    });
+  });
+}